@@ -0,0 +1,54 @@
+"""
+Зависимости допуска запросов: слот лимитера записи или чтения на время запроса.
+
+Подключаются в dependencies маршрута или роутера — они разрешаются раньше
+сессии БД, а освобождаются после неё, так что слот покрывает и commit.
+Обе зависят от apply_deadline: срок запроса (api/deadline.py) задаётся до
+очереди и ограничивает и ожидание слота.
+При отказе — 429/503 с заголовком Retry-After, до обращения к пулу соединений.
+"""
+
+from collections.abc import AsyncGenerator
+
+from fastapi import Depends, HTTPException
+
+from api.deadline import apply_deadline
+from database.deadline import remaining_seconds
+from exceptions import AdmissionRejectedError
+from schemas.order import ErrorDetail
+from services.admission import AdmissionLimiter, read_admission, write_admission
+
+# Для responses маршрутов (документация OpenAPI)
+ADMISSION_RESPONSES = {
+    429: {"description": "Очередь запросов заполнена, повторите после Retry-After", "model": ErrorDetail},
+    503: {"description": "Запрос не дождался слота, повторите после Retry-After", "model": ErrorDetail},
+}
+
+
+async def _acquire(limiter: AdmissionLimiter) -> None:
+    try:
+        await limiter.acquire(remaining_seconds())
+    except AdmissionRejectedError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+async def admit_write(_: None = Depends(apply_deadline)) -> AsyncGenerator[None, None]:
+    """Слот лимитера записи (маршруты с db_helper.get_session)."""
+    await _acquire(write_admission)
+    try:
+        yield
+    finally:
+        write_admission.release()
+
+
+async def admit_read(_: None = Depends(apply_deadline)) -> AsyncGenerator[None, None]:
+    """Слот лимитера чтения (маршруты с db_helper.get_read_session)."""
+    await _acquire(read_admission)
+    try:
+        yield
+    finally:
+        read_admission.release()
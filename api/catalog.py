@@ -0,0 +1,36 @@
+"""REST-API ленты изменений каталога: инкрементальная синхронизация зеркал и кэшей."""
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.admission import ADMISSION_RESPONSES, admit_read
+from database.db_helper import db_helper
+from schemas.catalog import CatalogChangesResponse
+from services.catalog_service import get_catalog_changes
+
+router = APIRouter(
+    prefix="/catalog",
+    tags=["Каталог / Лента изменений"],
+    dependencies=[Depends(admit_read)],
+    responses=ADMISSION_RESPONSES,
+)
+
+
+@router.get(
+    "/changes",
+    response_model=CatalogChangesResponse,
+    summary="Изменения каталога после версии",
+    description=(
+        "Возвращает категории и товары, изменённые после версии `since`, и надгробия "
+        "удалённых строк, а также новую отметку `version` для следующего запроса. "
+        "Первичная загрузка — полными списками `/api/categories/` и `/api/nomenclature/`, "
+        "затем синхронизация по ленте за O(изменений)."
+    ),
+)
+async def catalog_changes_endpoint(
+    since: int = Query(0, ge=0, description="Последняя полученная версия"),
+    limit: int = Query(1000, ge=1, le=10000, description="Максимум строк в ответе"),
+    session: AsyncSession = Depends(db_helper.get_read_session),
+) -> CatalogChangesResponse:
+    """GET: лента изменений каталога."""
+    return await get_catalog_changes(session, since, limit)
@@ -1,36 +1,137 @@
-"""REST-API дерева категорий номенклатуры."""
+"""REST-API дерева категорий номенклатуры: чтение, перенос и удаление поддеревьев."""
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from api.conditional import conditional_catalog_response
+from api.admission import ADMISSION_RESPONSES, admit_read, admit_write
 from database.db_helper import db_helper
-from schemas.category import CategoryResponse, CategoryTreeItem
-from services.category_service import get_category_tree, list_categories
+from exceptions import CategoryNotFoundError, CategoryTreeConflictError
+from schemas.category import (
+    CategoryDeleteResponse,
+    CategoryMoveRequest,
+    CategoryResponse,
+    CategoryTreeItem,
+)
+from schemas.order import ErrorDetail
+from services.category_service import (
+    delete_category,
+    get_category_tree,
+    list_categories,
+    move_category,
+)
+
+# Допуск (api/admission): запись и чтение — разные лимитеры
+router = APIRouter(
+    prefix="/categories",
+    tags=["Каталог / Дерево категорий"],
+    responses=ADMISSION_RESPONSES,
+)
 
-router = APIRouter(prefix="/categories", tags=["Каталог / Дерево категорий"])
+_TREE_ERRORS = {
+    404: {"description": "Категория не найдена", "model": ErrorDetail},
+    409: {"description": "Цикл в дереве или перенос товаров в удаляемое поддерево", "model": ErrorDetail},
+}
 
 
 @router.get(
     "/",
     response_model=list[CategoryResponse],
     summary="Список всех категорий",
-    description="Возвращает все категории (плоский список).",
+    description=(
+        "Возвращает все категории (плоский список). Поддерживает ETag / If-None-Match: "
+        "пока каталог не менялся, отвечает 304 без запросов к категориям."
+    ),
+    dependencies=[Depends(admit_read)],
 )
 async def list_categories_endpoint(
-    session: AsyncSession = Depends(db_helper.get_session),
-) -> list[CategoryResponse]:
+    request: Request,
+    session: AsyncSession = Depends(db_helper.get_read_session),
+) -> Response:
     """GET: плоский список категорий."""
-    return await list_categories(session)
+    return await conditional_catalog_response(
+        request,
+        session,
+        "categories",
+        list[CategoryResponse],
+        lambda: list_categories(session),
+    )
 
 
 @router.get(
     "/tree",
     response_model=list[CategoryTreeItem],
     summary="Дерево категорий",
-    description="Возвращает иерархическое дерево категорий с количеством товаров в каждой.",
+    description=(
+        "Возвращает иерархическое дерево категорий с количеством товаров в каждой. "
+        "Поддерживает ETag / If-None-Match (304, пока каталог не менялся)."
+    ),
+    dependencies=[Depends(admit_read)],
 )
 async def category_tree_endpoint(
-    session: AsyncSession = Depends(db_helper.get_session),
-) -> list[CategoryTreeItem]:
+    request: Request,
+    session: AsyncSession = Depends(db_helper.get_read_session),
+) -> Response:
     """GET: дерево категорий с подсчётом товаров (как на картинке)."""
-    return await get_category_tree(session)
+    return await conditional_catalog_response(
+        request,
+        session,
+        "categories-tree",
+        list[CategoryTreeItem],
+        lambda: get_category_tree(session),
+    )
+
+
+@router.post(
+    "/{category_id}/move",
+    response_model=CategoryResponse,
+    responses=_TREE_ERRORS,
+    summary="Перенести категорию",
+    description=(
+        "Переносит категорию вместе с поддеревом под parent_id (null — на корневой уровень) "
+        "одним UPDATE. Перенос в саму категорию или её потомка — 409."
+    ),
+    dependencies=[Depends(admit_write)],
+)
+async def move_category_endpoint(
+    category_id: int,
+    body: CategoryMoveRequest,
+    session: AsyncSession = Depends(db_helper.get_session),
+) -> CategoryResponse:
+    """POST: смена родителя категории."""
+    try:
+        return await move_category(session, category_id, body.parent_id)
+    except CategoryNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CategoryTreeConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.delete(
+    "/{category_id}",
+    response_model=CategoryDeleteResponse,
+    responses=_TREE_ERRORS,
+    summary="Удалить категорию",
+    description=(
+        "Удаляет категорию; дочерние категории перевешиваются на её родителя, а с "
+        "cascade=true удаляется всё поддерево. Товары удалённых категорий переносятся в "
+        "move_items_to (по умолчанию — в родителя удалённой категории). Поддерево "
+        "обрабатывается запросами над множествами, без загрузки категорий."
+    ),
+    dependencies=[Depends(admit_write)],
+)
+async def delete_category_endpoint(
+    category_id: int,
+    cascade: bool = Query(False, description="Удалить всё поддерево"),
+    move_items_to: int | None = Query(
+        None, description="Куда перенести товары (по умолчанию — в родителя удаляемой категории)"
+    ),
+    session: AsyncSession = Depends(db_helper.get_session),
+) -> CategoryDeleteResponse:
+    """DELETE: удаление категории или поддерева."""
+    try:
+        return await delete_category(session, category_id, cascade, move_items_to)
+    except CategoryNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CategoryTreeConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,150 @@
+"""
+Условные GET для каталога: ETag / 304 по версии каталога и готовые тела ответов.
+
+Версия каталога (catalog_state.version) читается одним поиском по первичному
+ключу. Если клиент прислал совпадающий If-None-Match — сразу 304, без запросов
+к категориям и номенклатуре. Иначе тело берётся из кэша для этой версии или
+строится один раз и хранится вместе со сжатыми вариантами (gzip, br — если
+установлен пакет brotli), чтобы большие ответы не сжимались на каждый запрос.
+Для каждого ключа хранится только последняя версия.
+"""
+
+import gzip
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repositories import CatalogRepository
+from settings.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli — необязательная зависимость
+    brotli = None
+
+# Тела меньше порога не сжимаются: заголовки gzip дороже выигрыша
+MIN_COMPRESS_SIZE = 1024
+
+
+class _Entry:
+    """Тело ответа для одной версии каталога в разных кодировках."""
+
+    def __init__(self, version: int, body: bytes) -> None:
+        self.version = version
+        self.bodies: dict[str, bytes] = {"identity": body}
+
+    def body_for(self, encoding: str) -> bytes:
+        if encoding not in self.bodies:
+            raw = self.bodies["identity"]
+            if encoding == "br":
+                self.bodies[encoding] = brotli.compress(raw)
+            else:
+                self.bodies[encoding] = gzip.compress(raw, compresslevel=6)
+        return self.bodies[encoding]
+
+
+class CatalogResponseCache:
+    """Кэш сериализованных ответов каталога, ключ — (эндпоинт, версия каталога)."""
+
+    def __init__(self) -> None:
+        self._entries: dict[str, _Entry] = {}
+
+    def get(self, key: str, version: int) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            return entry
+        return None
+
+    def put(self, key: str, version: int, body: bytes) -> _Entry:
+        entry = _Entry(version, body)
+        self._entries[key] = entry
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+catalog_response_cache = CatalogResponseCache()
+
+
+def make_etag(key: str, version: int) -> str:
+    """Слабый ETag: одно представление в разных Content-Encoding."""
+    return f'W/"{key}-{version}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
+def _choose_encoding(accept_encoding: str, size: int) -> str:
+    if size < MIN_COMPRESS_SIZE:
+        return "identity"
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+async def prime_catalog_response(
+    session: AsyncSession,
+    key: str,
+    response_type: Any,
+    produce: Callable[[], Awaitable[Any]],
+    version: int | None = None,
+) -> _Entry:
+    """Тело ответа для версии каталога (по умолчанию текущей): из кэша или построить и сохранить."""
+    if version is None:
+        version = await CatalogRepository(session).get_version()
+    entry = catalog_response_cache.get(key, version)
+    if entry is None:
+        data = await produce()
+        entry = catalog_response_cache.put(
+            key, version, TypeAdapter(response_type).dump_json(data)
+        )
+    return entry
+
+
+async def conditional_catalog_response(
+    request: Request,
+    session: AsyncSession,
+    key: str,
+    response_type: Any,
+    produce: Callable[[], Awaitable[Any]],
+) -> Response:
+    """
+    Ответ каталога с ETag/Cache-Control.
+
+    :param key: имя эндпоинта в кэше и в ETag
+    :param response_type: тип ответа для сериализации (как response_model)
+    :param produce: построение данных ответа; вызывается, только если тела
+        для текущей версии ещё нет в кэше
+    """
+    version = await CatalogRepository(session).get_version()
+    etag = make_etag(key, version)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.catalog_cache_max_age}, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    entry = await prime_catalog_response(session, key, response_type, produce, version)
+    encoding = _choose_encoding(
+        request.headers.get("accept-encoding", ""), len(entry.bodies["identity"])
+    )
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=entry.body_for(encoding),
+        media_type="application/json",
+        headers=headers,
+    )
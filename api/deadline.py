@@ -0,0 +1,52 @@
+"""
+Срок HTTP-запроса: из настроек маршрута и заголовка клиента в database.deadline.
+
+Срок маршрута — REQUEST_DEADLINES[имя обработчика] или REQUEST_DEADLINE_SECONDS.
+Заголовок X-Request-Timeout (секунды) может его только сократить. Срок
+отсчитывается с начала обработки и включает ожидание в очереди допуска.
+Истёкший срок — 504 (обработчик deadline_exceeded_handler).
+"""
+
+import math
+from collections.abc import AsyncGenerator
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from database.deadline import deadline_scope
+from exceptions import DeadlineExceededError
+from settings.config import settings
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+
+def _route_deadline(request: Request) -> float | None:
+    route = request.scope.get("route")
+    seconds = settings.request_deadline_seconds
+    if route is not None:
+        seconds = settings.request_deadlines.get(route.name, seconds)
+    raw = request.headers.get(DEADLINE_HEADER)
+    if raw is not None:
+        try:
+            requested = float(raw)
+        except ValueError:
+            requested = 0.0
+        # inf и nan — не срок: math.ceil в database.deadline упал бы с OverflowError
+        if not (requested > 0 and math.isfinite(requested)):
+            raise HTTPException(
+                status_code=400,
+                detail=f"{DEADLINE_HEADER}: ожидается конечное число секунд больше 0",
+            )
+        seconds = min(seconds, requested) if seconds > 0 else requested
+    return seconds if seconds > 0 else None
+
+
+async def apply_deadline(request: Request) -> AsyncGenerator[None, None]:
+    """Зависимость: срок запросов к БД на время обработки запроса."""
+    with deadline_scope(_route_deadline(request)):
+        yield
+
+
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededError) -> JSONResponse:
+    """504 вместо 500, когда работа с БД прервана по сроку."""
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
@@ -0,0 +1,20 @@
+"""REST-API метрик процесса (кэши, очереди и т. п.)."""
+
+from fastapi import APIRouter
+
+from monitoring import metrics
+
+router = APIRouter(prefix="/metrics", tags=["Метрики"])
+
+
+@router.get(
+    "",
+    summary="Метрики процесса",
+    description=(
+        "Снимок счётчиков компонентов текущего процесса (воркера): "
+        "имя источника -> {метрика: значение}."
+    ),
+)
+async def get_metrics() -> dict[str, dict[str, int | float]]:
+    """GET: метрики процесса."""
+    return metrics.snapshot()
@@ -1,23 +1,250 @@
-"""REST-API номенклатуры (товаров): список всех товаров в БД."""
+"""REST-API номенклатуры (товаров): список, массовое обновление остатков/цен, поток изменений."""
 
-from fastapi import APIRouter, Depends
+import json
+from collections.abc import AsyncIterator
+from decimal import Decimal
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from api.admission import ADMISSION_RESPONSES, admit_read, admit_write
+from api.conditional import conditional_catalog_response
 from database.db_helper import db_helper
-from schemas.nomenclature import NomenclatureResponse
-from services.nomenclature_service import list_nomenclature
+from exceptions import InvalidCursorError, NomenclatureNotFoundError
+from schemas.nomenclature import (
+    NomenclatureBulkUpdateRequest,
+    NomenclatureBulkUpdateResponse,
+    NomenclatureResponse,
+    NomenclaturePage,
+)
+from schemas.order import ErrorDetail
+from services.nomenclature_service import (
+    bulk_update_nomenclature,
+    get_nomenclature,
+    get_nomenclature_batch,
+    list_nomenclature,
+    list_nomenclature_filtered,
+    search_nomenclature,
+)
+from services.stock_events import stock_broker
+from settings.config import settings
+
+# Допуск (api/admission) — на каждом маршруте с БД; поток SSE долгоживущий и без лимита
+router = APIRouter(
+    prefix="/nomenclature",
+    tags=["Номенклатура (товары)"],
+    responses=ADMISSION_RESPONSES,
+)
+
 
-router = APIRouter(prefix="/nomenclature", tags=["Номенклатура (товары)"])
+def _parse_ids(raw: str) -> list[int]:
+    """Разобрать "1,2,3" в список ID; 400 при мусоре или превышении лимита."""
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids: ожидаются целые числа через запятую")
+    if not ids:
+        raise HTTPException(status_code=400, detail="ids: пустой список")
+    if len(ids) > settings.nomenclature_batch_max_ids:
+        raise HTTPException(
+            status_code=400,
+            detail=f"ids: не больше {settings.nomenclature_batch_max_ids} за запрос",
+        )
+    return ids
 
 
+@router.get(
+    "",
+    response_model=list[NomenclatureResponse],
+    include_in_schema=False,
+    dependencies=[Depends(admit_read)],
+)
 @router.get(
     "/",
     response_model=list[NomenclatureResponse],
     summary="Список всех товаров",
-    description="Возвращает все товары (номенклатуру), которые есть в БД.",
+    description=(
+        "Возвращает все товары (номенклатуру), которые есть в БД. Поддерживает "
+        "ETag / If-None-Match: пока каталог не менялся, отвечает 304 без чтения таблицы. "
+        "С параметром ids=1,2,3 возвращает только эти товары (одним запросом, "
+        "в порядке ids; несуществующие пропускаются)."
+    ),
+    dependencies=[Depends(admit_read)],
 )
 async def list_nomenclature_endpoint(
+    request: Request,
+    ids: str | None = Query(None, description="ID товаров через запятую"),
+    session: AsyncSession = Depends(db_helper.get_read_session),
+) -> Response | list[NomenclatureResponse]:
+    """GET-эндпоинт: отображение всех товаров, которые уже есть в БД, или товаров по списку ID."""
+    if ids is not None:
+        return await get_nomenclature_batch(session, _parse_ids(ids))
+    return await conditional_catalog_response(
+        request,
+        session,
+        "nomenclature",
+        list[NomenclatureResponse],
+        lambda: list_nomenclature(session),
+    )
+
+
+@router.get(
+    "/search",
+    response_model=NomenclaturePage,
+    summary="Поиск товаров по наименованию",
+    description=(
+        "Полнотекстовый поиск (FTS5 на SQLite, GIN/tsvector на PostgreSQL): каждое слово "
+        "запроса ищется как префикс, регистр и «ё/е» не различаются, результаты "
+        "отсортированы по релевантности. Можно ограничить поддеревом категории. "
+        "Пагинация по курсору next_cursor."
+    ),
+    dependencies=[Depends(admit_read)],
+)
+async def search_nomenclature_endpoint(
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос"),
+    category_id: int | None = Query(None, description="Искать только в поддереве категории"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="Курсор следующей страницы"),
+    session: AsyncSession = Depends(db_helper.get_read_session),
+) -> NomenclaturePage:
+    """GET: поиск товаров (typeahead)."""
+    try:
+        return await search_nomenclature(session, q, limit, category_id, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get(
+    "/listing",
+    response_model=NomenclaturePage,
+    summary="Витрина: товары с фильтрами",
+    description=(
+        "Товары поддерева категории, в диапазоне цен, опционально только в наличии; "
+        "сортировка по цене (price / -price), пагинация по курсору next_cursor. "
+        "Каждое сочетание фильтров обслуживается индексом."
+    ),
+    dependencies=[Depends(admit_read)],
+)
+async def list_nomenclature_filtered_endpoint(
+    category_id: int | None = Query(None, description="Категория (вместе с подкатегориями)"),
+    price_min: Decimal | None = Query(None, ge=0, description="Минимальная цена"),
+    price_max: Decimal | None = Query(None, ge=0, description="Максимальная цена"),
+    in_stock: bool = Query(False, description="Только товары в наличии"),
+    sort: Literal["price", "-price"] = Query("price", description="Сортировка по цене"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="Курсор следующей страницы"),
+    session: AsyncSession = Depends(db_helper.get_read_session),
+) -> NomenclaturePage:
+    """GET: страница витрины."""
+    try:
+        return await list_nomenclature_filtered(
+            session,
+            category_id=category_id,
+            price_min=price_min,
+            price_max=price_max,
+            in_stock=in_stock,
+            sort=sort,
+            limit=limit,
+            cursor=cursor,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.patch(
+    ":bulk",
+    response_model=NomenclatureBulkUpdateResponse,
+    summary="Массовое обновление остатков и цен",
+    description=(
+        "Принимает список изменений: для каждого товара абсолютный остаток (quantity) "
+        "или дельту (quantity_delta) и/или новую цену. Применяется пачками "
+        "(один executemany на пачку) в одной транзакции. Строки с несуществующим ID "
+        "или уходящим в минус остатком не применяются и возвращаются в rejected."
+    ),
+    dependencies=[Depends(admit_write)],
+)
+async def bulk_update_nomenclature_endpoint(
+    body: NomenclatureBulkUpdateRequest,
     session: AsyncSession = Depends(db_helper.get_session),
-) -> list[NomenclatureResponse]:
-    """GET-эндпоинт: отображение всех товаров, которые уже есть в БД."""
-    return await list_nomenclature(session)
+) -> NomenclatureBulkUpdateResponse:
+    """PATCH: синхронизация остатков и цен со складом."""
+    return await bulk_update_nomenclature(session, body.items)
+
+
+async def _stock_event_stream(resume_token: str | None) -> AsyncIterator[str]:
+    """
+    Подписка и её сериализация в формат text/event-stream.
+
+    Подписка создаётся в генераторе, а не в обработчике: если ответ так и не
+    начал передаваться (клиент отключился раньше), finally с unsubscribe не
+    выполнился бы, и подписка осталась бы у брокера навсегда.
+    """
+    subscription = stock_broker.subscribe(resume_token)
+    try:
+        while True:
+            if not await subscription.wait(settings.stock_stream_heartbeat_seconds):
+                yield ": ping\n\n"
+                continue
+            if subscription.needs_resync:
+                subscription.needs_resync = False
+                yield f"id: {stock_broker.token(stock_broker.last_seq)}\nevent: resync\ndata: {{}}\n\n"
+                continue
+            event = subscription.queue.get_nowait()
+            data = json.dumps(
+                {
+                    "nomenclature_id": event.nomenclature_id,
+                    "quantity": str(event.quantity),
+                    "price": str(event.price),
+                }
+            )
+            yield f"id: {stock_broker.token(event.seq)}\nevent: stock\ndata: {data}\n\n"
+    finally:
+        stock_broker.unsubscribe(subscription)
+
+
+@router.get(
+    "/stream",
+    summary="Поток изменений остатков и цен (SSE)",
+    description=(
+        "Server-sent events: событие `stock` с (nomenclature_id, quantity, price) на каждое "
+        "закоммиченное изменение (оформление заказа, массовое обновление). Событие `resync` "
+        "означает, что часть событий потеряна — перечитайте `/api/nomenclature/`. "
+        "Для возобновления передайте id последнего события в заголовке Last-Event-ID "
+        "или параметре last_event_id."
+    ),
+    response_class=StreamingResponse,
+)
+async def stock_stream_endpoint(
+    last_event_id: str | None = Query(None, description="Токен возобновления"),
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
+) -> StreamingResponse:
+    """GET: подписка на изменения остатков вместо опроса всего списка."""
+    return StreamingResponse(
+        _stock_event_stream(last_event_id_header or last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/{nomenclature_id:int}",
+    response_model=NomenclatureResponse,
+    responses={404: {"description": "Номенклатура не найдена", "model": ErrorDetail}},
+    summary="Карточка товара",
+    description=(
+        "Один товар по ID. Читается через кэш горячей номенклатуры процесса "
+        "(инвалидируется после commit изменений, TTL — NOMENCLATURE_CACHE_TTL_SECONDS)."
+    ),
+    dependencies=[Depends(admit_read)],
+)
+async def get_nomenclature_endpoint(
+    nomenclature_id: int,
+    session: AsyncSession = Depends(db_helper.get_read_session),
+) -> NomenclatureResponse:
+    """GET: карточка товара."""
+    try:
+        return await get_nomenclature(session, nomenclature_id)
+    except NomenclatureNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -1,18 +1,151 @@
-"""REST-API заказов: добавление товара в заказ."""
+"""REST-API заказов: создание и повтор, добавление товара, оформление, чтение заказов (с архивом)."""
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from api.admission import ADMISSION_RESPONSES, admit_read, admit_write
 from database.db_helper import db_helper
+from settings.config import settings
 from exceptions import (
+    ClientNotFoundError,
     InsufficientStockError,
     NomenclatureNotFoundError,
+    OrderAlreadyCheckedOutError,
+    OrderLinesShortageError,
     OrderNotFoundError,
+    OrderStockShortageError,
 )
-from schemas.order import AddItemToOrderRequest, ErrorDetail, OrderItemResponse
-from services.order_service import add_product_to_order
+from schemas.order import (
+    AddItemToOrderRequest,
+    CheckoutErrorDetail,
+    CheckoutShortageDetail,
+    CreateOrderRequest,
+    ErrorDetail,
+    OrderCheckoutResponse,
+    OrderCloneResponse,
+    OrderItemResponse,
+    OrderPage,
+    OrderResponse,
+    ShortLine,
+)
+from services.order_service import (
+    add_product_to_order,
+    checkout_order,
+    clone_order,
+    create_order,
+    get_order,
+    list_client_orders,
+)
+
+# Допуск (api/admission): запись и чтение — разные лимитеры
+router = APIRouter(
+    prefix="/orders",
+    tags=["Заказы"],
+    responses=ADMISSION_RESPONSES,
+)
+
+_INCLUDE_ARCHIVED = Query(
+    False, description="Искать также в архиве заказов (оформленные заказы старше ORDER_ARCHIVE_AFTER_DAYS)"
+)
+
 
-router = APIRouter(prefix="/orders", tags=["Заказы"])
+@router.get(
+    "/",
+    response_model=OrderPage,
+    summary="Заказы клиента",
+    description=(
+        "Заказы клиента с позициями, от новых к старым; следующая страница — before_id=next_before_id. "
+        "С include_archived=true в выдачу входят и архивные заказы (UNION ALL с архивом)."
+    ),
+    dependencies=[Depends(admit_read)],
+)
+async def list_client_orders_endpoint(
+    client_id: int = Query(..., gt=0, description="ID клиента"),
+    limit: int = Query(50, ge=1, le=200),
+    before_id: int | None = Query(None, description="Только заказы с ID меньше этого"),
+    include_archived: bool = _INCLUDE_ARCHIVED,
+    session: AsyncSession = Depends(db_helper.get_read_session),
+) -> OrderPage:
+    """GET: страница заказов клиента."""
+    return await list_client_orders(session, client_id, limit, before_id, include_archived)
+
+
+def _shortage_error(e: OrderStockShortageError | OrderLinesShortageError) -> HTTPException:
+    """400 со списком позиций, которые остаток не покрывает."""
+    detail = CheckoutShortageDetail(
+        message=str(e),
+        short_lines=[
+            ShortLine(nomenclature_id=nid, requested=requested, available=available)
+            for nid, requested, available in e.short_lines
+        ],
+    )
+    return HTTPException(status_code=400, detail=detail.model_dump(mode="json"))
+
+
+@router.post(
+    "/",
+    response_model=OrderResponse,
+    status_code=201,
+    responses={
+        400: {
+            "description": "Не хватает товара по части позиций (или слишком много позиций); заказ не создан",
+            "model": CheckoutErrorDetail,
+        },
+        404: {
+            "description": "Клиент или номенклатура не найдены",
+            "model": ErrorDetail,
+        },
+    },
+    summary="Создать заказ",
+    dependencies=[Depends(admit_write)],
+    description=(
+        "Создаёт заказ клиента с начальными позициями: INSERT заказа и один INSERT ... SELECT "
+        "всех позиций с проверкой остатка в том же запросе. Если остатка не хватает хотя бы "
+        "по одной позиции — заказ не создаётся, возвращается 400 со списком таких позиций."
+    ),
+)
+async def create_order_endpoint(
+    body: CreateOrderRequest,
+    session: AsyncSession = Depends(db_helper.get_session),
+) -> OrderResponse:
+    """POST: новый заказ с позициями (корзина → заказ одним запросом)."""
+    if len(body.lines) > settings.order_max_lines:
+        raise HTTPException(
+            status_code=400, detail=f"lines: не больше {settings.order_max_lines} позиций"
+        )
+    try:
+        return await create_order(
+            session,
+            body.client_id,
+            [(line.nomenclature_id, line.quantity) for line in body.lines],
+        )
+    except (ClientNotFoundError, NomenclatureNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except OrderLinesShortageError as e:
+        raise _shortage_error(e)
+
+
+@router.get(
+    "/{order_id}",
+    response_model=OrderResponse,
+    responses={404: {"description": "Заказ не найден", "model": ErrorDetail}},
+    summary="Заказ с позициями",
+    description=(
+        "Заказ и его позиции. Архивный заказ находится только с include_archived=true "
+        "(в ответе archived=true)."
+    ),
+    dependencies=[Depends(admit_read)],
+)
+async def get_order_endpoint(
+    order_id: int,
+    include_archived: bool = _INCLUDE_ARCHIVED,
+    session: AsyncSession = Depends(db_helper.get_read_session),
+) -> OrderResponse:
+    """GET: заказ по ID."""
+    try:
+        return await get_order(session, order_id, include_archived)
+    except OrderNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
 @router.post(
@@ -27,8 +160,13 @@ router = APIRouter(prefix="/orders", tags=["Заказы"])
             "description": "Заказ или номенклатура не найдены",
             "model": ErrorDetail,
         },
+        409: {
+            "description": "Заказ уже оформлен",
+            "model": ErrorDetail,
+        },
     },
     summary="Добавить товар в заказ",
+    dependencies=[Depends(admit_write)],
     description=(
         "Принимает ID заказа, ID номенклатуры и количество. "
         "Если товар уже есть в заказе — количество увеличивается (новая позиция не создаётся). "
@@ -60,8 +198,79 @@ async def add_item_to_order(
         raise HTTPException(status_code=404, detail=str(e))
     except NomenclatureNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except OrderAlreadyCheckedOutError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except InsufficientStockError as e:
         raise HTTPException(
             status_code=400,
             detail=f"Товара нет в наличии в нужном количестве. Доступно: {e.available}, запрошено: {e.requested}",
         )
+
+
+@router.post(
+    "/{order_id}/checkout",
+    response_model=OrderCheckoutResponse,
+    responses={
+        400: {
+            "description": "Не хватает товара по части позиций; заказ не оформлен",
+            "model": CheckoutErrorDetail,
+        },
+        404: {
+            "description": "Заказ не найден",
+            "model": ErrorDetail,
+        },
+        409: {
+            "description": "Заказ уже оформлен",
+            "model": ErrorDetail,
+        },
+    },
+    summary="Оформить заказ",
+    dependencies=[Depends(admit_write)],
+    description=(
+        "Списывает остатки по всем позициям заказа одним запросом и помечает заказ оформленным. "
+        "Если хотя бы одной позиции не хватает остатка — ничего не списывается, "
+        "возвращается ошибка 400 со списком таких позиций."
+    ),
+)
+async def checkout_order_endpoint(
+    order_id: int,
+    session: AsyncSession = Depends(db_helper.get_session),
+) -> OrderCheckoutResponse:
+    """POST: оформление заказа (резервирование остатков по всем позициям сразу)."""
+    try:
+        return await checkout_order(session, order_id)
+    except OrderNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except OrderAlreadyCheckedOutError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except OrderStockShortageError as e:
+        raise _shortage_error(e)
+
+
+@router.post(
+    "/{order_id}/clone",
+    response_model=OrderCloneResponse,
+    status_code=201,
+    responses={
+        404: {
+            "description": "Заказ (или его клиент) не найден",
+            "model": ErrorDetail,
+        },
+    },
+    summary="Повторить заказ",
+    dependencies=[Depends(admit_write)],
+    description=(
+        "Создаёт новый заказ того же клиента и копирует в него позиции исходного заказа "
+        "(в том числе архивного) одним INSERT ... SELECT. Позиции, которые текущий остаток "
+        "не покрывает, не копируются и возвращаются в short_lines."
+    ),
+)
+async def clone_order_endpoint(
+    order_id: int,
+    session: AsyncSession = Depends(db_helper.get_session),
+) -> OrderCloneResponse:
+    """POST: повтор заказа."""
+    try:
+        return await clone_order(session, order_id)
+    except (OrderNotFoundError, ClientNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -0,0 +1,28 @@
+"""Прогрев воркера перед приёмом запросов: пул соединений и кэши каталога."""
+
+import logging
+import time
+
+from api.conditional import prime_catalog_response
+from database.db_helper import db_helper
+from schemas.category import CategoryResponse, CategoryTreeItem
+from services.category_service import get_category_tree, list_categories
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up() -> None:
+    """
+    Открыть соединения пула и построить тела ответов категорий для текущей версии
+    каталога (ключи как в api/categories.py), чтобы первые запросы не платили за это.
+    """
+    started = time.perf_counter()
+    await db_helper.warm_pool()
+    async with db_helper.read_session_factory() as session:
+        await prime_catalog_response(
+            session, "categories", list[CategoryResponse], lambda: list_categories(session)
+        )
+        await prime_catalog_response(
+            session, "categories-tree", list[CategoryTreeItem], lambda: get_category_tree(session)
+        )
+    logger.info("Прогрев завершён за %.3f с", time.perf_counter() - started)
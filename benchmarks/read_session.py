@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сессий чтения: накладные расходы транзакции на GET.
+
+Один и тот же обработчик чтения (версия каталога + товары по ID) выполняется
+--rounds раундов по --requests запросов через зависимость get_session (BEGIN/COMMIT, сброс соединения
+при возврате в пул) и через get_read_session (autocommit, без commit).
+Печатает медиану по раундам среднего времени запроса (мкс) и их отношение.
+
+БД — временный SQLite-файл, созданный scripts/migrate.py и заполненный
+--rows товарами. Если read_ms / write_ms больше бюджета
+read_session.max_ratio из benchmarks/budgets.json — код выхода 1.
+
+    python benchmarks/read_session.py
+    python benchmarks/read_session.py --requests 2000 --rounds 7
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGETS = Path(__file__).resolve().parent / "budgets.json"
+
+
+async def _seed(helper, rows: int) -> None:
+    from sqlalchemy import insert
+
+    from database.models import Nomenclature
+
+    async with helper.session_factory() as session:
+        await session.execute(
+            insert(Nomenclature),
+            [{"name": f"Товар {i}", "quantity": i, "price": i} for i in range(1, rows + 1)],
+        )
+        await session.commit()
+
+
+async def _run(dependency, requests: int, ids: list[int]) -> float:
+    """Среднее время обработчика с зависимостью dependency (мкс)."""
+    from repositories import CatalogRepository, NomenclatureRepository
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        sessions = dependency()
+        session = await anext(sessions)
+        await CatalogRepository(session).get_version()
+        await NomenclatureRepository(session).get_many(ids)
+        # Как FastAPI: генератор зависимости доходит до конца (commit в get_session)
+        async for _ in sessions:
+            pass
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+async def _bench(database_url: str, requests: int, rows: int, rounds: int) -> tuple[float, float]:
+    from database.db_helper import DatabaseHelper
+
+    helper = DatabaseHelper(database_url)
+    await _seed(helper, rows)
+    ids = list(range(1, min(rows, 20) + 1))
+    # Прогрев: соединения пулов и кэш планов
+    await _run(helper.get_session, 50, ids)
+    await _run(helper.get_read_session, 50, ids)
+    # Варианты чередуются по раундам, берётся медиана — шум машины делится поровну
+    write_runs, read_runs = [], []
+    for _ in range(rounds):
+        write_runs.append(await _run(helper.get_session, requests, ids))
+        read_runs.append(await _run(helper.get_read_session, requests, ids))
+    await helper.dispose()
+    return statistics.median(write_runs), statistics.median(read_runs)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк сессий чтения")
+    parser.add_argument("--requests", type=int, default=500, help="запросов в раунде")
+    parser.add_argument("--rounds", type=int, default=5, help="раундов на вариант (медиана)")
+    parser.add_argument("--rows", type=int, default=1000, help="товаров в БД")
+    args = parser.parse_args()
+
+    budget = json.loads(BUDGETS.read_text())["read_session"]["max_ratio"]
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        subprocess.run(
+            [sys.executable, "scripts/migrate.py"],
+            cwd=ROOT,
+            env={**os.environ, "DATABASE_URL": database_url},
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        sys.path.insert(0, str(ROOT))
+        write_us, read_us = asyncio.run(
+            _bench(database_url, args.requests, args.rows, args.rounds)
+        )
+
+    ratio = read_us / write_us
+    status = "OK" if ratio <= budget else "REGRESSION"
+    print(f"{'get_session':>18}: {write_us:8.1f} мкс/запрос")
+    print(f"{'get_read_session':>18}: {read_us:8.1f} мкс/запрос")
+    print(f"{'ratio':>18}: {ratio:8.2f} (бюджет {budget}) {status}")
+    return 0 if ratio <= budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк режима хранения чисел: NUMERIC/Decimal против целых (STORAGE_SCALED_NUMBERS).
+
+Каждый замер — отдельный процесс (режим выбирается при импорте моделей) с
+временной SQLite-БД, созданной migrate() и заполненной --rows товарами;
+процессы режимов чередуются --processes раз. Меряется медиана по раундам:
+
+- read — строки (id, quantity, price) без ORM: чистая цена чтения чисел;
+- list — все товары через NomenclatureRepository.get_all() и сериализация в
+  NomenclatureResponse (как GET /api/nomenclature/);
+- aggregate — SUM(quantity), SUM(price) и число товаров по категориям.
+
+Печатает время (мс) и отношение scaled / decimal. Если отношение для read
+больше бюджета scaled_numbers.max_ratio из benchmarks/budgets.json — код
+выхода 1 (list шумнее: в нём доминируют ORM и pydantic).
+
+    python benchmarks/scaled_numbers.py
+    python benchmarks/scaled_numbers.py --rows 50000 --rounds 7 --processes 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGETS = Path(__file__).resolve().parent / "budgets.json"
+
+
+async def _child(database_url: str, rows: int, rounds: int) -> dict[str, float]:
+    """Замер в текущем процессе (режим — из STORAGE_SCALED_NUMBERS окружения)."""
+    from decimal import Decimal
+
+    from sqlalchemy import func, insert, select
+
+    from database.db_helper import DatabaseHelper
+    from database.migrations import migrate
+    from database.models import Nomenclature
+    from repositories import NomenclatureRepository
+    from schemas.nomenclature import NomenclatureResponse
+
+    migrate(database_url)
+    helper = DatabaseHelper(database_url)
+    async with helper.session_factory() as session:
+        await session.execute(
+            insert(Nomenclature),
+            [
+                {
+                    "name": f"Товар {i}",
+                    "quantity": Decimal(i % 1000) / 4,
+                    "price": Decimal(i % 100_000) / 100,
+                    "category_id": None,
+                }
+                for i in range(1, rows + 1)
+            ],
+        )
+        await session.commit()
+
+    aggregate = select(
+        Nomenclature.category_id,
+        func.sum(Nomenclature.quantity),
+        func.sum(Nomenclature.price),
+        func.count(),
+    ).group_by(Nomenclature.category_id)
+
+    read = select(Nomenclature.id, Nomenclature.quantity, Nomenclature.price)
+
+    async def run_read() -> None:
+        async with helper.read_session_factory() as session:
+            (await session.execute(read)).all()
+
+    async def run_list() -> None:
+        async with helper.read_session_factory() as session:
+            items = await NomenclatureRepository(session).get_all()
+            [NomenclatureResponse.model_validate(item) for item in items]
+
+    async def run_aggregate() -> None:
+        async with helper.read_session_factory() as session:
+            (await session.execute(aggregate)).all()
+
+    results: dict[str, float] = {}
+    for name, run in (("read", run_read), ("list", run_list), ("aggregate", run_aggregate)):
+        await run()
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await run()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = statistics.median(timings)
+    await helper.dispose()
+    return results
+
+
+def _measure(scaled: bool, rows: int, rounds: int) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        result = subprocess.run(
+            [sys.executable, __file__, "--child", "--rows", str(rows), "--rounds", str(rounds)],
+            cwd=ROOT,
+            env={
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+                "STORAGE_SCALED_NUMBERS": str(scaled).lower(),
+            },
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return json.loads(result.stdout)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк хранения чисел целыми")
+    parser.add_argument("--rows", type=int, default=20000, help="товаров в БД")
+    parser.add_argument("--rounds", type=int, default=5, help="раундов на замер (медиана)")
+    parser.add_argument("--processes", type=int, default=3, help="процессов на режим (медиана)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, str(ROOT))
+        from settings.config import settings
+
+        print(json.dumps(asyncio.run(_child(settings.database_url, args.rows, args.rounds))))
+        return 0
+
+    budget = json.loads(BUDGETS.read_text())["scaled_numbers"]["max_ratio"]
+    runs: dict[bool, list[dict[str, float]]] = {False: [], True: []}
+    for _ in range(args.processes):
+        for scaled in (False, True):
+            runs[scaled].append(_measure(scaled, args.rows, args.rounds))
+    decimal_ms, scaled_ms = (
+        {name: statistics.median(run[name] for run in runs[scaled]) for name in runs[scaled][0]}
+        for scaled in (False, True)
+    )
+    print(f"{'':>10} {'decimal, мс':>12} {'scaled, мс':>12} {'ratio':>7}")
+    for name in decimal_ms:
+        ratio = scaled_ms[name] / decimal_ms[name]
+        print(f"{name:>10} {decimal_ms[name]:12.2f} {scaled_ms[name]:12.2f} {ratio:7.2f}")
+    ratio = scaled_ms["read"] / decimal_ms["read"]
+    status = "OK" if ratio <= budget else "REGRESSION"
+    print(f"read ratio {ratio:.2f} (бюджет {budget}) {status}")
+    return 0 if ratio <= budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
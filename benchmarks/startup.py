@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк старта приложения с бюджетом на регрессию.
+
+Меряет два числа (медиана по --runs запускам, каждый — новый процесс):
+
+- import_ms — время импорта main (python -X importtime -c "import main",
+  кумулятивное время модуля main);
+- first_request_ms — от запуска uvicorn до первого успешного ответа
+  GET /api/categories/ (старт процесса, импорт, lifespan: проверка версии
+  схемы и прогрев, первый запрос к БД).
+
+БД — временный SQLite-файл, созданный scripts/migrate.py до замеров
+(миграция в замер не входит, как и при развёртывании). Если медиана больше
+бюджета из benchmarks/budgets.json — код выхода 1.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGETS = Path(__file__).resolve().parent / "budgets.json"
+
+
+def _env(database_url: str) -> dict[str, str]:
+    return {**os.environ, "DATABASE_URL": database_url, "RUN_WARMUP": "true"}
+
+
+def measure_import(env: dict[str, str]) -> tuple[float, list[tuple[float, str]]]:
+    """Время импорта main (мс) и самые дорогие модули по собственному времени."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    modules: list[tuple[float, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[12:].split("|"))
+        modules.append((int(self_us) / 1000, name))
+        if name == "main":
+            total_us = int(cumulative_us)
+    modules.sort(reverse=True)
+    return total_us / 1000, modules
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_request(env: dict[str, str], timeout: float = 30.0) -> float:
+    """Время от запуска uvicorn до первого ответа 200 (мс)."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/api/categories/"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level=warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn завершился с кодом {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise TimeoutError(f"Нет ответа от {url} за {timeout} с")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк старта приложения")
+    parser.add_argument("--runs", type=int, default=3, help="число запусков (медиана)")
+    parser.add_argument("--top", type=int, default=10, help="сколько дорогих модулей показать")
+    args = parser.parse_args()
+
+    budgets = json.loads(BUDGETS.read_text())["startup"]
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(f"sqlite:///{tmp}/bench.db")
+        subprocess.run(
+            [sys.executable, "scripts/migrate.py"],
+            cwd=ROOT,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        # Первый импорт компилирует .pyc — в замер не входит
+        measure_import(env)
+
+        import_runs = [measure_import(env) for _ in range(args.runs)]
+        first_request_runs = [measure_first_request(env) for _ in range(args.runs)]
+
+    results = {
+        "import_ms": statistics.median(run[0] for run in import_runs),
+        "first_request_ms": statistics.median(first_request_runs),
+    }
+    print(f"Самые дорогие модули (собственное время, мс), top {args.top}:")
+    for self_ms, name in import_runs[-1][1][: args.top]:
+        print(f"  {self_ms:8.1f}  {name}")
+
+    failed = False
+    for name, value in results.items():
+        budget = budgets[name]
+        status = "OK" if value <= budget else "REGRESSION"
+        failed |= value > budget
+        print(f"{name:>18}: {value:8.1f} мс (бюджет {budget} мс) {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,15 +2,31 @@
 
 from database.base import Base, get_engine, get_session_factory, init_db
 from database.db_helper import db_helper
-from database.models import Category, Client, Nomenclature, Order, OrderItem
+from database.models import (
+    CatalogState,
+    CatalogTombstone,
+    Category,
+    Client,
+    Nomenclature,
+    NomenclatureStockShard,
+    Order,
+    OrderItem,
+    SchemaVersion,
+    StockHold,
+)
 
 __all__ = [
     "Base",
+    "CatalogState",
+    "CatalogTombstone",
     "Category",
     "Client",
     "Nomenclature",
+    "NomenclatureStockShard",
     "Order",
     "OrderItem",
+    "SchemaVersion",
+    "StockHold",
     "db_helper",
     "get_engine",
     "get_session_factory",
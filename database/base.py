@@ -35,10 +35,10 @@ def get_session_factory(engine=None):
 
 def init_db(database_url: str | None = None) -> None:
     """
-    Создаёт все таблицы в БД.
+    Создаёт таблицы и приводит схему к текущей версии (database.migrations.migrate).
 
-    Вызывать при старте приложения или в скриптах инициализации.
+    Для скриптов инициализации; приложение при старте схему не создаёт.
     """
-    import database.models  # noqa: F401 — регистрируем таблицы в Base.metadata
-    engine = get_engine(database_url)
-    Base.metadata.create_all(bind=engine)
+    from database.migrations import migrate  # migrations импортирует модели и Base
+
+    migrate(database_url)
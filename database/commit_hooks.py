@@ -0,0 +1,85 @@
+"""
+Уведомления об изменениях каталога после commit.
+
+Сервисы отмечают изменённые строки через track_changes(session, ...), а
+DatabaseHelper.get_session после успешного commit один раз вызывает все
+зарегистрированные хуки с накопленными ID. Так кэши и подписчики
+инвалидируются раз на транзакцию (пакет), а не на каждую строку.
+При rollback накопленные изменения отбрасываются.
+
+on_close регистрирует в сессии колбэк, который DatabaseHelper вызывает при
+закрытии сессии запроса (run_close_callbacks), — например, отмена
+незавершённых пакетных загрузок (repositories.loader).
+"""
+
+import inspect
+import logging
+from collections.abc import Awaitable, Callable, Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+_SESSION_KEY = "catalog_changes"
+_CLOSE_KEY = "close_callbacks"
+
+# Таблица -> множество изменённых ID
+CatalogChanges = dict[str, set[int]]
+CommitHook = Callable[[CatalogChanges], Awaitable[None] | None]
+
+_hooks: list[CommitHook] = []
+
+
+def register_commit_hook(hook: CommitHook) -> None:
+    """Зарегистрировать хук, вызываемый после commit транзакции с изменениями каталога."""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def unregister_commit_hook(hook: CommitHook) -> None:
+    """Отменить регистрацию хука."""
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def track_changes(session: AsyncSession, table: str, ids: Iterable[int]) -> None:
+    """Отметить строки таблицы каталога как изменённые в текущей транзакции."""
+    changes: CatalogChanges = session.info.setdefault(_SESSION_KEY, {})
+    changes.setdefault(table, set()).update(ids)
+
+
+def discard_changes(session: AsyncSession) -> None:
+    """Сбросить накопленные изменения (после rollback)."""
+    session.info.pop(_SESSION_KEY, None)
+
+
+async def run_commit_hooks(session: AsyncSession) -> None:
+    """
+    Вызвать хуки с изменениями, накопленными в сессии, и очистить их.
+
+    Ошибка хука логируется и не влияет на уже закоммиченную транзакцию.
+    """
+    changes: CatalogChanges | None = session.info.pop(_SESSION_KEY, None)
+    if not changes:
+        return
+    for hook in list(_hooks):
+        try:
+            result = hook(changes)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception("Ошибка хука после commit: %r", hook)
+
+
+def on_close(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Вызвать callback при закрытии сессии запроса (когда обработчик завершился)."""
+    session.info.setdefault(_CLOSE_KEY, []).append(callback)
+
+
+def run_close_callbacks(session: AsyncSession) -> None:
+    """Вызвать и очистить колбэки закрытия сессии; ошибка колбэка логируется."""
+    for callback in session.info.pop(_CLOSE_KEY, ()):
+        try:
+            callback()
+        except Exception:
+            logger.exception("Ошибка колбэка закрытия сессии: %r", callback)
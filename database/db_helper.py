@@ -2,27 +2,80 @@
 Подключение к БД: асинхронный движок и сессии.
 
 DatabaseHelper инкапсулирует engine и session_factory.
-get_session — зависимость FastAPI с автоматическим commit/rollback транзакции.
+get_session — зависимость FastAPI с автоматическим commit/rollback транзакции
+и вызовом хуков изменений каталога (database.commit_hooks) после commit.
+get_read_session — зависимость для GET: отдельный пул соединений в режиме
+autocommit и только для чтения, без BEGIN/COMMIT на запрос.
+Получение соединения из пула, flush, commit и SQL-запросы попадают в трассу
+запроса (monitoring.tracing).
 """
 
+import asyncio
 from collections.abc import AsyncGenerator
+from contextlib import AsyncExitStack
 
+from sqlalchemy import event, text
+from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from database.commit_hooks import discard_changes, run_close_callbacks, run_commit_hooks
+from database.deadline import install_deadline
+from monitoring.tracing import instrument_engine, tracer
 from settings.config import settings
 
 
+class TracedPool(AsyncAdaptedQueuePool):
+    """Пул соединений с интервалом трассы на получение соединения (ожидание свободного)."""
+
+    def _do_get(self):
+        span = tracer.start_span("pool.checkout", "db")
+        try:
+            connection = super()._do_get()
+        except BaseException as e:
+            tracer.end_span(span, e)
+            raise
+        tracer.end_span(span)
+        return connection
+
+
+class TracedSession(Session):
+    """Сессия записи: flush — отдельный интервал трассы."""
+
+    def flush(self, objects=None) -> None:
+        with tracer.span("session.flush", "db"):
+            super().flush(objects)
+
+
+class ReadOnlySession(Session):
+    """Сессия чтения: flush с изменениями запрещён (до БД они всё равно не дойдут)."""
+
+    def flush(self, objects=None) -> None:
+        if self.new or self.dirty or self.deleted:
+            raise InvalidRequestError("Сессия только для чтения: изменения не сохраняются")
+
+
+def _sqlite_query_only(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only = ON")
+    cursor.close()
+
+
 class DatabaseHelper:
     """
     Хелпер для работы с асинхронной БД.
 
     - Создаёт engine и session_factory при инициализации
     - get_session() — генератор сессии с commit при успехе, rollback при ошибке
+    - get_read_session() — сессия чтения: без транзакции, commit и flush
+    - warm_pool() — открыть соединения пула заранее, до приёма запросов
+    - wait_idle() — дождаться завершения открытых через get_session транзакций
     - dispose() — корректное закрытие пула соединений при остановке приложения
     """
 
@@ -48,16 +101,54 @@ class DatabaseHelper:
             pool_size=pool_size if "sqlite" not in async_url else 1,
             max_overflow=max_overflow if "sqlite" not in async_url else 0,
             connect_args=connect_args,
+            poolclass=TracedPool,
         )
         self.session_factory: async_sessionmaker[AsyncSession] = (
             async_sessionmaker(
                 bind=self.engine,
                 class_=AsyncSession,
+                sync_session_class=TracedSession,
                 autocommit=False,
                 autoflush=False,
                 expire_on_commit=False,
             )
         )
+        # Чтение: отдельный пул в autocommit (драйвер не открывает транзакцию,
+        # сбрасывать при возврате в пул нечего) и только для чтения на уровне
+        # соединения — PRAGMA query_only в SQLite, default_transaction_read_only
+        # в PostgreSQL (задаётся при подключении, без запросов на каждый вызов).
+        read_connect_args = dict(connect_args)
+        if "postgresql" in async_url:
+            read_connect_args["server_settings"] = {"default_transaction_read_only": "on"}
+        self.read_engine: AsyncEngine = create_async_engine(
+            async_url,
+            echo=echo,
+            echo_pool=echo_pool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            connect_args=read_connect_args,
+            poolclass=TracedPool,
+            isolation_level="AUTOCOMMIT",
+            pool_reset_on_return=None,
+        )
+        if "sqlite" in async_url:
+            event.listen(self.read_engine.sync_engine, "connect", _sqlite_query_only)
+        self.read_session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(
+            bind=self.read_engine,
+            class_=AsyncSession,
+            sync_session_class=ReadOnlySession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+        # Срок HTTP-запроса (database.deadline) ограничивает запросы к БД обоих пулов;
+        # каждый SQL-запрос — интервал трассы (monitoring.tracing)
+        for engine in (self.engine, self.read_engine):
+            install_deadline(engine)
+            instrument_engine(engine)
+        self._pool_size = pool_size if "sqlite" not in async_url else 1
+        self._active_sessions = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
 
     @staticmethod
     def _to_async_url(url: str) -> str:
@@ -68,24 +159,76 @@ class DatabaseHelper:
             return url.replace("postgresql://", "postgresql+asyncpg://", 1)
         return url
 
+    @property
+    def active_sessions(self) -> int:
+        """Число сессий get_session, транзакции которых ещё не завершены."""
+        return self._active_sessions
+
+    async def warm_pool(self) -> None:
+        """Открыть соединения пулов записи и чтения (SELECT 1 на каждом) и вернуть их в пул."""
+        async with AsyncExitStack() as stack:
+            for engine in (self.engine, self.read_engine):
+                for _ in range(self._pool_size):
+                    conn = await stack.enter_async_context(engine.connect())
+                    await conn.execute(text("SELECT 1"))
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Дождаться завершения всех транзакций get_session; False — истёк таймаут."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
     async def dispose(self) -> None:
-        """Закрывает пул соединений. Вызывать при shutdown приложения."""
+        """Закрывает пулы соединений. Вызывать при shutdown приложения."""
         await self.engine.dispose()
+        await self.read_engine.dispose()
 
     async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
         """
         Зависимость FastAPI: сессия БД с управлением транзакцией.
 
-        - При успешном завершении обработчика — commit
+        - При успешном завершении обработчика — commit, затем хуки изменений каталога
         - При исключении — rollback, исключение пробрасывается дальше
+        - До commit/rollback — колбэки закрытия сессии (database.commit_hooks.on_close)
+        """
+        self._active_sessions += 1
+        self._idle.clear()
+        try:
+            async with self.session_factory() as session:
+                try:
+                    try:
+                        yield session
+                    finally:
+                        # До commit/rollback: незавершённые загрузки не идут параллельно с ними
+                        run_close_callbacks(session)
+                    with tracer.span("session.commit", "db"):
+                        await session.commit()
+                except Exception:
+                    await session.rollback()
+                    discard_changes(session)
+                    raise
+                with tracer.span("commit_hooks", "db"):
+                    await run_commit_hooks(session)
+        finally:
+            self._active_sessions -= 1
+            if not self._active_sessions:
+                self._idle.set()
+
+    async def get_read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Зависимость FastAPI для GET: сессия без транзакции, commit и flush.
+
+        Каждый запрос выполняется в autocommit на соединении только для чтения,
+        поэтому несколько запросов одного обработчика не образуют общий снимок
+        данных. Попытка записи завершается ошибкой.
         """
-        async with self.session_factory() as session:
+        async with self.read_session_factory() as session:
             try:
                 yield session
-                await session.commit()
-            except Exception:
-                await session.rollback()
-                raise
+            finally:
+                run_close_callbacks(session)
 
 
 db_helper = DatabaseHelper(
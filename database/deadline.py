@@ -0,0 +1,138 @@
+"""
+Сроки (дедлайны) запросов к БД.
+
+deadline_scope(seconds) задаёт срок для текущего контекста (HTTP-запроса,
+см. api/deadline.py); install_deadline(engine) переносит его в БД:
+
+- перед каждым запросом: срок уже истёк — DeadlineExceededError без обращения
+  к БД; PostgreSQL — statement_timeout на остаток срока (заново, когда остаток
+  стал заметно меньше установленного; без срока — возврат к 0); SQLite —
+  остаток передаётся обработчику прогресса соединения, который прерывает
+  выполнение запроса;
+- отменённый по сроку запрос (57014 в PostgreSQL, interrupted в SQLite)
+  превращается в DeadlineExceededError.
+
+Соединение после прерывания исправно: сессия откатывает транзакцию и
+возвращает его в пул, следующий запрос получает свой statement_timeout.
+"""
+
+import math
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.util import await_only
+
+from exceptions import DeadlineExceededError
+
+# Виртуальных инструкций SQLite между вызовами обработчика прогресса
+SQLITE_PROGRESS_STEPS = 1000
+_PG_QUERY_CANCELED = "57014"
+# statement_timeout — int в миллисекундах
+_PG_MAX_TIMEOUT_MS = 2**31 - 1
+# statement_timeout обновляется, когда остаток срока меньше установленного на эту долю
+PG_TIMEOUT_REFRESH_RATIO = 0.1
+
+
+class Deadline:
+    """Срок выполнения: момент по time.monotonic()."""
+
+    __slots__ = ("seconds", "expires_at")
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+_current: ContextVar[Deadline | None] = ContextVar("db_deadline", default=None)
+
+
+def current_deadline() -> Deadline | None:
+    return _current.get()
+
+
+def remaining_seconds() -> float | None:
+    """Остаток срока текущего контекста (None — срока нет)."""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+@contextmanager
+def deadline_scope(seconds: float | None) -> Iterator[Deadline | None]:
+    """Срок для запросов к БД внутри блока; None — без срока (фоновые задачи)."""
+    deadline = Deadline(seconds) if seconds is not None else None
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def _check_expired(deadline: Deadline | None) -> None:
+    if deadline is not None and deadline.remaining() <= 0:
+        raise DeadlineExceededError(deadline.seconds)
+
+
+def _sqlite_connect(dbapi_connection, connection_record) -> None:
+    # Срок соединения меняется перед каждым запросом; обработчик читает его из потока aiosqlite
+    state: list[float | None] = [None]
+    connection_record.info["deadline_state"] = state
+
+    def progress() -> int:
+        expires_at = state[0]
+        return 1 if expires_at is not None and time.monotonic() >= expires_at else 0
+
+    await_only(
+        dbapi_connection.driver_connection.set_progress_handler(progress, SQLITE_PROGRESS_STEPS)
+    )
+
+
+def _sqlite_before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    deadline = _current.get()
+    _check_expired(deadline)
+    conn.info["deadline_state"][0] = None if deadline is None else deadline.expires_at
+
+
+def _pg_before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    deadline = _current.get()
+    _check_expired(deadline)
+    applied, applied_ms = conn.info.get("deadline_applied", (None, 0))
+    timeout_ms = 0
+    if deadline is not None:
+        timeout_ms = min(max(1, math.ceil(deadline.remaining() * 1000)), _PG_MAX_TIMEOUT_MS)
+    if applied is deadline and (
+        deadline is None or timeout_ms > applied_ms * (1 - PG_TIMEOUT_REFRESH_RATIO)
+    ):
+        # Тот же срок, и остаток почти не изменился: лишний запрос к БД не нужен
+        return
+    # set_config вместо SET: asyncpg выполняет запросы как подготовленные
+    cursor.execute(f"SELECT set_config('statement_timeout', '{timeout_ms}', false)")
+    conn.info["deadline_applied"] = (deadline, timeout_ms)
+
+
+def _handle_error(context) -> Exception | None:
+    deadline = _current.get()
+    if deadline is None:
+        return None
+    original = context.original_exception
+    code = getattr(original, "sqlstate", None) or getattr(original, "pgcode", None)
+    if code == _PG_QUERY_CANCELED or "interrupted" in str(original):
+        return DeadlineExceededError(deadline.seconds)
+    return None
+
+
+def install_deadline(engine: AsyncEngine) -> None:
+    """Подключить сроки запросов к движку (SQLite или PostgreSQL)."""
+    sync_engine = engine.sync_engine
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _sqlite_connect)
+        event.listen(sync_engine, "before_cursor_execute", _sqlite_before_execute)
+    elif sync_engine.dialect.name == "postgresql":
+        event.listen(sync_engine, "before_cursor_execute", _pg_before_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,465 @@
+"""
+Советчик по индексам на основе нагрузки.
+
+Нагрузка — список SQL-запросов с параметрами и числом повторов
+(WorkloadStatement): записанная WorkloadRecorder с движка приложения или
+загруженная из JSONL (save_workload / load_workload). analyze() для каждого
+запроса снимает план (EXPLAIN QUERY PLAN в SQLite, EXPLAIN (FORMAT JSON)
+в PostgreSQL) и время выполнения (только SELECT/WITH) и сообщает:
+
+- полные просмотры таблиц (SCAN без индекса / Seq Scan);
+- временные B-деревья для сортировки и группировки (USE TEMP B-TREE / Sort);
+- индексы таблиц из нагрузки, которые не встретились ни в одном плане;
+- предложения составных и частичных индексов. Кандидаты строятся по условиям
+  запроса (равенства, диапазон, ORDER BY, условия с константой для частичного
+  индекса) и проверяются на самой БД: индекс создаётся внутри SAVEPOINT,
+  планы и время перемеряются, затем SAVEPOINT откатывается. Выгода — разница
+  времени, умноженная на число повторов, и исчезнувшие просмотры/сортировки.
+
+Создание индекса-кандидата блокирует таблицу на запись — запускать на копии
+или реплике (scripts/index_advisor.py копирует файл SQLite сам). Планы зависят
+от объёма данных: на маленьких таблицах PostgreSQL выбирает Seq Scan всегда.
+"""
+
+import json
+import re
+import statistics
+import time
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Connection, event, inspect
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+_SAVEPOINT = "index_advisor"
+_CANDIDATE_PREFIX = "ix_advisor_candidate"
+
+_COLUMN_OP = re.compile(
+    r"\b(\w+)\.(\w+)\s*(=|!=|<>|>=|<=|>|<|\bIN\b|\bBETWEEN\b|\bIS NOT NULL\b|\bIS NULL\b|\bLIKE\b)\s*([^\s,)]*)",
+    re.IGNORECASE,
+)
+_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+AS)?\s+(\w+)", re.IGNORECASE)
+_ORDER_BY = re.compile(
+    r"\bORDER BY\s+(.+?)(?:\bLIMIT\b|\bOFFSET\b|\)\s*(?:AS\b|$)|$)", re.IGNORECASE | re.DOTALL
+)
+_ORDER_COLUMN = re.compile(r"\b(\w+)\.(\w+)")
+_SQLITE_ACCESS = re.compile(r"^(SCAN|SEARCH) (\w+)(?: AS (\w+))?(.*)$")
+_SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+_KEYWORDS = {"AND", "OR", "NOT", "WHERE", "ON", "SELECT", "LIMIT", "ORDER", "GROUP"}
+
+
+@dataclass
+class WorkloadStatement:
+    """Запрос нагрузки: SQL драйвера, параметры и число выполнений."""
+
+    sql: str
+    parameters: Any = None
+    count: int = 1
+
+    @property
+    def is_select(self) -> bool:
+        return self.sql.lstrip().upper().startswith(("SELECT", "WITH"))
+
+
+@dataclass
+class PlanFinding:
+    """Проблема плана: table_scan или temp_sort, таблица и строка плана."""
+
+    kind: str
+    table: str
+    detail: str
+
+
+@dataclass
+class StatementReport:
+    statement: WorkloadStatement
+    plan: list[str]
+    findings: list[PlanFinding]
+    used_indexes: set[str]
+    time_ms: float | None
+
+
+@dataclass
+class IndexProposal:
+    """Индекс-кандидат и его измеренный эффект на нагрузке."""
+
+    table: str
+    columns: list[str]
+    where: str | None
+    statements: int = 0
+    fixed_findings: int = 0
+    before_ms: float = 0.0
+    after_ms: float = 0.0
+    write_statements: int = 0
+
+    @property
+    def benefit_ms(self) -> float:
+        """Сэкономленное время на всю нагрузку (с учётом count)."""
+        return self.before_ms - self.after_ms
+
+    def ddl(self, name: str | None = None) -> str:
+        name = name or f"ix_{self.table}_{'_'.join(self.columns)}" + ("_partial" if self.where else "")
+        sql = f"CREATE INDEX {name} ON {self.table} ({', '.join(self.columns)})"
+        return f"{sql} WHERE {self.where}" if self.where else sql
+
+
+@dataclass
+class AdvisorReport:
+    statements: list[StatementReport]
+    unused_indexes: dict[str, list[str]] = field(default_factory=dict)
+    proposals: list[IndexProposal] = field(default_factory=list)
+
+
+class WorkloadRecorder:
+    """
+    Запись запросов движка (before_cursor_execute) в нагрузку.
+
+    Одинаковые (SQL, параметры) объединяются с увеличением count. Служебные
+    запросы (PRAGMA, set_config, EXPLAIN, SAVEPOINT) не записываются.
+    """
+
+    def __init__(self, *engines: AsyncEngine) -> None:
+        self._engines = [engine.sync_engine for engine in engines]
+        self._statements: dict[tuple[str, str], WorkloadStatement] = {}
+
+    def __enter__(self) -> "WorkloadRecorder":
+        for engine in self._engines:
+            event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        for engine in self._engines:
+            event.remove(engine, "before_cursor_execute", self._record)
+
+    @property
+    def statements(self) -> list[WorkloadStatement]:
+        return list(self._statements.values())
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        head = statement.lstrip().split(None, 1)[0].upper()
+        if head in {"PRAGMA", "EXPLAIN", "SAVEPOINT", "RELEASE", "ROLLBACK"} or "set_config(" in statement:
+            return
+        if executemany:
+            parameters = parameters[0] if parameters else None
+        parameters = _jsonable(parameters)
+        key = (statement, json.dumps(parameters, sort_keys=True))
+        if key in self._statements:
+            self._statements[key].count += 1
+        else:
+            self._statements[key] = WorkloadStatement(statement, parameters)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def save_workload(path: str | Path, statements: Iterable[WorkloadStatement]) -> None:
+    """Нагрузка в JSONL: {"sql", "parameters", "count"} на строку."""
+    with open(path, "w", encoding="utf-8") as f:
+        for statement in statements:
+            row = {"sql": statement.sql, "parameters": statement.parameters, "count": statement.count}
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def load_workload(path: str | Path) -> list[WorkloadStatement]:
+    statements = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                statements.append(
+                    WorkloadStatement(row["sql"], row.get("parameters"), row.get("count", 1))
+                )
+    return statements
+
+
+def _driver_parameters(parameters: Any) -> Any:
+    if parameters is None:
+        return ()
+    return tuple(parameters) if isinstance(parameters, list) else parameters
+
+
+async def _explain(conn: AsyncConnection, statement: WorkloadStatement, tables: set[str]):
+    """(строки плана, находки, использованные индексы) для одного запроса."""
+    if conn.dialect.name == "sqlite":
+        result = await conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + statement.sql, _driver_parameters(statement.parameters)
+        )
+        return _parse_sqlite_plan([(row[0], row[1], row[3]) for row in result.all()], tables)
+    result = await conn.exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + statement.sql, _driver_parameters(statement.parameters)
+    )
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return _parse_postgres_plan(plan[0]["Plan"], tables)
+
+
+def _parse_sqlite_plan(rows: list[tuple[int, int, str]], tables: set[str]):
+    lines: list[str] = []
+    findings: list[PlanFinding] = []
+    used: set[str] = set()
+    # Таблица последнего просмотра по родителю — ей приписывается сортировка
+    last_table: dict[int, str] = {}
+    first_table: str | None = None
+    for node_id, parent, detail in rows:
+        lines.append(detail)
+        match = _SQLITE_ACCESS.match(detail)
+        if match:
+            access, table, _, rest = match.groups()
+            if table not in tables:
+                continue
+            last_table[parent] = table
+            first_table = first_table or table
+            index = _SQLITE_INDEX.search(rest)
+            if index:
+                used.add(index.group(1))
+            elif access == "SCAN" and "VIRTUAL TABLE" not in rest and "PRIMARY KEY" not in rest:
+                findings.append(PlanFinding("table_scan", table, detail))
+        elif detail.startswith("USE TEMP B-TREE"):
+            table = last_table.get(parent) or first_table
+            if table is not None:
+                findings.append(PlanFinding("temp_sort", table, detail))
+    return lines, findings, used
+
+
+def _parse_postgres_plan(root: dict, tables: set[str]):
+    lines: list[str] = []
+    findings: list[PlanFinding] = []
+    used: set[str] = set()
+
+    def relations(node: dict) -> list[str]:
+        names = [node["Relation Name"]] if "Relation Name" in node else []
+        for child in node.get("Plans", []):
+            names.extend(relations(child))
+        return names
+
+    def walk(node: dict, depth: int) -> None:
+        node_type = node["Node Type"]
+        relation = node.get("Relation Name")
+        lines.append(
+            "  " * depth
+            + node_type
+            + (f" on {relation}" if relation else "")
+            + (f" using {node['Index Name']}" if "Index Name" in node else "")
+        )
+        if "Index Name" in node:
+            used.add(node["Index Name"])
+        if node_type == "Seq Scan" and relation in tables:
+            findings.append(PlanFinding("table_scan", relation, lines[-1].strip()))
+        if node_type in ("Sort", "Incremental Sort"):
+            below = [name for name in relations(node) if name in tables]
+            if below:
+                findings.append(PlanFinding("temp_sort", below[0], lines[-1].strip()))
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return lines, findings, used
+
+
+async def _time_ms(conn: AsyncConnection, statement: WorkloadStatement, repeat: int) -> float | None:
+    if not statement.is_select or repeat <= 0:
+        return None
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await conn.exec_driver_sql(statement.sql, _driver_parameters(statement.parameters))
+        result.all()
+        runs.append((time.perf_counter() - started) * 1000)
+    return statistics.median(runs)
+
+
+def _aliases(sql: str, tables: set[str]) -> dict[str, str]:
+    """Имя или псевдоним в запросе -> таблица."""
+    aliases = {table: table for table in tables}
+    for table, alias in _ALIAS.findall(sql):
+        if table in tables and alias.upper() not in _KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def candidate_indexes(sql: str, table: str, tables: set[str]) -> list[tuple[list[str], str | None]]:
+    """
+    Кандидаты (колонки, условие частичного индекса) для таблицы по тексту запроса.
+
+    Порядок колонок: равенства, затем диапазон или колонки ORDER BY. Условие
+    с константой (quantity > 0, x IS NULL) даёт частичный вариант индекса.
+    """
+    aliases = _aliases(sql, tables)
+    equality: list[str] = []
+    ranges: list[str] = []
+    constants: list[str] = []
+    for name, column, op, operand in _COLUMN_OP.findall(sql):
+        if aliases.get(name) != table:
+            continue
+        op = op.upper()
+        literal = operand not in ("?", "") and not operand.startswith(("$", "%", ":", "(")) and "." not in operand
+        if op in ("IS NULL", "IS NOT NULL") or (literal and op not in ("IN", "LIKE")):
+            constants.append(f"{column} {op}" + (f" {operand}" if op not in ("IS NULL", "IS NOT NULL") else ""))
+        elif op in ("=", "IN"):
+            equality.append(column)
+        elif op in (">", "<", ">=", "<=", "BETWEEN"):
+            ranges.append(column)
+    order: list[str] = []
+    order_match = _ORDER_BY.search(sql)
+    if order_match:
+        for name, column in _ORDER_COLUMN.findall(order_match.group(1)):
+            if aliases.get(name) == table:
+                order.append(column)
+
+    equality = list(dict.fromkeys(equality))
+    keys: list[list[str]] = []
+    if order:
+        keys.append(equality + [c for c in order if c not in equality])
+    if ranges:
+        keys.append(equality + [ranges[0]] + [c for c in order if c not in equality and c != ranges[0]])
+    if equality and not keys:
+        keys.append(equality)
+
+    candidates: list[tuple[list[str], str | None]] = []
+    for key in keys:
+        key = list(dict.fromkeys(key))
+        if key and (key, None) not in candidates:
+            candidates.append((key, None))
+        for constant in dict.fromkeys(constants):
+            partial_key = [c for c in key if not constant.startswith(c + " ")] or key
+            if (partial_key, constant) not in candidates:
+                candidates.append((partial_key, constant))
+    return candidates
+
+
+async def _existing_indexes(conn: AsyncConnection, tables: Iterable[str]) -> dict[str, list[dict]]:
+    def read(sync_conn: Connection) -> dict[str, list[dict]]:
+        inspector = inspect(sync_conn)
+        return {table: inspector.get_indexes(table) for table in tables}
+
+    return await conn.run_sync(read)
+
+
+def _statement_tables(sql: str, tables: set[str]) -> set[str]:
+    return {table for table in set(_aliases(sql, tables).values()) if re.search(rf"\b{table}\b", sql)}
+
+
+async def analyze(
+    engine: AsyncEngine,
+    workload: list[WorkloadStatement],
+    repeat: int = 5,
+    evaluate: bool = True,
+) -> AdvisorReport:
+    """Планы и время запросов нагрузки, неиспользуемые индексы и проверенные кандидаты."""
+    async with engine.connect() as conn:
+        tables = set(await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names()))
+        reports: list[StatementReport] = []
+        for statement in workload:
+            plan, findings, used = await _explain(conn, statement, tables)
+            reports.append(
+                StatementReport(statement, plan, findings, used, await _time_ms(conn, statement, repeat))
+            )
+        report = AdvisorReport(reports)
+
+        touched = set()
+        for item in reports:
+            touched |= _statement_tables(item.statement.sql, tables)
+        used_all = set().union(*(item.used_indexes for item in reports)) if reports else set()
+        existing = await _existing_indexes(conn, sorted(touched))
+        for table, indexes in existing.items():
+            unused = [index["name"] for index in indexes if index["name"] not in used_all]
+            if unused:
+                report.unused_indexes[table] = unused
+
+        if evaluate:
+            report.proposals = await _evaluate_candidates(conn, reports, tables, existing, repeat)
+        await conn.rollback()
+    return report
+
+
+async def _evaluate_candidates(
+    conn: AsyncConnection,
+    reports: list[StatementReport],
+    tables: set[str],
+    existing: dict[str, list[dict]],
+    repeat: int,
+) -> list[IndexProposal]:
+    existing_keys = {
+        (table, tuple(index["column_names"])) for table, indexes in existing.items() for index in indexes
+    }
+    writes: dict[str, int] = defaultdict(int)
+    for item in reports:
+        if not item.statement.is_select:
+            for table in _statement_tables(item.statement.sql, tables):
+                writes[table] += item.statement.count
+
+    proposals: dict[tuple[str, tuple[str, ...], str | None], IndexProposal] = {}
+    for item in reports:
+        for finding in item.findings:
+            for columns, where in candidate_indexes(item.statement.sql, finding.table, tables):
+                if where is None and (finding.table, tuple(columns)) in existing_keys:
+                    continue
+                key = (finding.table, tuple(columns), where)
+                if key not in proposals:
+                    proposals[key] = IndexProposal(
+                        finding.table, columns, where, write_statements=writes[finding.table]
+                    )
+
+    for number, proposal in enumerate(proposals.values()):
+        affected = [
+            item for item in reports if proposal.table in _statement_tables(item.statement.sql, tables)
+        ]
+        await conn.exec_driver_sql(f"SAVEPOINT {_SAVEPOINT}")
+        try:
+            await conn.exec_driver_sql(proposal.ddl(f"{_CANDIDATE_PREFIX}_{number}"))
+            for item in affected:
+                _, findings, _ = await _explain(conn, item.statement, tables)
+                before = [f for f in item.findings if f.table == proposal.table]
+                after = [f for f in findings if f.table == proposal.table]
+                proposal.fixed_findings += max(len(before) - len(after), 0)
+                if item.time_ms is not None:
+                    after_ms = await _time_ms(conn, item.statement, repeat)
+                    proposal.before_ms += item.time_ms * item.statement.count
+                    proposal.after_ms += after_ms * item.statement.count
+                proposal.statements += 1
+        finally:
+            await conn.exec_driver_sql(f"ROLLBACK TO SAVEPOINT {_SAVEPOINT}")
+            await conn.exec_driver_sql(f"RELEASE SAVEPOINT {_SAVEPOINT}")
+
+    useful = [p for p in proposals.values() if p.fixed_findings > 0 or p.benefit_ms > 0]
+    return sorted(useful, key=lambda p: (-p.fixed_findings, -p.benefit_ms))
+
+
+def format_report(report: AdvisorReport, top: int = 10) -> str:
+    """Текстовый отчёт для CLI."""
+    lines: list[str] = []
+    problems = [item for item in report.statements if item.findings]
+    lines.append(f"Запросов: {len(report.statements)}, с просмотрами/сортировками: {len(problems)}")
+    for item in sorted(problems, key=lambda i: -(i.time_ms or 0) * i.statement.count)[:top]:
+        timing = f"{item.time_ms:.2f} мс" if item.time_ms is not None else "DML"
+        lines.append(f"\n[{timing} x{item.statement.count}] {' '.join(item.statement.sql.split())[:160]}")
+        for finding in item.findings:
+            lines.append(f"  {finding.kind:<10} {finding.table}: {finding.detail}")
+    lines.append("\nНеиспользуемые индексы (таблицы из нагрузки):")
+    if not report.unused_indexes:
+        lines.append("  нет")
+    for table, names in sorted(report.unused_indexes.items()):
+        lines.append(f"  {table}: {', '.join(names)}")
+    lines.append("\nПредложения (убрано просмотров/сортировок, выгода мс на нагрузку, записей в таблицу):")
+    if not report.proposals:
+        lines.append("  нет")
+    for proposal in report.proposals[:top]:
+        lines.append(
+            f"  -{proposal.fixed_findings:<3} {proposal.benefit_ms:+9.2f} мс  w={proposal.write_statements:<4} "
+            f"{proposal.ddl()}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,323 @@
+"""
+Версия схемы БД и миграции.
+
+Схема создаётся и обновляется отдельной командой (scripts/migrate.py) один
+раз на развёртывание, а не при старте каждого воркера. Приложение при старте
+только сверяет версию — одно чтение строки schema_version через async-движок.
+
+- Пустая БД: create_all по текущим моделям и версия SCHEMA_VERSION.
+- БД без schema_version (создана до появления версий): версия считается 0,
+  применяются миграции 1..SCHEMA_VERSION; шаг 1 доводит исходную схему до
+  версии 1 (столбцы, индексы, таблицы версий каталога).
+- Иначе применяются миграции с версии из schema_version до SCHEMA_VERSION,
+  каждая в своей транзакции вместе с записью новой версии.
+
+Новая миграция: функция (Connection) -> None в MIGRATIONS под следующим
+номером и увеличение SCHEMA_VERSION; модели и sql_schema/*.sql обновляются
+так, чтобы create_all давал ту же схему.
+
+Режим хранения цен и количеств (database/types.py) записан в
+schema_version.scaled_numbers. Если он не совпадает с STORAGE_SCALED_NUMBERS,
+migrate() пересчитывает значения (и тип столбцов в PostgreSQL) в одной
+транзакции; check_schema_version() сверяет и его.
+"""
+
+from collections.abc import Callable
+
+from sqlalchemy import Column, Connection, inspect, select, text, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateColumn, CreateTable, Table
+
+from database.base import Base, get_engine
+from database.models import (
+    NOMENCLATURE_FTS_POSTGRESQL,
+    NOMENCLATURE_FTS_SQLITE,
+    ArchivedOrder,
+    ArchivedOrderItem,
+    CatalogState,
+    CatalogTombstone,
+    Category,
+    Nomenclature,
+    NomenclatureStockShard,
+    Order,
+    OrderItem,
+    SchemaVersion,
+    StockHold,
+)
+from database.types import SCALED_NUMBERS
+
+SCHEMA_VERSION = 7
+SCHEMA_VERSION_ID = 1
+
+# Таблица -> столбцы ScaledNumeric: (имя, precision, scale)
+SCALED_COLUMNS: dict[str, list[tuple[str, int, int]]] = {
+    "nomenclature": [("quantity", 18, 4), ("price", 18, 2)],
+    "nomenclature_stock_shards": [("quantity", 18, 4)],
+    "order_items": [("quantity", 18, 4)],
+    "order_items_archive": [("quantity", 18, 4)],
+    "stock_holds": [("quantity", 18, 4)],
+}
+
+
+def _add_column(conn: Connection, column: Column) -> None:
+    """ALTER TABLE ... ADD COLUMN по описанию столбца модели, если его ещё нет."""
+    table = column.table.name
+    if column.name not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        ddl = CreateColumn(column).compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {ddl}"))
+
+
+def _create_nomenclature_fts(conn: Connection) -> None:
+    """
+    Полнотекстовый индекс наименований по уже существующим строкам.
+
+    SQLite: FTS5-таблица и триггеры, затем индекс заполняется заново. Не
+    'rebuild' — он читает name из nomenclature как есть, а триггеры и запрос
+    приводят «ё» к «е». PostgreSQL: GIN-индекс строится по таблице сам.
+    """
+    if conn.dialect.name == "sqlite":
+        for statement in NOMENCLATURE_FTS_SQLITE:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO nomenclature_fts (nomenclature_fts) VALUES ('delete-all')"))
+        conn.execute(
+            text(
+                "INSERT INTO nomenclature_fts (rowid, name) "
+                "SELECT id, replace(replace(name, 'ё', 'е'), 'Ё', 'Е') FROM nomenclature"
+            )
+        )
+    elif conn.dialect.name == "postgresql":
+        for statement in NOMENCLATURE_FTS_POSTGRESQL:
+            conn.execute(text(statement))
+
+
+def _upgrade_unversioned_schema(conn: Connection) -> None:
+    """
+    1: исходная схема (до появления версий) — момент оформления заказа,
+    версии строк каталога, индексы витрины, полнотекстовый поиск, счётчик
+    версий и надгробия.
+    """
+    _add_column(conn, Order.__table__.c.checked_out_at)
+    _add_column(conn, Category.__table__.c.change_version)
+    _add_column(conn, Nomenclature.__table__.c.change_version)
+    # Заменён префиксом ix_nomenclature_category_price_id
+    conn.execute(text("DROP INDEX IF EXISTS ix_nomenclature_category_id"))
+    for table in (Category.__table__, Nomenclature.__table__, Order.__table__):
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    _create_nomenclature_fts(conn)
+    CatalogState.__table__.create(conn, checkfirst=True)
+    if conn.execute(select(CatalogState.id).where(CatalogState.id == 1)).first() is None:
+        conn.execute(CatalogState.__table__.insert().values(id=1, version=0))
+    CatalogTombstone.__table__.create(conn, checkfirst=True)
+
+
+def _create_order_archive(conn: Connection) -> None:
+    """2: архивные таблицы заказов (orders_archive, order_items_archive)."""
+    ArchivedOrder.__table__.create(conn, checkfirst=True)
+    ArchivedOrderItem.__table__.create(conn, checkfirst=True)
+
+
+def _add_scaled_numbers_flag(conn: Connection) -> None:
+    """3: schema_version.scaled_numbers — режим хранения цен и количеств (до него — NUMERIC)."""
+    _add_column(conn, SchemaVersion.__table__.c.scaled_numbers)
+
+
+def _add_stock_shards(conn: Connection) -> None:
+    """4: nomenclature.stock_shards и таблица шардов остатка nomenclature_stock_shards."""
+    _add_column(conn, Nomenclature.__table__.c.stock_shards)
+    NomenclatureStockShard.__table__.create(conn, checkfirst=True)
+
+
+def _create_stock_holds(conn: Connection) -> None:
+    """5: удержания остатка открытыми заказами (stock_holds)."""
+    StockHold.__table__.create(conn, checkfirst=True)
+
+
+def _add_stock_hold_shard(conn: Connection) -> None:
+    """6: stock_holds.shard — шард, под блокировкой которого записано удержание."""
+    _add_column(conn, StockHold.__table__.c.shard)
+    conn.execute(text("DROP INDEX IF EXISTS ix_stock_holds_nomenclature_expires"))
+    for index in StockHold.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _rebuild_with_autoincrement(conn: Connection, table: Table, archive: Table) -> None:
+    """
+    SQLite: пересоздать таблицу по модели (с AUTOINCREMENT) и продолжить
+    sqlite_sequence с наибольшего ID таблицы и её архива.
+
+    ALTER TABLE не добавляет AUTOINCREMENT, поэтому новая таблица создаётся
+    рядом, заполняется, старая удаляется, новая получает её имя; ссылки
+    других таблиц (REFERENCES по имени) продолжают указывать на неё.
+    """
+    new = f"{table.name}_autoincrement"
+    ddl = str(CreateTable(table).compile(dialect=conn.dialect)).strip()
+    conn.execute(text(ddl.replace(f"CREATE TABLE {table.name} (", f"CREATE TABLE {new} (", 1)))
+    columns = ", ".join(column.name for column in table.columns)
+    conn.execute(text(f"INSERT INTO {new} ({columns}) SELECT {columns} FROM {table.name}"))
+    conn.execute(text(f"DROP TABLE {table.name}"))
+    conn.execute(text(f"ALTER TABLE {new} RENAME TO {table.name}"))
+    for index in table.indexes:
+        index.create(conn)
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table.name})
+    conn.execute(
+        text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT :name, max("
+            f"coalesce((SELECT max(id) FROM {table.name}), 0), "
+            f"coalesce((SELECT max(id) FROM {archive.name}), 0))"
+        ),
+        {"name": table.name},
+    )
+
+
+def _autoincrement_order_ids(conn: Connection) -> None:
+    """
+    7: orders и order_items в SQLite — с AUTOINCREMENT: ID заказов и позиций,
+    перенесённых в архив, не выдаются новым строкам. В PostgreSQL
+    последовательности и так не возвращаются назад.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    if conn.execute(text("PRAGMA foreign_keys")).scalar():
+        # DROP TABLE orders каскадно удалил бы позиции и удержания
+        raise RuntimeError("Миграция 7 пересоздаёт таблицы: выполните её с PRAGMA foreign_keys = OFF")
+    _rebuild_with_autoincrement(conn, Order.__table__, ArchivedOrder.__table__)
+    _rebuild_with_autoincrement(conn, OrderItem.__table__, ArchivedOrderItem.__table__)
+
+
+# Версия -> шаг миграции с предыдущей версии
+MIGRATIONS: dict[int, Callable[[Connection], None]] = {
+    1: _upgrade_unversioned_schema,
+    2: _create_order_archive,
+    3: _add_scaled_numbers_flag,
+    4: _add_stock_shards,
+    5: _create_stock_holds,
+    6: _add_stock_hold_shard,
+    7: _autoincrement_order_ids,
+}
+
+
+class SchemaVersionError(RuntimeError):
+    """Версия схемы БД не совпадает с ожидаемой кодом."""
+
+
+def _read_version(conn: Connection) -> int | None:
+    if not inspect(conn).has_table(SchemaVersion.__tablename__):
+        return None
+    return conn.execute(
+        select(SchemaVersion.version).where(SchemaVersion.id == SCHEMA_VERSION_ID)
+    ).scalar()
+
+
+def _write_version(
+    conn: Connection, version: int, *, insert: bool = False, scaled_numbers: bool = False
+) -> None:
+    if insert:
+        conn.execute(
+            SchemaVersion.__table__.insert().values(
+                id=SCHEMA_VERSION_ID, version=version, scaled_numbers=scaled_numbers
+            )
+        )
+    else:
+        conn.execute(
+            update(SchemaVersion).where(SchemaVersion.id == SCHEMA_VERSION_ID).values(version=version)
+        )
+
+
+def _convert_numbers(conn: Connection, scaled: bool) -> None:
+    """Пересчитать цены и количества в целые (scaled) или обратно в NUMERIC."""
+    postgres = conn.dialect.name == "postgresql"
+    for table, columns in SCALED_COLUMNS.items():
+        if postgres:
+            for name, precision, scale in columns:
+                expr = (
+                    f"round({name} * {10**scale})::bigint"
+                    if scaled
+                    else f"({name}::numeric / {10**scale})::numeric({precision}, {scale})"
+                )
+                new_type = "BIGINT" if scaled else f"NUMERIC({precision}, {scale})"
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {name} TYPE {new_type} USING {expr}"))
+        else:
+            assignments = ", ".join(
+                f"{name} = CAST(ROUND({name} * {10**scale}) AS INTEGER)"
+                if scaled
+                else f"{name} = {name} / {10**scale}.0"
+                for name, _, scale in columns
+            )
+            conn.execute(text(f"UPDATE {table} SET {assignments}"))
+    conn.execute(
+        update(SchemaVersion)
+        .where(SchemaVersion.id == SCHEMA_VERSION_ID)
+        .values(scaled_numbers=scaled)
+    )
+
+
+def migrate(database_url: str | None = None, scaled_numbers: bool = SCALED_NUMBERS) -> tuple[int, int]:
+    """
+    Привести схему БД к SCHEMA_VERSION, а хранение цен и количеств — к режиму scaled_numbers.
+
+    :return: (версия до, версия после); 0 — БД была пустой или без версии
+    """
+    engine = get_engine(database_url)
+    try:
+        with engine.begin() as conn:
+            current = _read_version(conn)
+            start = current or 0
+            if current is None:
+                if inspect(conn).get_table_names():
+                    # Исходная схема без версии: все шаги, начиная с 1; данные в
+                    # ней — NUMERIC, режим хранения пересчитывается ниже
+                    SchemaVersion.__table__.create(conn)
+                    _write_version(conn, 0, insert=True)
+                    current = 0
+                else:
+                    # create_all строит столбцы в режиме, с которым импортированы модели
+                    Base.metadata.create_all(conn)
+                    _write_version(conn, SCHEMA_VERSION, insert=True, scaled_numbers=SCALED_NUMBERS)
+                    current = SCHEMA_VERSION
+        for version in range(current + 1, SCHEMA_VERSION + 1):
+            with engine.begin() as conn:
+                MIGRATIONS[version](conn)
+                _write_version(conn, version)
+        with engine.begin() as conn:
+            stored = conn.execute(
+                select(SchemaVersion.scaled_numbers).where(SchemaVersion.id == SCHEMA_VERSION_ID)
+            ).scalar()
+            if stored != scaled_numbers:
+                _convert_numbers(conn, scaled_numbers)
+        return start, SCHEMA_VERSION
+    finally:
+        engine.dispose()
+
+
+async def check_schema_version(engine: AsyncEngine, scaled_numbers: bool = SCALED_NUMBERS) -> int:
+    """
+    Проверить версию схемы и режим хранения чисел при старте приложения (одно чтение строки).
+
+    :raises SchemaVersionError: таблицы нет, версия не совпадает с SCHEMA_VERSION
+        или данные хранятся не в режиме scaled_numbers
+    """
+    async with engine.connect() as conn:
+        try:
+            row = (
+                await conn.execute(
+                    select(SchemaVersion.version, SchemaVersion.scaled_numbers).where(
+                        SchemaVersion.id == SCHEMA_VERSION_ID
+                    )
+                )
+            ).first()
+        except DBAPIError:
+            row = None
+    version = row.version if row is not None else None
+    if version != SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Версия схемы БД {version}, ожидается {SCHEMA_VERSION}: "
+            "выполните python scripts/migrate.py"
+        )
+    if row.scaled_numbers != scaled_numbers:
+        raise SchemaVersionError(
+            f"Цены и количества в БД хранятся {'целыми' if row.scaled_numbers else 'как NUMERIC'}, "
+            f"а STORAGE_SCALED_NUMBERS={str(scaled_numbers).lower()}: выполните python scripts/migrate.py"
+        )
+    return version
@@ -1,12 +1,31 @@
-"""Модели БД: дерево категорий, номенклатура, заказы и позиции заказа."""
+"""Модели БД: дерево категорий, номенклатура (и шарды её остатка), заказы и позиции заказа (и их архив), удержания остатка, версии каталога."""
 
 from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import CheckConstraint, DateTime, ForeignKey, Numeric, String, UniqueConstraint
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Boolean,
+    CheckConstraint,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    SmallInteger,
+    String,
+    Table,
+    UniqueConstraint,
+    event,
+    false,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database.base import Base
+from database.types import ScaledNumeric
 
 
 class Category(Base):
@@ -24,6 +43,10 @@ class Category(Base):
         nullable=True,
         index=True,
     )
+    # Версия каталога, в которой строка последний раз менялась (лента изменений)
+    change_version: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, server_default="0", index=True
+    )
 
     # Самоссылка: родитель и дочерние категории
     parent: Mapped["Category | None"] = relationship(
@@ -32,11 +55,13 @@ class Category(Base):
         back_populates="children",
         foreign_keys=[parent_id],
     )
+    # Без каскада ORM: удаление и перенос поддерева — запросами над множествами
+    # (services.category_service), ON DELETE SET NULL — на стороне БД
     children: Mapped[list["Category"]] = relationship(
         "Category",
         back_populates="parent",
         foreign_keys=[parent_id],
-        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     # Номенклатура в этой категории
@@ -60,17 +85,37 @@ class Nomenclature(Base):
     __table_args__ = (
         CheckConstraint("quantity >= 0", name="check_nomenclature_quantity_non_negative"),
         CheckConstraint("price >= 0", name="check_nomenclature_price_non_negative"),
+        # Витрина: фильтр по категории + сортировка/диапазон по цене, keyset по (price, id)
+        Index("ix_nomenclature_category_price_id", "category_id", "price", "id"),
+        Index("ix_nomenclature_price_id", "price", "id"),
+        # Только товары в наличии (частичный индекс)
+        Index(
+            "ix_nomenclature_in_stock_price_id",
+            "price",
+            "id",
+            sqlite_where=text("quantity > 0"),
+            postgresql_where=text("quantity > 0"),
+        ),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(512), nullable=False, index=True)
-    quantity: Mapped[Decimal] = mapped_column(Numeric(18, 4), nullable=False, default=0)
-    price: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+    quantity: Mapped[Decimal] = mapped_column(ScaledNumeric(18, 4), nullable=False, default=0)
+    price: Mapped[Decimal] = mapped_column(ScaledNumeric(18, 2), nullable=False)
 
+    # Отдельный индекс не нужен: category_id — префикс ix_nomenclature_category_price_id
     category_id: Mapped[int | None] = mapped_column(
         ForeignKey("categories.id", ondelete="SET NULL"),
         nullable=True,
-        index=True,
+    )
+    # Версия каталога, в которой строка последний раз менялась (лента изменений)
+    change_version: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, server_default="0", index=True
+    )
+    # Число счётчиков остатка в nomenclature_stock_shards (0 — остаток в quantity);
+    # у шардированного товара quantity — витринное значение, его обновляет выравнивание
+    stock_shards: Mapped[int] = mapped_column(
+        SmallInteger, nullable=False, default=0, server_default="0"
     )
 
     category: Mapped["Category | None"] = relationship(
@@ -90,6 +135,82 @@ class Nomenclature(Base):
         return f"Nomenclature(id={self.id}, name={self.name!r}, quantity={self.quantity}, price={self.price})"
 
 
+# ---------------------------------------------------------------------------
+# Полнотекстовый поиск по наименованию номенклатуры.
+# SQLite: внешняя FTS5-таблица nomenclature_fts (unicode61 — регистр кириллицы
+# сворачивается), синхронизируется триггерами. PostgreSQL: GIN-индекс по
+# to_tsvector('simple', ...). «ё» приводится к «е» и в индексе, и в запросе.
+# prefix='2 3' — отдельные индексы коротких префиксов для быстрого typeahead.
+# ---------------------------------------------------------------------------
+NOMENCLATURE_FTS_SQLITE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS nomenclature_fts USING fts5("
+    "name, content='nomenclature', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS nomenclature_fts_ai AFTER INSERT ON nomenclature BEGIN "
+    "INSERT INTO nomenclature_fts (rowid, name) "
+    "VALUES (new.id, replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е')); END",
+    "CREATE TRIGGER IF NOT EXISTS nomenclature_fts_ad AFTER DELETE ON nomenclature BEGIN "
+    "INSERT INTO nomenclature_fts (nomenclature_fts, rowid, name) "
+    "VALUES ('delete', old.id, replace(replace(old.name, 'ё', 'е'), 'Ё', 'Е')); END",
+    "CREATE TRIGGER IF NOT EXISTS nomenclature_fts_au AFTER UPDATE OF name ON nomenclature BEGIN "
+    "INSERT INTO nomenclature_fts (nomenclature_fts, rowid, name) "
+    "VALUES ('delete', old.id, replace(replace(old.name, 'ё', 'е'), 'Ё', 'Е')); "
+    "INSERT INTO nomenclature_fts (rowid, name) "
+    "VALUES (new.id, replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е')); END",
+)
+NOMENCLATURE_FTS_POSTGRESQL = (
+    "CREATE INDEX IF NOT EXISTS ix_nomenclature_name_fts ON nomenclature "
+    "USING GIN (to_tsvector('simple', translate(name, 'ёЁ', 'еЕ')))",
+)
+
+# Новая таблица (create_all) — сразу с индексом; в существующую БД индекс и
+# строки, бывшие в ней до него, добавляет шаг миграции (database/migrations.py)
+for _statement in NOMENCLATURE_FTS_SQLITE:
+    event.listen(
+        Nomenclature.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+    )
+for _statement in NOMENCLATURE_FTS_POSTGRESQL:
+    event.listen(
+        Nomenclature.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql")
+    )
+
+# Описание FTS5-таблицы только для запросов (создаётся DDL выше, не через metadata)
+nomenclature_fts = Table(
+    "nomenclature_fts",
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("name", String),
+    Column("rank"),
+)
+
+
+class NomenclatureStockShard(Base):
+    """
+    Счётчик-шард остатка товара с горячей конкуренцией (services/stock_shards.py).
+
+    Остаток шардированного товара — сумма его шардов; оформление заказа
+    списывает со случайного шарда, поэтому конкурентные транзакции блокируют
+    разные строки, а не одну строку nomenclature.
+    """
+
+    __tablename__ = "nomenclature_stock_shards"
+    __table_args__ = (
+        CheckConstraint("quantity >= 0", name="check_stock_shard_quantity_non_negative"),
+    )
+
+    nomenclature_id: Mapped[int] = mapped_column(
+        ForeignKey("nomenclature.id", ondelete="CASCADE"), primary_key=True
+    )
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    quantity: Mapped[Decimal] = mapped_column(ScaledNumeric(18, 4), nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return (
+            f"NomenclatureStockShard(nomenclature_id={self.nomenclature_id}, "
+            f"shard={self.shard}, quantity={self.quantity})"
+        )
+
+
 class Client(Base):
     """
     Клиент: наименование и адрес (ТЗ 1.3).
@@ -118,6 +239,8 @@ class Order(Base):
     """
 
     __tablename__ = "orders"
+    # SQLite: AUTOINCREMENT — ID не переиспользуются после переноса заказов в архив
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     client_id: Mapped[int | None] = mapped_column(
@@ -131,6 +254,8 @@ class Order(Base):
         default=datetime.utcnow,
         index=True,
     )
+    # Момент оформления (checkout): остатки списаны, позиции больше не меняются
+    checked_out_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     client: Mapped["Client | None"] = relationship(
         "Client",
@@ -158,6 +283,9 @@ class OrderItem(Base):
     __tablename__ = "order_items"
     __table_args__ = (
         UniqueConstraint("order_id", "nomenclature_id", name="uq_order_nomenclature"),
+        # SQLite: AUTOINCREMENT — ID позиций архивных заказов (order_items_archive.id)
+        # не достанутся новым позициям
+        {"sqlite_autoincrement": True},
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -171,7 +299,7 @@ class OrderItem(Base):
         nullable=False,
         index=True,
     )
-    quantity: Mapped[Decimal] = mapped_column(Numeric(18, 4), nullable=False)
+    quantity: Mapped[Decimal] = mapped_column(ScaledNumeric(18, 4), nullable=False)
 
     order: Mapped["Order"] = relationship(
         "Order",
@@ -186,3 +314,147 @@ class OrderItem(Base):
 
     def __repr__(self) -> str:
         return f"OrderItem(id={self.id}, order_id={self.order_id}, nomenclature_id={self.nomenclature_id}, quantity={self.quantity})"
+
+
+class StockHold(Base):
+    """
+    Удержание остатка позицией открытого заказа до expires_at (services/stock_holds.py).
+
+    Доступный остаток — остаток на складе минус активные (expires_at > now)
+    удержания других заказов; оформление превращает удержания заказа в
+    списание и удаляет их, истёкшие удаляет фоновая очистка. Удержание
+    шардированного товара записано на один шард (shard) и проверяется против
+    его остатка под блокировкой этого шарда; у остальных товаров shard = 0.
+    """
+
+    __tablename__ = "stock_holds"
+    __table_args__ = (
+        # Сумма активных удержаний товара (префикс) и его шарда — диапазон по
+        # индексу (в PostgreSQL — index-only)
+        Index(
+            "ix_stock_holds_nomenclature_shard_expires",
+            "nomenclature_id",
+            "shard",
+            "expires_at",
+            postgresql_include=["quantity"],
+        ),
+        Index("ix_stock_holds_expires_at", "expires_at"),
+    )
+
+    order_id: Mapped[int] = mapped_column(
+        ForeignKey("orders.id", ondelete="CASCADE"), primary_key=True
+    )
+    nomenclature_id: Mapped[int] = mapped_column(
+        ForeignKey("nomenclature.id", ondelete="CASCADE"), primary_key=True
+    )
+    shard: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0, server_default="0")
+    quantity: Mapped[Decimal] = mapped_column(ScaledNumeric(18, 4), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"StockHold(order_id={self.order_id}, nomenclature_id={self.nomenclature_id}, "
+            f"shard={self.shard}, quantity={self.quantity}, expires_at={self.expires_at})"
+        )
+
+
+class ArchivedOrder(Base):
+    """
+    Архивный заказ: оформленный заказ старше ORDER_ARCHIVE_AFTER_DAYS, перенесённый
+    из orders (services/order_archive.py). ID сохраняется.
+    """
+
+    __tablename__ = "orders_archive"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    client_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    checked_out_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"ArchivedOrder(id={self.id})"
+
+
+class ArchivedOrderItem(Base):
+    """
+    Позиция архивного заказа. Без внешнего ключа на номенклатуру: архив
+    переживает удаление товара. Ключ — (order_id, nomenclature_id), как
+    уникальность в order_items; id исходной позиции хранится для ответов API.
+    """
+
+    __tablename__ = "order_items_archive"
+
+    order_id: Mapped[int] = mapped_column(
+        ForeignKey("orders_archive.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    nomenclature_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    id: Mapped[int] = mapped_column(Integer, nullable=False)
+    quantity: Mapped[Decimal] = mapped_column(ScaledNumeric(18, 4), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"ArchivedOrderItem(order_id={self.order_id}, nomenclature_id={self.nomenclature_id}, quantity={self.quantity})"
+
+
+class CatalogState(Base):
+    """
+    Счётчик версий каталога: одна строка (id = 1).
+
+    Каждая транзакция, меняющая категории или номенклатуру, один раз увеличивает
+    version и проставляет его в change_version изменённых строк.
+    """
+
+    __tablename__ = "catalog_state"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"CatalogState(version={self.version})"
+
+
+# Единственная строка счётчика создаётся вместе с таблицей
+event.listen(
+    CatalogState.__table__,
+    "after_create",
+    DDL("INSERT INTO catalog_state (id, version) VALUES (1, 0)"),
+)
+
+
+class SchemaVersion(Base):
+    """
+    Версия схемы БД: одна строка (id = 1).
+
+    Записывается командой scripts/migrate.py; приложение при старте только
+    сверяет её с database.migrations.SCHEMA_VERSION.
+    """
+
+    __tablename__ = "schema_version"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Цены и количества хранятся целыми (database/types.py, STORAGE_SCALED_NUMBERS)
+    scaled_numbers: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default=false()
+    )
+
+    def __repr__(self) -> str:
+        return f"SchemaVersion(version={self.version}, scaled_numbers={self.scaled_numbers})"
+
+
+class CatalogTombstone(Base):
+    """
+    Надгробие удалённой строки каталога: какая таблица, какой ID и в какой версии удалён.
+    Позволяет ленте изменений сообщать об удалениях.
+    """
+
+    __tablename__ = "catalog_tombstones"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    table_name: Mapped[str] = mapped_column(String(32), nullable=False)
+    entity_id: Mapped[int] = mapped_column(nullable=False)
+    change_version: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"CatalogTombstone(table_name={self.table_name!r}, entity_id={self.entity_id}, change_version={self.change_version})"
@@ -0,0 +1,79 @@
+"""
+Типы столбцов: денежные суммы и количества в режиме хранения целыми.
+
+ScaledNumeric(precision, scale) — обычный Numeric, а при
+STORAGE_SCALED_NUMBERS=true — BIGINT со значением × 10^scale (цена — в
+сотых, количество — в десятитысячных, как в снимке каталога). Python-код и
+API по-прежнему видят Decimal: перевод — только на границе с БД, а
+сравнения, сумма и списание остатка в SQL идут по целым. SQLite хранит
+NUMERIC как REAL/INTEGER без точной десятичной арифметики; целые дают точные
+агрегаты и дешёвое чтение (без форматирования float в строку).
+
+Режим выбирается при импорте моделей и должен совпадать с данными в БД:
+scripts/migrate.py пересчитывает значения при смене режима, приложение при
+старте сверяет его (database.migrations).
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import BigInteger, Numeric
+from sqlalchemy.types import TypeDecorator
+
+from settings.config import settings
+
+# Режим хранения, с которым построены модели этого процесса
+SCALED_NUMBERS = settings.storage_scaled_numbers
+
+
+class ScaledNumeric(TypeDecorator):
+    """Numeric(precision, scale) или BIGINT value × 10^scale (scaled=True)."""
+
+    impl = Numeric
+    cache_ok = True
+
+    def __init__(self, precision: int, scale: int, scaled: bool | None = None) -> None:
+        super().__init__(precision, scale)
+        # Свои атрибуты: в реализации для диалекта impl — уже BigInteger
+        self.scale = scale
+        self.scaled = SCALED_NUMBERS if scaled is None else scaled
+
+    def load_dialect_impl(self, dialect):
+        if self.scaled:
+            return dialect.type_descriptor(BigInteger())
+        return super().load_dialect_impl(dialect)
+
+    def _to_int(self):
+        scale = self.scale
+        factor = 10**scale
+
+        def process(value):
+            if value is None:
+                return None
+            if type(value) is int:
+                return value * factor
+            if isinstance(value, float):
+                value = Decimal(repr(value))
+            return int(Decimal(value).scaleb(scale).to_integral_value())
+
+        return process
+
+    def bind_processor(self, dialect):
+        if not self.scaled:
+            return super().bind_processor(dialect)
+        return self._to_int()
+
+    def literal_processor(self, dialect):
+        if not self.scaled:
+            return super().literal_processor(dialect)
+        to_int = self._to_int()
+        return lambda value: str(to_int(value))
+
+    def result_processor(self, dialect, coltype):
+        if not self.scaled:
+            return super().result_processor(dialect, coltype)
+        scale = -self.scale
+
+        def process(value):
+            return None if value is None else Decimal(value).scaleb(scale)
+
+        return process
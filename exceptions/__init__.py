@@ -1,13 +1,31 @@
 """Модуль исключений приложения."""
 
 from .errors import (
+    AdmissionRejectedError,
+    CategoryNotFoundError,
+    CategoryTreeConflictError,
+    ClientNotFoundError,
+    DeadlineExceededError,
     InsufficientStockError,
+    InvalidCursorError,
     NomenclatureNotFoundError,
+    OrderAlreadyCheckedOutError,
+    OrderLinesShortageError,
     OrderNotFoundError,
+    OrderStockShortageError,
 )
 
 __all__ = [
+    "AdmissionRejectedError",
+    "CategoryNotFoundError",
+    "CategoryTreeConflictError",
+    "ClientNotFoundError",
+    "DeadlineExceededError",
     "InsufficientStockError",
+    "InvalidCursorError",
     "NomenclatureNotFoundError",
+    "OrderAlreadyCheckedOutError",
+    "OrderLinesShortageError",
     "OrderNotFoundError",
+    "OrderStockShortageError",
 ]
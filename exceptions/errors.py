@@ -9,12 +9,30 @@ class OrderNotFoundError(Exception):
     pass
 
 
+class ClientNotFoundError(Exception):
+    """Клиент не найден."""
+
+    pass
+
+
 class NomenclatureNotFoundError(Exception):
     """Номенклатура не найдена."""
 
     pass
 
 
+class CategoryNotFoundError(Exception):
+    """Категория не найдена."""
+
+    pass
+
+
+class CategoryTreeConflictError(Exception):
+    """Операция нарушила бы дерево категорий: цикл или перенос в удаляемое поддерево."""
+
+    pass
+
+
 class InsufficientStockError(Exception):
     """Товара нет в наличии в нужном количестве."""
 
@@ -24,3 +42,66 @@ class InsufficientStockError(Exception):
         super().__init__(
             f"Недостаточно товара в наличии: доступно {available}, запрошено {requested}"
         )
+
+
+class OrderAlreadyCheckedOutError(Exception):
+    """Заказ уже оформлен: позиции и остатки по нему больше не меняются."""
+
+    pass
+
+
+class OrderStockShortageError(Exception):
+    """
+    При оформлении заказа части позиций не хватило остатка.
+
+    short_lines — список (nomenclature_id, запрошено, доступно) по каждой такой позиции.
+    """
+
+    def __init__(self, order_id: int, short_lines: list[tuple[int, Decimal, Decimal]]):
+        self.order_id = order_id
+        self.short_lines = short_lines
+        super().__init__(
+            f"Заказ {order_id} не оформлен: не хватает товара по {len(short_lines)} позициям"
+        )
+
+
+class OrderLinesShortageError(Exception):
+    """
+    При создании заказа части позиций не хватило остатка; заказ не создан.
+
+    short_lines — список (nomenclature_id, запрошено, доступно) по каждой такой позиции.
+    """
+
+    def __init__(self, short_lines: list[tuple[int, Decimal, Decimal]]):
+        self.short_lines = short_lines
+        super().__init__(f"Заказ не создан: не хватает товара по {len(short_lines)} позициям")
+
+
+class InvalidCursorError(Exception):
+    """Курсор пагинации повреждён или выдан для другого запроса."""
+
+    pass
+
+
+class AdmissionRejectedError(Exception):
+    """
+    Запрос не допущен лимитером нагрузки.
+
+    status_code — 429 (очередь ожидания заполнена) или 503 (слот не освободился
+    за отведённое время); retry_after — через сколько секунд повторить.
+    """
+
+    def __init__(self, limiter: str, status_code: int, retry_after: int):
+        self.limiter = limiter
+        self.status_code = status_code
+        self.retry_after = retry_after
+        reason = "очередь заполнена" if status_code == 429 else "истекло время ожидания"
+        super().__init__(f"Сервер перегружен ({limiter}: {reason}), повторите позже")
+
+
+class DeadlineExceededError(Exception):
+    """Истёк срок запроса: работа с БД прервана (statement_timeout / прерывание SQLite)."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        super().__init__(f"Запрос не уложился в срок {seconds:g} с")
@@ -1,21 +1,85 @@
-import uvicorn
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from api.catalog import router as catalog_router
 from api.categories import router as categories_router
+from api.deadline import deadline_exceeded_handler
+from api.metrics import router as metrics_router
 from api.nomenclature import router as nomenclature_router
 from api.orders import router as orders_router
-from database import db_helper, init_db
+from api.warmup import warm_up
+from database import db_helper
+from database.commit_hooks import register_commit_hook, unregister_commit_hook
+from database.migrations import check_schema_version
+from exceptions import DeadlineExceededError
+from monitoring import TracingMiddleware, metrics, tracer
+from services.admission import read_admission, write_admission
+from services.catalog_snapshot import catalog_snapshot
+from services.nomenclature_cache import nomenclature_cache
+from services.order_archive import order_archiver
+from services.stock_events import stock_broker
+from services.stock_holds import stock_hold_sweeper
+from services.stock_shards import stock_shard_rebalancer
 from settings.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Создание таблиц БД при старте, закрытие пула при остановке."""
-    init_db()
+    """
+    Проверка версии схемы БД (одно чтение; схему создаёт scripts/migrate.py)
+    и прогрев при старте; при остановке — дождаться незавершённых транзакций
+    и закрыть пул.
+    """
+    await check_schema_version(db_helper.engine)
+    register_commit_hook(stock_broker.on_commit)
+    register_commit_hook(nomenclature_cache.on_commit)
+    metrics.register("nomenclature_cache", nomenclature_cache.stats)
+    metrics.register("admission_write", write_admission.stats)
+    metrics.register("admission_read", read_admission.stats)
+    metrics.register("tracing", tracer.stats)
+    if catalog_snapshot.enabled:
+        await catalog_snapshot.start()
+        register_commit_hook(catalog_snapshot.on_commit)
+        metrics.register("catalog_snapshot", catalog_snapshot.stats)
+    if order_archiver.enabled:
+        await order_archiver.start()
+        metrics.register("order_archive", order_archiver.stats)
+    if stock_shard_rebalancer.enabled:
+        await stock_shard_rebalancer.start()
+        metrics.register("stock_shards", stock_shard_rebalancer.stats)
+    if stock_hold_sweeper.enabled:
+        await stock_hold_sweeper.start()
+        metrics.register("stock_holds", stock_hold_sweeper.stats)
+    if settings.run.warmup:
+        await warm_up()
     yield
+    if stock_hold_sweeper.enabled:
+        metrics.unregister("stock_holds")
+        await stock_hold_sweeper.stop()
+    if stock_shard_rebalancer.enabled:
+        metrics.unregister("stock_shards")
+        await stock_shard_rebalancer.stop()
+    if order_archiver.enabled:
+        metrics.unregister("order_archive")
+        await order_archiver.stop()
+    if catalog_snapshot.enabled:
+        metrics.unregister("catalog_snapshot")
+        unregister_commit_hook(catalog_snapshot.on_commit)
+        await catalog_snapshot.stop()
+    metrics.unregister("tracing")
+    metrics.unregister("admission_read")
+    metrics.unregister("admission_write")
+    metrics.unregister("nomenclature_cache")
+    if not await db_helper.wait_idle(settings.run.graceful_timeout):
+        logger.warning("Остановка с незавершёнными транзакциями: %d", db_helper.active_sessions)
+    unregister_commit_hook(nomenclature_cache.on_commit)
+    unregister_commit_hook(stock_broker.on_commit)
     await db_helper.dispose()
+    tracer.shutdown()
 
 
 app = FastAPI(
@@ -31,9 +95,15 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
+app.add_exception_handler(DeadlineExceededError, deadline_exceeded_handler)
+# Корневой интервал трассы на запрос (monitoring.tracing; выключено при TRACING_EXPORTER=none)
+app.add_middleware(TracingMiddleware)
+
 app.include_router(orders_router, prefix="/api")
 app.include_router(nomenclature_router, prefix="/api")
 app.include_router(categories_router, prefix="/api")
+app.include_router(catalog_router, prefix="/api")
+app.include_router(metrics_router, prefix="/api")
 
 
 @app.get("/")
@@ -47,13 +117,34 @@ def root() -> dict[str, str]:
 
 
 def run_app() -> None:
-    """Запускает FastAPI-приложение через uvicorn."""
-    uvicorn.run(
-        "main:app",
-        host=settings.run.host,
-        port=settings.run.port,
-        reload=True,
-    )
+    """
+    Запускает FastAPI-приложение через uvicorn.
+
+    RUN_MODE=dev — один процесс с reload; RUN_MODE=prod — воркеры и настройки
+    uvicorn из RUN_* (settings.run).
+    """
+    # uvicorn нужен только для запуска, не при импорте приложения воркером
+    import uvicorn
+
+    run = settings.run
+    if run.mode == "dev":
+        uvicorn.run("main:app", host=run.host, port=run.port, reload=True)
+        return
+
+    options = {
+        "host": run.host,
+        "port": run.port,
+        "workers": run.workers,
+        "loop": run.loop,
+        "http": run.http,
+        "timeout_keep_alive": run.keep_alive,
+        "backlog": run.backlog,
+        "limit_max_requests": run.max_requests,
+        # Случайная добавка к лимиту у каждого воркера (uvicorn >= 0.41)
+        "limit_max_requests_jitter": run.max_requests_jitter,
+        "timeout_graceful_shutdown": run.graceful_timeout,
+    }
+    uvicorn.run("main:app", **options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,13 @@
+"""Наблюдаемость: метрики и трассировка компонентов приложения."""
+
+from monitoring.metrics import MetricsRegistry, metrics
+from monitoring.tracing import TracingMiddleware, instrument_engine, traced, tracer
+
+__all__ = [
+    "MetricsRegistry",
+    "TracingMiddleware",
+    "instrument_engine",
+    "metrics",
+    "traced",
+    "tracer",
+]
@@ -0,0 +1,31 @@
+"""
+Реестр метрик процесса.
+
+Компоненты (кэши, брокеры, лимитеры) регистрируют функцию, возвращающую
+текущие значения счётчиков; GET /api/metrics отдаёт снимок всех источников.
+Значения считаются на момент запроса — отдельного фонового сбора нет.
+"""
+
+from collections.abc import Callable
+
+MetricsSource = Callable[[], dict[str, int | float]]
+
+
+class MetricsRegistry:
+    """Именованные источники метрик."""
+
+    def __init__(self) -> None:
+        self._sources: dict[str, MetricsSource] = {}
+
+    def register(self, name: str, source: MetricsSource) -> None:
+        self._sources[name] = source
+
+    def unregister(self, name: str) -> None:
+        self._sources.pop(name, None)
+
+    def snapshot(self) -> dict[str, dict[str, int | float]]:
+        """Текущие значения всех источников: имя -> {метрика: значение}."""
+        return {name: source() for name, source in self._sources.items()}
+
+
+metrics = MetricsRegistry()
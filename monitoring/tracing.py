@@ -0,0 +1,418 @@
+"""
+Трассировка запросов: вложенные интервалы (spans) по слоям приложения.
+
+Корневой интервал открывает TracingMiddleware на каждый HTTP-запрос; решение
+о выборке (TRACING_SAMPLE_RATE) принимается один раз на трассу, входящий
+заголовок traceparent (W3C) продолжает чужую трассу. Внутри трассы:
+
+- слой service — функции сервисов с декоратором @traced("service");
+- слой repository — публичные async-методы репозиториев (BaseRepository
+  оборачивает их автоматически);
+- слой db — получение соединения из пула, flush и commit сессии, каждый
+  SQL-запрос (instrument_engine).
+
+Вне выбранной трассы декоратор и события стоят одно чтение contextvar.
+Завершённая трасса целиком уходит экспортёру в фоновом потоке: file — строки
+OTLP/JSON в TRACING_FILE, otlp — POST OTLP/JSON на TRACING_OTLP_ENDPOINT
+(например, scripts/trace_collector.py). Разбор — scripts/trace_collector.py.
+"""
+
+import functools
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.request
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Длина текста SQL в атрибуте интервала
+MAX_STATEMENT_LENGTH = 500
+# Сколько трасс может ждать экспорта; сверх — отбрасываются (счётчик dropped)
+EXPORT_QUEUE_SIZE = 1000
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Span:
+    """Интервал трассы: имя, слой, время начала/конца (нс, Unix) и атрибуты."""
+
+    __slots__ = (
+        "trace",
+        "span_id",
+        "parent_id",
+        "name",
+        "layer",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(self, trace: "_Trace", parent_id: str | None, name: str, layer: str) -> None:
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.layer = layer
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: dict[str, str | int | float] = {}
+        self.error: str | None = None
+
+    def to_otlp(self) -> dict[str, Any]:
+        attributes = {"layer": self.layer, **self.attributes}
+        span: dict[str, Any] = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            # SERVER для корня HTTP, CLIENT для запросов к БД, INTERNAL для остальных
+            "kind": 2 if self.layer == "http" else 3 if self.layer == "db" else 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 0},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _Trace:
+    """Завершённые интервалы одной трассы в процессе."""
+
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: str) -> None:
+        self.trace_id = trace_id
+        self.spans: list[Span] = []
+
+
+def _otlp_value(value: str | int | float | bool) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: list[Span], service_name: str) -> dict[str, Any]:
+    """Тело запроса OTLP/HTTP JSON (ExportTraceServiceRequest)."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": service_name}}
+                    ]
+                },
+                "scopeSpans": [
+                    {"scope": {"name": "app"}, "spans": [span.to_otlp() for span in spans]}
+                ],
+            }
+        ]
+    }
+
+
+def parse_traceparent(header: str | None) -> tuple[str, str, bool] | None:
+    """W3C traceparent -> (trace_id, parent span_id, sampled) или None."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        if not int(parts[1], 16) or not int(parts[2], 16):
+            return None
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class SpanExporter:
+    """Экспорт трасс в фоновом потоке (файл или OTLP/HTTP), с ограниченной очередью."""
+
+    def __init__(self, kind: str, target: str, service_name: str) -> None:
+        self.kind = kind
+        self.target = target
+        self.service_name = service_name
+        self._queue: queue.Queue[list[Span] | None] = queue.Queue(EXPORT_QUEUE_SIZE)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def export(self, spans: list[Span]) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="trace-exporter", daemon=True
+                    )
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Дописать накопленное и остановить поток."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            batches = [batch]
+            # Всё, что накопилось, — одним запросом/записью
+            while len(batches) < 100:
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    self._write(batches)
+                    return
+                batches.append(more)
+            self._write(batches)
+
+    def _write(self, batches: list[list[Span]]) -> None:
+        spans = [span for batch in batches for span in batch]
+        body = json.dumps(otlp_payload(spans, self.service_name), ensure_ascii=False)
+        try:
+            if self.kind == "file":
+                with open(self.target, "a", encoding="utf-8") as f:
+                    f.write(body + "\n")
+            else:
+                request = urllib.request.Request(
+                    self.target,
+                    data=body.encode(),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                with urllib.request.urlopen(request, timeout=5):
+                    pass
+            self.exported += len(batches)
+        except Exception:
+            self.failed += len(batches)
+            logger.exception("Ошибка экспорта трасс (%s)", self.target)
+
+
+class Tracer:
+    """Создание интервалов в текущем контексте и передача трасс экспортёру."""
+
+    def __init__(self, exporter: SpanExporter | None, sample_rate: float) -> None:
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._current: ContextVar[Span | None] = ContextVar("trace_span", default=None)
+        self.traces = 0
+        self.sampled = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None and self.sample_rate > 0
+
+    def current(self) -> Span | None:
+        return self._current.get()
+
+    @contextmanager
+    def trace(
+        self, name: str, layer: str = "http", traceparent: str | None = None
+    ) -> Iterator[Span | None]:
+        """Корневой интервал: выборка трассы и экспорт после завершения."""
+        if not self.enabled:
+            yield None
+            return
+        self.traces += 1
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            yield None
+            return
+        self.sampled += 1
+        span = Span(_Trace(trace_id), parent_id, name, layer)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            self._current.reset(token)
+            self.end_span(span)
+            self.exporter.export(span.trace.spans)
+
+    @contextmanager
+    def span(self, name: str, layer: str) -> Iterator[Span | None]:
+        """Вложенный интервал; вне выбранной трассы — ничего не делает."""
+        parent = self._current.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(parent.trace, parent.span_id, name, layer)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            self._current.reset(token)
+            self.end_span(span)
+
+    def start_span(self, name: str, layer: str) -> Span | None:
+        """Интервал без смены текущего (для событий SQLAlchemy); закрыть end_span."""
+        parent = self._current.get()
+        if parent is None:
+            return None
+        return Span(parent.trace, parent.span_id, name, layer)
+
+    def end_span(self, span: Span | None, error: BaseException | None = None) -> None:
+        if span is None:
+            return
+        if error is not None:
+            span.error = repr(error)
+        span.end_ns = time.time_ns()
+        span.trace.spans.append(span)
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+    def stats(self) -> dict[str, int | float]:
+        """Метрики для monitoring.metrics."""
+        exporter = self.exporter
+        return {
+            "sample_rate": self.sample_rate,
+            "traces": self.traces,
+            "sampled": self.sampled,
+            "exported": exporter.exported if exporter else 0,
+            "dropped": exporter.dropped if exporter else 0,
+            "failed": exporter.failed if exporter else 0,
+        }
+
+
+def _build_tracer() -> Tracer:
+    exporter = None
+    if settings.tracing_exporter == "file":
+        exporter = SpanExporter("file", settings.tracing_file, settings.tracing_service_name)
+    elif settings.tracing_exporter == "otlp":
+        exporter = SpanExporter(
+            "otlp", settings.tracing_otlp_endpoint, settings.tracing_service_name
+        )
+    return Tracer(exporter, settings.tracing_sample_rate)
+
+
+tracer = _build_tracer()
+
+
+def traced(layer: str, name: str | None = None) -> Callable[[F], F]:
+    """Декоратор async-функции: интервал name (по умолчанию «модуль.функция») в слое layer."""
+
+    def decorator(fn: F) -> F:
+        span_name = name or f"{fn.__module__.rpartition('.')[2]}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if tracer.current() is None:
+                return await fn(*args, **kwargs)
+            with tracer.span(span_name, layer):
+                return await fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    span = tracer.start_span(f"SQL {statement.lstrip().split(None, 1)[0].upper()}", "db")
+    if span is None:
+        return
+    span.attributes["db.statement"] = statement[:MAX_STATEMENT_LENGTH]
+    if executemany:
+        span.attributes["db.executemany"] = len(parameters)
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    spans = conn.info.get("trace_spans")
+    if spans:
+        tracer.end_span(spans.pop())
+
+
+def _handle_error(context) -> None:
+    connection = context.connection
+    spans = connection.info.get("trace_spans") if connection is not None else None
+    if spans:
+        tracer.end_span(spans.pop(), context.original_exception)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Интервал на каждый SQL-запрос движка (слой db)."""
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class TracingMiddleware:
+    """ASGI-middleware: корневой интервал HTTP-запроса «METHOD /шаблон/пути»."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent")
+        with tracer.trace(
+            f"{scope['method']} {scope['path']}",
+            traceparent=traceparent.decode("latin-1") if traceparent else None,
+        ) as span:
+            if span is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_status(message) -> None:
+                if message["type"] == "http.response.start":
+                    span.attributes["http.status_code"] = message["status"]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                span.name = f"{scope['method']} {_route_template(scope)}"
+                span.attributes["http.target"] = scope["path"]
+
+
+def _route_template(scope) -> str:
+    """Путь с параметрами маршрута вместо значений: /api/nomenclature/{nomenclature_id}."""
+    params = {str(value): f"{{{name}}}" for name, value in scope.get("path_params", {}).items()}
+    if not params:
+        return scope["path"]
+    return "/".join(params.get(part, part) for part in scope["path"].split("/"))
@@ -1,13 +1,19 @@
 """Репозитории — слой работы с данными (CRUD)."""
 
+from repositories.catalog_repository import CatalogRepository
 from repositories.category_repository import CategoryRepository
 from repositories.nomenclature_repository import NomenclatureRepository
+from repositories.order_archive_repository import OrderArchiveRepository
 from repositories.order_item_repository import OrderItemRepository
 from repositories.order_repository import OrderRepository
+from repositories.stock_hold_repository import StockHoldRepository
 
 __all__ = [
+    "CatalogRepository",
     "CategoryRepository",
     "NomenclatureRepository",
+    "OrderArchiveRepository",
     "OrderItemRepository",
     "OrderRepository",
+    "StockHoldRepository",
 ]
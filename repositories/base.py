@@ -1,25 +1,89 @@
 """Базовый репозиторий для CRUD-операций."""
 
+import inspect as pyinspect
+from collections.abc import Iterable
 from typing import Generic, TypeVar
 
-from sqlalchemy import select
+from sqlalchemy import inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.util import identity_key
 
 from database.base import Base
+from database.commit_hooks import on_close
+from monitoring import traced
+from repositories.loader import BatchLoader
 
 ModelT = TypeVar("ModelT", bound=Base)
 
+_LOADERS_KEY = "batch_loaders"
+
 
 class BaseRepository(Generic[ModelT]):
-    """Базовый класс репозитория с общими CRUD-операциями."""
+    """
+    Базовый класс репозитория с общими CRUD-операциями.
+
+    Публичные async-методы каждого репозитория (в том числе унаследованные)
+    автоматически становятся интервалами трассы «Репозиторий.метод».
+    """
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        for name in dir(cls):
+            method = getattr(cls, name)
+            if name.startswith("_") or not pyinspect.iscoroutinefunction(method):
+                continue
+            method = getattr(method, "__wrapped__", method)
+            setattr(cls, name, traced("repository", f"{cls.__name__}.{name}")(method))
 
     def __init__(self, session: AsyncSession, model: type[ModelT]):
         self._session = session
         self._model = model
 
+    def _from_identity_map(self, id: int) -> ModelT | None:
+        """Загруженная и не устаревшая сущность из identity map сессии."""
+        obj = self._session.identity_map.get(identity_key(self._model, id))
+        if obj is None:
+            return None
+        state = inspect(obj)
+        if state.expired_attributes or state.deleted or state.was_deleted:
+            return None
+        return obj
+
     async def get_by_id(self, id: int) -> ModelT | None:
-        """Получить сущность по ID."""
-        result = await self._session.execute(
-            select(self._model).where(self._model.id == id)
-        )
-        return result.scalar_one_or_none()
+        """
+        Получить сущность по ID.
+
+        Сначала проверяется identity map сессии; промахи, сделанные в одном
+        такте event loop, объединяются в один запрос get_many.
+        """
+        obj = self._from_identity_map(id)
+        if obj is not None:
+            return obj
+        loaders: dict[type, BatchLoader] = self._session.info.setdefault(_LOADERS_KEY, {})
+        loader = loaders.get(self._model)
+        if loader is None:
+            loader = loaders[self._model] = BatchLoader(self.get_many)
+            on_close(self._session, loader.close)
+        return await loader.load(id)
+
+    async def get_many(self, ids: Iterable[int]) -> dict[int, ModelT]:
+        """
+        Получить сущности по списку ID: ID -> сущность (ненайденных ID нет в словаре).
+
+        Найденные в identity map не запрашиваются; остальные — одним запросом IN.
+        """
+        found: dict[int, ModelT] = {}
+        missing: list[int] = []
+        for id in dict.fromkeys(ids):
+            obj = self._from_identity_map(id)
+            if obj is not None:
+                found[id] = obj
+            else:
+                missing.append(id)
+        if missing:
+            result = await self._session.execute(
+                select(self._model).where(self._model.id.in_(missing))
+            )
+            for obj in result.scalars():
+                found[obj.id] = obj
+        return found
@@ -0,0 +1,113 @@
+"""Репозиторий версий каталога: счётчик, надгробия и выборка изменений."""
+
+from collections.abc import Iterable
+
+from sqlalchemy import Select, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import CatalogState, CatalogTombstone, Category, Nomenclature
+from repositories.base import BaseRepository
+
+CATALOG_STATE_ID = 1
+_VERSION_KEY = "catalog_version"
+
+
+class CatalogRepository(BaseRepository[CatalogState]):
+    """Операции со счётчиком версий каталога и лентой изменений."""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, CatalogState)
+
+    async def get_version(self) -> int:
+        """Текущая версия каталога (один поиск по первичному ключу)."""
+        result = await self._session.execute(
+            select(CatalogState.version).where(CatalogState.id == CATALOG_STATE_ID)
+        )
+        return result.scalar() or 0
+
+    async def next_version(self) -> int:
+        """
+        Версия для изменений текущей транзакции.
+
+        Счётчик увеличивается один раз на транзакцию (повторные вызовы возвращают
+        ту же версию). Строка счётчика блокируется до commit, поэтому версии
+        коммитятся строго по возрастанию и лента не пропускает изменения.
+        """
+        transaction = self._session.sync_session.get_transaction()
+        cached = self._session.info.get(_VERSION_KEY)
+        if cached is not None and cached[0] is transaction:
+            return cached[1]
+        result = await self._session.execute(
+            update(CatalogState)
+            .where(CatalogState.id == CATALOG_STATE_ID)
+            .values(version=CatalogState.version + 1)
+            .returning(CatalogState.version)
+            .execution_options(synchronize_session=False)
+        )
+        version = result.scalar_one()
+        self._session.info[_VERSION_KEY] = (transaction, version)
+        return version
+
+    async def add_tombstones(self, table_name: str, ids: Iterable[int], version: int) -> None:
+        """Записать надгробия удалённых строк (один executemany INSERT)."""
+        rows = [
+            {"table_name": table_name, "entity_id": id, "change_version": version}
+            for id in ids
+        ]
+        if rows:
+            await self._session.execute(insert(CatalogTombstone), rows)
+
+    async def add_tombstones_from(self, table_name: str, ids: Select, version: int) -> None:
+        """Записать надгробия строк с ID из подзапроса (один INSERT ... SELECT)."""
+        rows = ids.subquery()
+        await self._session.execute(
+            insert(CatalogTombstone).from_select(
+                ["table_name", "entity_id", "change_version"],
+                select(literal(table_name), rows.c[0], literal(version)),
+            )
+        )
+
+    async def get_changed_categories(
+        self, since: int, until: int, limit: int | None = None
+    ) -> list[Category]:
+        """Категории с change_version в (since, until], по возрастанию версии."""
+        stmt = (
+            select(Category)
+            .where(Category.change_version > since, Category.change_version <= until)
+            .order_by(Category.change_version, Category.id)
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        result = await self._session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def get_changed_nomenclature(
+        self, since: int, until: int, limit: int | None = None
+    ) -> list[Nomenclature]:
+        """Номенклатура с change_version в (since, until], по возрастанию версии."""
+        stmt = (
+            select(Nomenclature)
+            .where(Nomenclature.change_version > since, Nomenclature.change_version <= until)
+            .order_by(Nomenclature.change_version, Nomenclature.id)
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        result = await self._session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def get_tombstones(
+        self, since: int, until: int, limit: int | None = None
+    ) -> list[CatalogTombstone]:
+        """Надгробия с change_version в (since, until], по возрастанию версии."""
+        stmt = (
+            select(CatalogTombstone)
+            .where(
+                CatalogTombstone.change_version > since,
+                CatalogTombstone.change_version <= until,
+            )
+            .order_by(CatalogTombstone.change_version, CatalogTombstone.id)
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        result = await self._session.execute(stmt)
+        return list(result.scalars().all())
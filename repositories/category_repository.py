@@ -1,12 +1,44 @@
 """Репозиторий для работы с категориями."""
 
-from sqlalchemy import func, select
+from sqlalchemy import CTE, Select, delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from database.models import Category, Nomenclature
 from repositories.base import BaseRepository
 
 
+def category_subtree_cte(category_id: int) -> CTE:
+    """Рекурсивный CTE с ID категории и всех её потомков (колонка id)."""
+    subtree = (
+        select(Category.id)
+        .where(Category.id == category_id)
+        .cte("category_subtree", recursive=True)
+    )
+    child = aliased(Category)
+    return subtree.union_all(select(child.id).where(child.parent_id == subtree.c.id))
+
+
+def category_ancestors_cte(category_id: int) -> CTE:
+    """Рекурсивный CTE с ID категории и всех её предков (колонка id): O(глубины)."""
+    ancestors = (
+        select(Category.id, Category.parent_id)
+        .where(Category.id == category_id)
+        .cte("category_ancestors", recursive=True)
+    )
+    parent = aliased(Category)
+    return ancestors.union_all(
+        select(parent.id, parent.parent_id).where(parent.id == ancestors.c.parent_id)
+    )
+
+
+def category_ids(category_id: int, subtree: bool) -> Select:
+    """SELECT id категории — только её самой или (subtree=True) всего поддерева."""
+    if subtree:
+        return select(category_subtree_cte(category_id).c.id)
+    return select(Category.id).where(Category.id == category_id)
+
+
 class CategoryRepository(BaseRepository[Category]):
     """CRUD-операции для Category."""
 
@@ -51,3 +83,43 @@ class CategoryRepository(BaseRepository[Category]):
             .group_by(Nomenclature.category_id)
         )
         return {row[0]: row[1] for row in result.all()}
+
+    async def is_in_subtree(self, category_id: int, root_id: int) -> bool:
+        """Входит ли category_id в поддерево root_id (включая сам root_id): подъём по предкам."""
+        ancestors = category_ancestors_cte(category_id)
+        result = await self._session.execute(
+            select(ancestors.c.id).where(ancestors.c.id == root_id).limit(1)
+        )
+        return result.first() is not None
+
+    async def set_parent(self, category_id: int, parent_id: int | None, version: int) -> None:
+        """Перенести категорию под parent_id (одним UPDATE, поддерево переезжает вместе с ней)."""
+        await self._session.execute(
+            update(Category)
+            .where(Category.id == category_id)
+            .values(parent_id=parent_id, change_version=version)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def reattach_children(
+        self, category_id: int, parent_id: int | None, version: int
+    ) -> list[int]:
+        """Перевесить дочерние категории category_id на parent_id; ID перевешенных."""
+        result = await self._session.execute(
+            update(Category)
+            .where(Category.parent_id == category_id)
+            .values(parent_id=parent_id, change_version=version)
+            .returning(Category.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars().all())
+
+    async def delete_many(self, ids: Select) -> list[int]:
+        """Удалить категории с ID из подзапроса (один DELETE); ID удалённых."""
+        result = await self._session.execute(
+            delete(Category)
+            .where(Category.id.in_(ids))
+            .returning(Category.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars().all())
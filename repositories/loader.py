@@ -0,0 +1,79 @@
+"""
+Пакетная загрузка сущностей по ID в пределах одной сессии (в духе DataLoader).
+
+Вызовы load(id), сделанные в одном проходе event loop (например, через
+asyncio.gather), собираются в пачку и выполняются одним запросом
+`WHERE id IN (...)`. Загрузчик хранится в session.info, то есть живёт
+столько же, сколько сессия запроса: при её закрытии close() отменяет
+незавершённые пачки и ожидающие их load().
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+BatchFetch = Callable[[list[int]], Awaitable[dict[int, T]]]
+
+
+class BatchLoader(Generic[T]):
+    """Объединяет запросы по ID, сделанные в одном такте event loop, в один fetch."""
+
+    def __init__(self, fetch: BatchFetch[T]) -> None:
+        self._fetch = fetch
+        self._pending: dict[int, list[asyncio.Future[T | None]]] = {}
+        self._scheduled: asyncio.Handle | None = None
+        # Ссылки на задачи пачек: без них задачу может собрать сборщик мусора
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self, id: int) -> T | None:
+        """Сущность по ID или None; запрос к БД — один на всю пачку."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[T | None] = loop.create_future()
+        if not self._pending:
+            # Пачка отправляется после того, как отработают уже готовые задачи
+            self._scheduled = loop.call_soon(self._start_dispatch)
+        self._pending.setdefault(id, []).append(future)
+        return await future
+
+    def close(self) -> None:
+        """Отменить запланированную и выполняющиеся пачки; ожидающие load() получат CancelledError."""
+        if self._scheduled is not None:
+            self._scheduled.cancel()
+            self._scheduled = None
+        pending, self._pending = self._pending, {}
+        _cancel(pending)
+        for task in list(self._tasks):
+            task.cancel()
+
+    def _start_dispatch(self) -> None:
+        self._scheduled = None
+        task = asyncio.get_running_loop().create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        try:
+            found = await self._fetch(list(pending))
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        except BaseException:
+            # Отмена (close) или завершение процесса: load() не должны ждать вечно
+            _cancel(pending)
+            raise
+        for id, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(found.get(id))
+
+
+def _cancel(pending: dict[int, list[asyncio.Future]]) -> None:
+    for futures in pending.values():
+        for future in futures:
+            future.cancel()
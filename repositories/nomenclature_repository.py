@@ -1,10 +1,157 @@
 """Репозиторий для работы с номенклатурой."""
 
-from sqlalchemy import select
+from collections import defaultdict
+from collections.abc import Sequence
+from datetime import datetime
+from decimal import ROUND_FLOOR, Decimal
+
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    and_,
+    case,
+    delete,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    type_coerce,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.models import Nomenclature
+from database.models import (
+    Nomenclature,
+    NomenclatureStockShard,
+    OrderItem,
+    StockHold,
+    nomenclature_fts,
+)
 from repositories.base import BaseRepository
+from repositories.category_repository import category_subtree_cte
+
+
+def available_quantity() -> ColumnElement[Decimal]:
+    """
+    Доступный остаток строки nomenclature: у шардированного товара (stock_shards > 0)
+    — сумма шардов (коррелированный подзапрос по первичному ключу шардов), иначе quantity.
+    """
+    shards = (
+        select(func.coalesce(func.sum(NomenclatureStockShard.quantity), 0))
+        .where(NomenclatureStockShard.nomenclature_id == Nomenclature.id)
+        .correlate_except(NomenclatureStockShard)
+        .scalar_subquery()
+    )
+    return type_coerce(
+        case((Nomenclature.stock_shards > 0, shards), else_=Nomenclature.quantity),
+        Nomenclature.quantity.type,
+    )
+
+
+def free_quantity(now: datetime, order_id: int | None = None) -> ColumnElement[Decimal]:
+    """
+    Остаток, который может взять заказ order_id: available_quantity() минус
+    активные (expires_at > now) удержания других заказов — сумма по диапазону
+    индекса ix_stock_holds_nomenclature_shard_expires (по префиксу nomenclature_id).
+    Без order_id вычитаются все удержания.
+    """
+    held = select(func.coalesce(func.sum(StockHold.quantity), 0)).where(
+        StockHold.nomenclature_id == Nomenclature.id, StockHold.expires_at > now
+    )
+    if order_id is not None:
+        held = held.where(StockHold.order_id != order_id)
+    return type_coerce(
+        available_quantity() - held.correlate_except(StockHold).scalar_subquery(),
+        Nomenclature.quantity.type,
+    )
+
+
+def shard_free_quantity(now: datetime, order_id: int | None = None) -> ColumnElement[Decimal]:
+    """
+    Свободный остаток строки шарда: quantity минус активные удержания, записанные
+    на этот шард (без удержаний заказа order_id), — диапазон индекса
+    ix_stock_holds_nomenclature_shard_expires.
+    """
+    held = select(func.coalesce(func.sum(StockHold.quantity), 0)).where(
+        StockHold.nomenclature_id == NomenclatureStockShard.nomenclature_id,
+        StockHold.shard == NomenclatureStockShard.shard,
+        StockHold.expires_at > now,
+    )
+    if order_id is not None:
+        held = held.where(StockHold.order_id != order_id)
+    return type_coerce(
+        NomenclatureStockShard.quantity - held.correlate_except(StockHold).scalar_subquery(),
+        NomenclatureStockShard.quantity.type,
+    )
+
+
+def split_evenly(total: Decimal, count: int) -> list[Decimal]:
+    """
+    Разложить остаток на count шардов поровну в целых единицах: остаток от деления
+    — по единице в первые шарды, дробная часть — в шард 0.
+    """
+    base = (total / count).to_integral_value(ROUND_FLOOR)
+    extra = int((total - base * count).to_integral_value(ROUND_FLOOR))
+    parts = [base + 1 if shard < extra else base for shard in range(count)]
+    parts[0] += total - sum(parts)
+    return parts
+
+
+def spread_over_holds(total: Decimal, held: Sequence[Decimal]) -> list[Decimal]:
+    """
+    Разложить остаток total по шардам с удержаниями held (по номеру шарда) так,
+    чтобы свободный остаток шардов был поровну; если удержаний больше остатка —
+    просто поровну.
+    """
+    free = total - sum(held, Decimal(0))
+    if free < 0:
+        return split_evenly(total, len(held))
+    return [hold + part for hold, part in zip(held, split_evenly(free, len(held)))]
+
+
+def listing_query(
+    *,
+    category_id: int | None = None,
+    price_min: Decimal | None = None,
+    price_max: Decimal | None = None,
+    in_stock: bool = False,
+    descending: bool = False,
+    after: tuple[Decimal, int] | None = None,
+    limit: int = 50,
+) -> Select:
+    """
+    Запрос витрины: поддерево категории, диапазон цен, наличие; сортировка по (price, id).
+
+    Каждое сочетание фильтров обслуживается индексом: ix_nomenclature_category_price_id
+    (категория), ix_nomenclature_in_stock_price_id (частичный, quantity > 0) или
+    ix_nomenclature_price_id. after — ключ (price, id) последней строки предыдущей страницы.
+    """
+    stmt = select(Nomenclature)
+    if category_id is not None:
+        subtree = category_subtree_cte(category_id)
+        stmt = stmt.where(Nomenclature.category_id.in_(select(subtree.c.id)))
+    if price_min is not None:
+        stmt = stmt.where(Nomenclature.price >= price_min)
+    if price_max is not None:
+        stmt = stmt.where(Nomenclature.price <= price_max)
+    if in_stock:
+        # Литерал, а не параметр: иначе планировщик не сопоставит условие с частичным индексом
+        stmt = stmt.where(Nomenclature.quantity > literal_column("0"))
+
+    key = tuple_(Nomenclature.price, Nomenclature.id)
+    if after is not None:
+        after_key = tuple_(*after, types=[Nomenclature.price.type, Nomenclature.id.type])
+    if descending:
+        if after is not None:
+            stmt = stmt.where(key < after_key)
+        stmt = stmt.order_by(Nomenclature.price.desc(), Nomenclature.id.desc())
+    else:
+        if after is not None:
+            stmt = stmt.where(key > after_key)
+        stmt = stmt.order_by(Nomenclature.price, Nomenclature.id)
+    return stmt.limit(limit)
 
 
 class NomenclatureRepository(BaseRepository[Nomenclature]):
@@ -19,3 +166,391 @@ class NomenclatureRepository(BaseRepository[Nomenclature]):
             select(Nomenclature).order_by(Nomenclature.id)
         )
         return list(result.scalars().all())
+
+    async def move_to_category(
+        self, category_ids: Select, category_id: int | None, version: int
+    ) -> list[int]:
+        """Перенести товары категорий из подзапроса в category_id (один UPDATE); ID перенесённых."""
+        result = await self._session.execute(
+            update(Nomenclature)
+            .where(Nomenclature.category_id.in_(category_ids))
+            .values(category_id=category_id, change_version=version)
+            .returning(Nomenclature.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars().all())
+
+    async def get_available(
+        self, ids: Sequence[int], order_id: int | None = None
+    ) -> dict[int, Decimal]:
+        """
+        Остаток товаров по списку ID, доступный заказу order_id (free_quantity: с учётом
+        шардов и удержаний других заказов); отсутствующих ID нет в ответе.
+        """
+        result = await self._session.execute(
+            select(
+                Nomenclature.id, free_quantity(datetime.utcnow(), order_id).label("available")
+            ).where(Nomenclature.id.in_(ids))
+        )
+        return {row.id: row.available for row in result.all()}
+
+    async def lock_for_hold(self, ids: Sequence[int] | Select) -> set[int]:
+        """
+        Заблокировать строки нешардированных товаров из ids до конца транзакции
+        перед проверкой доступного остатка и записью удержаний: удержания одного
+        товара параллельными заказами не превышают остаток, а оформление
+        (reserve_for_order) списывает под той же блокировкой строки. Блокировка
+        короткая — только на время запроса API. Возвращает ID этих товаров.
+
+        Строки шардированных товаров не блокируются: их удержания записываются
+        под блокировкой шарда (claim_shard), и добавления горячего товара не
+        выстраиваются в очередь за одной строкой.
+
+        PostgreSQL — SELECT ... FOR NO KEY UPDATE по возрастанию ID. В SQLite
+        запись сериализована, запрос только читает ID.
+        """
+        result = await self._session.execute(
+            select(Nomenclature.id)
+            .where(Nomenclature.id.in_(ids), Nomenclature.stock_shards == 0)
+            .order_by(Nomenclature.id)
+            .with_for_update(key_share=True)
+        )
+        return set(result.scalars().all())
+
+    async def reserve_for_order(self, order_id: int, change_version: int) -> set[int]:
+        """
+        Списать остатки по всем позициям заказа одним UPDATE ... FROM order_items.
+
+        Строка номенклатуры уменьшается только если остатка за вычетом активных
+        удержаний других заказов хватает на позицию, поэтому CHECK quantity >= 0
+        не нарушается. Возвращает ID номенклатуры,
+        по которым списание прошло; позиции вне этого множества — нехватка.
+        Списанные строки получают change_version. Шардированные товары не
+        затрагиваются — их списывает take_from_shards.
+        """
+        result = await self._session.execute(
+            update(Nomenclature)
+            .where(
+                Nomenclature.id == OrderItem.nomenclature_id,
+                OrderItem.order_id == order_id,
+                Nomenclature.stock_shards == 0,
+                free_quantity(datetime.utcnow(), order_id) >= OrderItem.quantity,
+            )
+            .values(
+                quantity=Nomenclature.quantity - OrderItem.quantity,
+                change_version=change_version,
+            )
+            .returning(Nomenclature.id)
+            .execution_options(synchronize_session=False)
+        )
+        return set(result.scalars().all())
+
+    async def claim_shard(
+        self, nomenclature_id: int, quantity: Decimal, order_id: int
+    ) -> int | None:
+        """
+        Заблокировать шард товара, свободного остатка которого (shard_free_quantity,
+        без удержаний заказа order_id) хватает на quantity; номер шарда или None,
+        если не хватает свободного остатка всех шардов.
+
+        Общая защита удержаний и списаний шардированного товара: и удержание, и
+        списание пишутся только под блокировкой своего шарда, поэтому между
+        проверкой свободного остатка шарда и записью чужая запись в шард не
+        вклинится, а остаток шарда не опускается ниже удержаний на нём.
+
+        Быстрый путь — случайный подходящий шард FOR UPDATE SKIP LOCKED:
+        конкурентные транзакции берут разные строки и не ждут друг друга.
+        Свободный остаток перепроверяется отдельным запросом уже после
+        блокировки — в PostgreSQL (READ COMMITTED) его снимок видит все
+        удержания шарда. Если подходящего шарда нет (заняты или свободный
+        остаток раздроблен), шарды товара блокируются по порядку и на самый
+        свободный переносится остаток со свободных частей остальных.
+        """
+        now = datetime.utcnow()
+        free = shard_free_quantity(now, order_id)
+        shard = await self._session.scalar(
+            select(NomenclatureStockShard.shard)
+            .where(NomenclatureStockShard.nomenclature_id == nomenclature_id, free >= quantity)
+            .order_by(func.random())
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if shard is not None and await self._session.scalar(
+            select(free).where(
+                NomenclatureStockShard.nomenclature_id == nomenclature_id,
+                NomenclatureStockShard.shard == shard,
+            )
+        ) >= quantity:
+            return shard
+
+        shards = (await self.lock_shards([nomenclature_id])).get(nomenclature_id, [])
+        held = (await self.get_shard_holds([nomenclature_id], now, order_id)).get(nomenclature_id, {})
+        free_parts = [part - held.get(shard, 0) for shard, part in enumerate(shards)]
+        if not shards or sum(free_parts) < quantity:
+            return None
+        target = max(range(len(shards)), key=free_parts.__getitem__)
+        needed = quantity - free_parts[target]
+        rows = []
+        for shard in sorted(range(len(shards)), key=lambda shard: -free_parts[shard]):
+            if needed <= 0:
+                break
+            if shard == target or free_parts[shard] <= 0:
+                continue
+            moved = min(free_parts[shard], needed)
+            rows.append({"shard": shard, "quantity": shards[shard] - moved})
+            needed -= moved
+        if rows:
+            rows.append({"shard": target, "quantity": shards[target] + quantity - free_parts[target]})
+            await self.set_shards(nomenclature_id, rows)
+        return target
+
+    async def take_from_shards(self, nomenclature_id: int, quantity: Decimal, order_id: int) -> bool:
+        """
+        Списать quantity с шардов остатка товара при оформлении заказа order_id;
+        False — свободного остатка шардов (без чужих удержаний) не хватает.
+        Шард выбирается claim_shard — под той же защитой, что удержания.
+        """
+        shard = await self.claim_shard(nomenclature_id, quantity, order_id)
+        if shard is None:
+            return False
+        await self._session.execute(
+            update(NomenclatureStockShard)
+            .where(
+                NomenclatureStockShard.nomenclature_id == nomenclature_id,
+                NomenclatureStockShard.shard == shard,
+            )
+            .values(quantity=NomenclatureStockShard.quantity - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return True
+
+    async def get_shard_holds(
+        self, ids: Sequence[int], now: datetime, order_id: int | None = None
+    ) -> dict[int, dict[int, Decimal]]:
+        """
+        Активные удержания шардов товаров (без заказа order_id): ID -> {шард: количество}.
+        Вызывается после lock_shards — снимок запроса видит все удержания шардов.
+        """
+        stmt = (
+            select(StockHold.nomenclature_id, StockHold.shard, func.sum(StockHold.quantity))
+            .where(StockHold.nomenclature_id.in_(ids), StockHold.expires_at > now)
+            .group_by(StockHold.nomenclature_id, StockHold.shard)
+        )
+        if order_id is not None:
+            stmt = stmt.where(StockHold.order_id != order_id)
+        held: dict[int, dict[int, Decimal]] = defaultdict(dict)
+        for nomenclature_id, shard, quantity in (await self._session.execute(stmt)).all():
+            held[nomenclature_id][shard] = quantity
+        return dict(held)
+
+    async def lock_shards(self, ids: Sequence[int]) -> dict[int, list[Decimal]]:
+        """
+        Заблокировать шарды товаров (SELECT ... FOR UPDATE в порядке (товар, шард))
+        и вернуть их остатки: ID -> список по номеру шарда.
+        """
+        result = await self._session.execute(
+            select(
+                NomenclatureStockShard.nomenclature_id,
+                NomenclatureStockShard.quantity,
+            )
+            .where(NomenclatureStockShard.nomenclature_id.in_(ids))
+            .order_by(NomenclatureStockShard.nomenclature_id, NomenclatureStockShard.shard)
+            .with_for_update()
+        )
+        shards: dict[int, list[Decimal]] = defaultdict(list)
+        for row in result.all():
+            shards[row.nomenclature_id].append(row.quantity)
+        return dict(shards)
+
+    async def set_shards(self, nomenclature_id: int, rows: Sequence[dict]) -> None:
+        """Записать остатки шардов товара (заблокированных lock_shards): rows — {"shard", "quantity"}."""
+        if rows:
+            await self._session.execute(
+                update(NomenclatureStockShard).execution_options(synchronize_session=False),
+                [{"nomenclature_id": nomenclature_id, **row} for row in rows],
+            )
+
+    async def set_sharding(
+        self, nomenclature_id: int, quantity: Decimal, shards: int, change_version: int
+    ) -> None:
+        """
+        Перевести товар на shards шардов (0 — обратно в nomenclature.quantity):
+        прежние шарды удаляются, удержания товара переносятся на шард 0, остаток
+        quantity раскладывается так, чтобы свободный остаток шардов был поровну.
+        """
+        await self._session.execute(
+            update(Nomenclature)
+            .where(Nomenclature.id == nomenclature_id)
+            .values(quantity=quantity, stock_shards=shards, change_version=change_version)
+            .execution_options(synchronize_session=False)
+        )
+        await self._session.execute(
+            delete(NomenclatureStockShard).where(
+                NomenclatureStockShard.nomenclature_id == nomenclature_id
+            )
+        )
+        await self._session.execute(
+            update(StockHold)
+            .where(StockHold.nomenclature_id == nomenclature_id)
+            .values(shard=0)
+            .execution_options(synchronize_session=False)
+        )
+        if shards:
+            held = (await self.get_shard_holds([nomenclature_id], datetime.utcnow())).get(
+                nomenclature_id, {}
+            )
+            parts = spread_over_holds(quantity, [held.get(0, Decimal(0))] + [Decimal(0)] * (shards - 1))
+            await self._session.execute(
+                insert(NomenclatureStockShard),
+                [
+                    {"nomenclature_id": nomenclature_id, "shard": shard, "quantity": part}
+                    for shard, part in enumerate(parts)
+                ],
+            )
+
+    async def lock_displayed_stock(self, ids: Sequence[int]) -> dict[int, Decimal]:
+        """
+        Заблокировать строки товаров и вернуть витринный quantity.
+
+        FOR NO KEY UPDATE: не конфликтует с KEY SHARE, который берут вставки
+        order_items по внешнему ключу, — добавление в заказ не ждёт.
+        """
+        result = await self._session.execute(
+            select(Nomenclature.id, Nomenclature.quantity)
+            .where(Nomenclature.id.in_(ids))
+            .order_by(Nomenclature.id)
+            .with_for_update(key_share=True)
+        )
+        return {row.id: row.quantity for row in result.all()}
+
+    async def set_displayed_stock(self, rows: Sequence[dict], change_version: int) -> None:
+        """Записать витринный quantity шардированных товаров: rows — {"id", "quantity"}."""
+        if rows:
+            await self._session.execute(
+                update(Nomenclature).execution_options(synchronize_session=False),
+                [{**row, "change_version": change_version} for row in rows],
+            )
+
+    async def get_sharded_ids(self) -> list[int]:
+        """ID шардированных товаров (по первичному ключу таблицы шардов)."""
+        result = await self._session.execute(
+            select(NomenclatureStockShard.nomenclature_id)
+            .distinct()
+            .order_by(NomenclatureStockShard.nomenclature_id)
+        )
+        return list(result.scalars().all())
+
+    async def list_filtered(self, **filters) -> list[Nomenclature]:
+        """Страница витрины; параметры — как у listing_query."""
+        result = await self._session.execute(listing_query(**filters))
+        return list(result.scalars().all())
+
+    async def lock_stock(self, ids: Sequence[int]) -> dict[int, tuple[Decimal, Decimal]]:
+        """
+        Прочитать (quantity, price) по списку ID одним запросом с блокировкой строк.
+
+        На PostgreSQL — SELECT ... FOR UPDATE, чтобы дельты применялись к актуальным
+        значениям; на SQLite запись и так сериализована единственным writer.
+        У шардированных товаров quantity — сумма шардов, шарды тоже блокируются.
+        """
+        result = await self._session.execute(
+            select(
+                Nomenclature.id,
+                Nomenclature.quantity,
+                Nomenclature.price,
+                Nomenclature.stock_shards,
+            )
+            .where(Nomenclature.id.in_(ids))
+            .with_for_update()
+        )
+        rows = result.all()
+        sharded = [row.id for row in rows if row.stock_shards]
+        shards = await self.lock_shards(sharded) if sharded else {}
+        return {
+            row.id: (sum(shards[row.id], Decimal(0)) if row.id in shards else row.quantity, row.price)
+            for row in rows
+        }
+
+    async def bulk_set_stock(self, rows: Sequence[dict]) -> None:
+        """
+        Записать новые quantity/price пакетом: один executemany UPDATE по первичному ключу.
+
+        rows — словари вида {"id": ..., "quantity": ..., "price": ..., "change_version": ...}.
+        У шардированных товаров (шарды заблокированы lock_stock) новый остаток
+        раскладывается по шардам с поровну свободным остатком (spread_over_holds).
+        """
+        if not rows:
+            return
+        await self._session.execute(
+            update(Nomenclature).execution_options(synchronize_session=False),
+            list(rows),
+        )
+        quantities = {row["id"]: row["quantity"] for row in rows if "quantity" in row}
+        if not quantities:
+            return
+        sharded = await self._session.execute(
+            select(Nomenclature.id, Nomenclature.stock_shards).where(
+                Nomenclature.id.in_(quantities), Nomenclature.stock_shards > 0
+            )
+        )
+        sharded = sharded.all()
+        if not sharded:
+            return
+        held = await self.get_shard_holds([id for id, _ in sharded], datetime.utcnow())
+        for id, count in sharded:
+            holds = held.get(id, {})
+            parts = spread_over_holds(
+                quantities[id], [holds.get(shard, Decimal(0)) for shard in range(count)]
+            )
+            await self.set_shards(
+                id, [{"shard": shard, "quantity": part} for shard, part in enumerate(parts)]
+            )
+
+    async def search(
+        self,
+        terms: Sequence[str],
+        limit: int,
+        category_id: int | None = None,
+        after: tuple[float, int] | None = None,
+    ) -> list[tuple[Nomenclature, float]]:
+        """
+        Полнотекстовый поиск по наименованию: все термы как префиксы (AND).
+
+        Сортировка по релевантности (меньше — лучше), затем по ID; after —
+        ключ (rank, id) последней строки предыдущей страницы. SQLite — FTS5
+        (bm25), PostgreSQL — GIN-индекс по tsvector (ts_rank).
+        """
+        if self._session.get_bind().dialect.name == "postgresql":
+            # Выражение должно совпадать с выражением GIN-индекса буквально, без параметров
+            vector = literal_column(
+                "to_tsvector('simple', translate(nomenclature.name, 'ёЁ', 'еЕ'))"
+            )
+            query = func.to_tsquery(
+                literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms)
+            )
+            rank = (-func.ts_rank(vector, query)).label("rank")
+            stmt = select(Nomenclature, rank).where(vector.op("@@")(query))
+        else:
+            rank = nomenclature_fts.c.rank.label("rank")
+            stmt = (
+                select(Nomenclature, rank)
+                .join(nomenclature_fts, nomenclature_fts.c.rowid == Nomenclature.id)
+                .where(nomenclature_fts.c.name.match(" ".join(f'"{term}"*' for term in terms)))
+            )
+
+        if category_id is not None:
+            subtree = category_subtree_cte(category_id)
+            stmt = stmt.where(Nomenclature.category_id.in_(select(subtree.c.id)))
+        if after is not None:
+            after_rank, after_id = after
+            stmt = stmt.where(
+                or_(
+                    rank.element > after_rank,
+                    and_(rank.element == after_rank, Nomenclature.id > after_id),
+                )
+            )
+
+        result = await self._session.execute(
+            stmt.order_by(rank.element, Nomenclature.id).limit(limit)
+        )
+        return [(row[0], row[1]) for row in result.all()]
@@ -0,0 +1,72 @@
+"""Репозиторий архива заказов: перенос старых заказов из горячих таблиц."""
+
+from datetime import datetime
+
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import DateTime
+
+from database.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from repositories.base import BaseRepository
+
+
+class OrderArchiveRepository(BaseRepository[ArchivedOrder]):
+    """Перенос заказов с позициями в orders_archive / order_items_archive."""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, ArchivedOrder)
+
+    async def archive_batch(self, cutoff: datetime, batch_size: int) -> list[int]:
+        """
+        Перенести в архив до batch_size оформленных заказов, созданных раньше cutoff.
+
+        Первый запрос — INSERT ... SELECT ... RETURNING: блокировка записи берётся
+        сразу, параллельный архиватор (другой воркер) ждёт её, а не выбирает те же
+        заказы; в PostgreSQL выбранные строки к тому же пропускаются (SKIP LOCKED).
+        ID заказов и позиций сохраняются в архиве как есть; новым строкам они не
+        достанутся: в SQLite orders и order_items — с AUTOINCREMENT (миграция 7),
+        в PostgreSQL последовательности не возвращаются назад.
+
+        :return: ID перенесённых заказов
+        """
+        now = datetime.utcnow()
+        candidates = (
+            select(
+                Order.id,
+                Order.client_id,
+                Order.created_at,
+                Order.checked_out_at,
+                literal(now, DateTime),
+            )
+            .where(Order.created_at < cutoff, Order.checked_out_at.is_not(None))
+            .order_by(Order.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self._session.execute(
+            insert(ArchivedOrder)
+            .from_select(
+                ["id", "client_id", "created_at", "checked_out_at", "archived_at"], candidates
+            )
+            .returning(ArchivedOrder.id)
+        )
+        ids = list(result.scalars().all())
+        if not ids:
+            return ids
+        await self._session.execute(
+            insert(ArchivedOrderItem).from_select(
+                ["order_id", "nomenclature_id", "id", "quantity"],
+                select(
+                    OrderItem.order_id, OrderItem.nomenclature_id, OrderItem.id, OrderItem.quantity
+                ).where(OrderItem.order_id.in_(ids)),
+            )
+        )
+        await self._session.execute(
+            delete(OrderItem)
+            .where(OrderItem.order_id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        await self._session.execute(
+            delete(Order).where(Order.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        return ids
@@ -1,12 +1,21 @@
 """Репозиторий для работы с позициями заказа."""
 
+from collections.abc import Iterable
+from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import select
+from sqlalchemy import Integer, Row, Select, column, delete, func, insert, literal, select, values
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.models import OrderItem
+from database.models import ArchivedOrderItem, Nomenclature, OrderItem
 from repositories.base import BaseRepository
+from repositories.nomenclature_repository import free_quantity
+
+
+def order_nomenclature_ids(order_id: int, archived: bool = False) -> Select:
+    """Подзапрос ID номенклатуры позиций заказа (горячих или, при archived, архивных)."""
+    source = ArchivedOrderItem if archived else OrderItem
+    return select(source.nomenclature_id).where(source.order_id == order_id)
 
 
 class OrderItemRepository(BaseRepository[OrderItem]):
@@ -27,6 +36,123 @@ class OrderItemRepository(BaseRepository[OrderItem]):
         )
         return result.scalar_one_or_none()
 
+    async def get_lines_with_stock(self, order_id: int) -> list[Row]:
+        """
+        Позиции заказа вместе с текущим остатком номенклатуры (один запрос с JOIN).
+
+        Строки: id, nomenclature_id, quantity, available (с учётом шардов и
+        удержаний других заказов), stock_shards.
+        """
+        result = await self._session.execute(
+            select(
+                OrderItem.id,
+                OrderItem.nomenclature_id,
+                OrderItem.quantity,
+                free_quantity(datetime.utcnow(), order_id).label("available"),
+                Nomenclature.stock_shards,
+            )
+            .join(Nomenclature, Nomenclature.id == OrderItem.nomenclature_id)
+            .where(OrderItem.order_id == order_id)
+            .order_by(OrderItem.id)
+        )
+        return list(result.all())
+
+    async def insert_lines(
+        self, order_id: int, lines: Iterable[tuple[int, Decimal]]
+    ) -> list[Row]:
+        """
+        Вставить позиции (nomenclature_id, quantity) в заказ одним INSERT ... SELECT
+        из VALUES с условием на доступный остаток (free_quantity) в том же запросе.
+
+        Позиции без товара или с остатком меньше количества не вставляются.
+        Строки: id, nomenclature_id, quantity вставленных позиций.
+        """
+        rows = (
+            values(
+                column("nomenclature_id", Integer),
+                column("quantity", OrderItem.quantity.type),
+                name="lines",
+            )
+            .data(list(lines))
+            .cte("lines")
+        )
+        result = await self._session.execute(
+            insert(OrderItem)
+            .from_select(
+                ["order_id", "nomenclature_id", "quantity"],
+                select(literal(order_id), rows.c.nomenclature_id, rows.c.quantity)
+                .join(Nomenclature, Nomenclature.id == rows.c.nomenclature_id)
+                .where(free_quantity(datetime.utcnow()) >= rows.c.quantity),
+            )
+            .returning(OrderItem.id, OrderItem.nomenclature_id, OrderItem.quantity)
+        )
+        return sorted(result.all(), key=lambda row: row.id)
+
+    async def copy_lines(
+        self, source_order_id: int, target_order_id: int, archived: bool = False
+    ) -> list[Row]:
+        """
+        Скопировать позиции заказа в другой заказ одним INSERT ... SELECT.
+
+        Копируются только позиции, которые покрывает текущий остаток (условие —
+        в том же запросе, как проверка при добавлении товара); источник —
+        горячие позиции или, при archived, архивные. Строки: id, nomenclature_id,
+        quantity скопированных позиций.
+        """
+        source = ArchivedOrderItem if archived else OrderItem
+        lines = (
+            select(literal(target_order_id), source.nomenclature_id, source.quantity)
+            .join(Nomenclature, Nomenclature.id == source.nomenclature_id)
+            .where(
+                source.order_id == source_order_id,
+                free_quantity(datetime.utcnow()) >= source.quantity,
+            )
+            .order_by(source.id)
+        )
+        result = await self._session.execute(
+            insert(OrderItem)
+            .from_select(["order_id", "nomenclature_id", "quantity"], lines)
+            .returning(OrderItem.id, OrderItem.nomenclature_id, OrderItem.quantity)
+        )
+        return sorted(result.all(), key=lambda row: row.id)
+
+    async def get_uncopied_lines(
+        self, source_order_id: int, target_order_id: int, archived: bool = False
+    ) -> list[Row]:
+        """
+        Позиции исходного заказа, которых нет в целевом (после copy_lines).
+
+        Строки: nomenclature_id, requested, available (0, если товара больше нет).
+        """
+        source = ArchivedOrderItem if archived else OrderItem
+        result = await self._session.execute(
+            select(
+                source.nomenclature_id,
+                source.quantity.label("requested"),
+                func.coalesce(free_quantity(datetime.utcnow()), 0).label("available"),
+            )
+            .outerjoin(Nomenclature, Nomenclature.id == source.nomenclature_id)
+            .where(
+                source.order_id == source_order_id,
+                source.nomenclature_id.not_in(
+                    select(OrderItem.nomenclature_id).where(OrderItem.order_id == target_order_id)
+                ),
+            )
+            .order_by(source.id)
+        )
+        return list(result.all())
+
+    async def delete_lines(self, order_id: int, nomenclature_ids: Iterable[int]) -> None:
+        """Удалить позиции заказа с товарами nomenclature_ids (одним DELETE)."""
+        await self._session.execute(
+            delete(OrderItem)
+            .where(
+                OrderItem.order_id == order_id,
+                OrderItem.nomenclature_id.in_(list(nomenclature_ids)),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
     async def create(
         self, order_id: int, nomenclature_id: int, quantity: Decimal
     ) -> OrderItem:
@@ -1,13 +1,153 @@
 """Репозиторий для работы с заказами."""
 
+from collections.abc import Sequence
+from datetime import datetime
+
+from sqlalchemy import (
+    DateTime,
+    Row,
+    Select,
+    exists,
+    false,
+    insert,
+    literal,
+    select,
+    true,
+    union_all,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.models import Order
+from database.models import ArchivedOrder, ArchivedOrderItem, Client, Order, OrderItem
 from repositories.base import BaseRepository
 
 
+def _orders(include_archived: bool, *criteria) -> Select:
+    """
+    Заказы (id, client_id, created_at, checked_out_at, archived) из горячей
+    таблицы и, при include_archived, UNION ALL из архива с теми же условиями.
+    criteria — функция (таблица заказов) -> список условий.
+    """
+    hot = select(
+        Order.id, Order.client_id, Order.created_at, Order.checked_out_at, false().label("archived")
+    ).where(*(c for make in criteria for c in make(Order)))
+    if not include_archived:
+        return hot
+    archived = select(
+        ArchivedOrder.id,
+        ArchivedOrder.client_id,
+        ArchivedOrder.created_at,
+        ArchivedOrder.checked_out_at,
+        true().label("archived"),
+    ).where(*(c for make in criteria for c in make(ArchivedOrder)))
+    return select(union_all(hot, archived).subquery())
+
+
 class OrderRepository(BaseRepository[Order]):
     """CRUD-операции для Order."""
 
     def __init__(self, session: AsyncSession):
         super().__init__(session, Order)
+
+    async def create(self, client_id: int | None) -> Row | None:
+        """
+        Новый пустой заказ одним INSERT ... RETURNING: строка id, client_id, created_at.
+
+        Существование клиента проверяется в том же запросе (INSERT ... SELECT
+        WHERE EXISTS); None — клиента с client_id нет.
+        """
+        created_at = datetime.utcnow()
+        if client_id is None:
+            stmt = insert(Order).values(client_id=None, created_at=created_at)
+        else:
+            stmt = insert(Order).from_select(
+                ["client_id", "created_at"],
+                select(literal(client_id), literal(created_at, DateTime)).where(
+                    exists().where(Client.id == client_id)
+                ),
+            )
+        result = await self._session.execute(
+            stmt.returning(Order.id, Order.client_id, Order.created_at)
+        )
+        return result.first()
+
+    async def lock_for_update(self, order_id: int) -> Order | None:
+        """
+        Заказ с блокировкой до конца транзакции: изменение позиций не пересекается
+        с оформлением (mark_checked_out) и с другими изменениями того же заказа.
+
+        PostgreSQL — SELECT ... FOR UPDATE. В SQLite блокировок строк нет, а
+        чтения идут до блокировки записи: пустой UPDATE строки заказа берёт её
+        сразу, иначе другой процесс успевает оформить заказ между проверкой и записью.
+        """
+        if self._session.get_bind().dialect.name == "sqlite":
+            await self._session.execute(
+                update(Order)
+                .where(Order.id == order_id)
+                .values(id=Order.id)
+                .execution_options(synchronize_session=False)
+            )
+        result = await self._session.execute(
+            select(Order)
+            .where(Order.id == order_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+
+    async def mark_checked_out(self, order_id: int, checked_out_at: datetime) -> bool:
+        """
+        Пометить заказ оформленным (один UPDATE с guard на checked_out_at IS NULL).
+
+        Возвращает False, если заказа нет или он уже оформлен.
+        """
+        result = await self._session.execute(
+            update(Order)
+            .where(Order.id == order_id, Order.checked_out_at.is_(None))
+            .values(checked_out_at=checked_out_at)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    async def get_row(self, order_id: int, include_archived: bool = False) -> Row | None:
+        """Заказ по ID (строка id, client_id, created_at, checked_out_at, archived)."""
+        stmt = _orders(include_archived, lambda t: [t.id == order_id])
+        return (await self._session.execute(stmt)).first()
+
+    async def list_by_client(
+        self,
+        client_id: int,
+        limit: int,
+        before_id: int | None = None,
+        include_archived: bool = False,
+    ) -> list[Row]:
+        """Заказы клиента от новых к старым (keyset по ID): горячие и, опционально, архивные."""
+
+        def criteria(table) -> list:
+            conditions = [table.client_id == client_id]
+            if before_id is not None:
+                conditions.append(table.id < before_id)
+            return conditions
+
+        stmt = _orders(include_archived, criteria)
+        id_column = stmt.selected_columns.id
+        result = await self._session.execute(stmt.order_by(id_column.desc()).limit(limit))
+        return list(result.all())
+
+    async def get_lines(self, order_ids: Sequence[int], include_archived: bool = False) -> list[Row]:
+        """Позиции заказов (id, order_id, nomenclature_id, quantity) одним запросом."""
+        hot = select(
+            OrderItem.id, OrderItem.order_id, OrderItem.nomenclature_id, OrderItem.quantity
+        ).where(OrderItem.order_id.in_(order_ids))
+        stmt = hot
+        if include_archived:
+            archived = select(
+                ArchivedOrderItem.id,
+                ArchivedOrderItem.order_id,
+                ArchivedOrderItem.nomenclature_id,
+                ArchivedOrderItem.quantity,
+            ).where(ArchivedOrderItem.order_id.in_(order_ids))
+            stmt = select(union_all(hot, archived).subquery())
+        id_column = stmt.selected_columns.id
+        result = await self._session.execute(stmt.order_by(id_column))
+        return list(result.all())
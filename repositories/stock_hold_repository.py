@@ -0,0 +1,97 @@
+"""Репозиторий удержаний остатка открытыми заказами."""
+
+from collections.abc import Iterable
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import delete, insert, literal, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import OrderItem, StockHold
+from repositories.base import BaseRepository
+
+
+class StockHoldRepository(BaseRepository[StockHold]):
+    """Операции с удержаниями остатка (stock_holds)."""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, StockHold)
+
+    async def set_hold(
+        self,
+        order_id: int,
+        nomenclature_id: int,
+        quantity: Decimal,
+        expires_at: datetime,
+        shard: int = 0,
+    ) -> None:
+        """
+        Удержать quantity товара за заказом до expires_at (прежнее удержание позиции
+        заменяется). Вызывается под блокировкой заказа — гонки за ключ нет; у
+        шардированного товара shard — шард, заблокированный claim_shard.
+        """
+        result = await self._session.execute(
+            update(StockHold)
+            .where(StockHold.order_id == order_id, StockHold.nomenclature_id == nomenclature_id)
+            .values(quantity=quantity, expires_at=expires_at, shard=shard)
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            await self._session.execute(
+                insert(StockHold).values(
+                    order_id=order_id,
+                    nomenclature_id=nomenclature_id,
+                    shard=shard,
+                    quantity=quantity,
+                    expires_at=expires_at,
+                )
+            )
+
+    async def hold_order_lines(
+        self, order_id: int, expires_at: datetime, nomenclature_ids: Iterable[int]
+    ) -> None:
+        """
+        Удержать позиции заказа с товарами nomenclature_ids (нешардированными)
+        до expires_at одним INSERT ... SELECT из order_items.
+        """
+        await self._session.execute(
+            insert(StockHold).from_select(
+                ["order_id", "nomenclature_id", "quantity", "expires_at"],
+                select(
+                    OrderItem.order_id,
+                    OrderItem.nomenclature_id,
+                    OrderItem.quantity,
+                    literal(expires_at, StockHold.expires_at.type),
+                ).where(
+                    OrderItem.order_id == order_id,
+                    OrderItem.nomenclature_id.in_(list(nomenclature_ids)),
+                ),
+            )
+        )
+
+    async def release_order(self, order_id: int) -> None:
+        """Снять все удержания заказа (при оформлении — остаток уже списан)."""
+        await self._session.execute(
+            delete(StockHold)
+            .where(StockHold.order_id == order_id)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def delete_expired(self, now: datetime, batch_size: int) -> int:
+        """
+        Удалить до batch_size истёкших удержаний (по ix_stock_holds_expires_at).
+
+        :return: число удалённых строк
+        """
+        expired = (
+            select(StockHold.order_id, StockHold.nomenclature_id)
+            .where(StockHold.expires_at <= now)
+            .order_by(StockHold.expires_at)
+            .limit(batch_size)
+        )
+        result = await self._session.execute(
+            delete(StockHold)
+            .where(tuple_(StockHold.order_id, StockHold.nomenclature_id).in_(expired))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
@@ -2,12 +2,22 @@
 
 from schemas.order import (
     AddItemToOrderRequest,
+    CheckoutErrorDetail,
+    OrderCheckoutResponse,
     OrderItemResponse,
+    OrderPage,
+    OrderResponse,
     ErrorDetail,
+    ShortLine,
 )
 
 __all__ = [
     "AddItemToOrderRequest",
+    "CheckoutErrorDetail",
+    "OrderCheckoutResponse",
     "OrderItemResponse",
+    "OrderPage",
+    "OrderResponse",
     "ErrorDetail",
+    "ShortLine",
 ]
@@ -0,0 +1,41 @@
+"""Схемы для ленты изменений каталога."""
+
+from pydantic import BaseModel, Field
+
+from schemas.category import CategoryResponse
+from schemas.nomenclature import NomenclatureResponse
+
+
+class CategoryChange(CategoryResponse):
+    """Изменённая категория."""
+
+    change_version: int = Field(..., description="Версия каталога, в которой строка изменена")
+
+
+class NomenclatureChange(NomenclatureResponse):
+    """Изменённый товар."""
+
+    change_version: int = Field(..., description="Версия каталога, в которой строка изменена")
+
+
+class DeletedEntry(BaseModel):
+    """Надгробие: удалённая строка каталога."""
+
+    table: str = Field(..., description="categories или nomenclature")
+    id: int
+    change_version: int
+
+    model_config = {"from_attributes": True}
+
+
+class CatalogChangesResponse(BaseModel):
+    """Ответ ленты изменений: строки, изменённые после since, и новая отметка."""
+
+    since: int = Field(..., description="Версия из запроса")
+    version: int = Field(
+        ..., description="Новая отметка: передайте её в since следующего запроса"
+    )
+    has_more: bool = Field(..., description="Есть ещё изменения после version")
+    categories: list[CategoryChange] = Field(default_factory=list)
+    nomenclature: list[NomenclatureChange] = Field(default_factory=list)
+    deleted: list[DeletedEntry] = Field(default_factory=list)
@@ -13,6 +13,25 @@ class CategoryResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class CategoryMoveRequest(BaseModel):
+    """Тело запроса переноса категории."""
+
+    parent_id: int | None = Field(..., description="Новый родитель; null — на корневой уровень")
+
+
+class CategoryDeleteResponse(BaseModel):
+    """Ответ: итог удаления категории."""
+
+    deleted: int = Field(..., description="Сколько категорий удалено (с поддеревом при cascade)")
+    reattached: int = Field(
+        0, description="Сколько дочерних категорий перевешено на родителя удалённой (без cascade)"
+    )
+    moved_nomenclature: int = Field(..., description="Сколько товаров перенесено")
+    items_moved_to: int | None = Field(
+        None, description="Категория, куда перенесены товары (null — без категории)"
+    )
+
+
 class CategoryTreeItem(BaseModel):
     """Элемент дерева категорий с вложенными дочерними."""
 
@@ -1,8 +1,11 @@
 """Схемы для номенклатуры (товаров)."""
 
 from decimal import Decimal
+from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+from settings.config import settings
 
 
 class NomenclatureResponse(BaseModel):
@@ -15,3 +18,66 @@ class NomenclatureResponse(BaseModel):
     category_id: int | None = Field(None, description="ID категории")
 
     model_config = {"from_attributes": True}
+
+
+class NomenclatureStockUpdate(BaseModel):
+    """Изменение остатка и/или цены одного товара: абсолютное значение или дельта."""
+
+    id: int = Field(..., description="ID номенклатуры", gt=0)
+    quantity: Decimal | None = Field(None, description="Новый остаток", ge=0)
+    quantity_delta: Decimal | None = Field(None, description="Изменение остатка (+/-)")
+    price: Decimal | None = Field(None, description="Новая цена", ge=0)
+
+    @model_validator(mode="after")
+    def check_fields(self) -> "NomenclatureStockUpdate":
+        if self.quantity is not None and self.quantity_delta is not None:
+            raise ValueError("Укажите либо quantity, либо quantity_delta")
+        if self.quantity is None and self.quantity_delta is None and self.price is None:
+            raise ValueError("Нужно указать quantity, quantity_delta или price")
+        return self
+
+
+class NomenclatureBulkUpdateRequest(BaseModel):
+    """Тело запроса: массовое обновление остатков и цен."""
+
+    items: list[NomenclatureStockUpdate] = Field(
+        ..., min_length=1, max_length=settings.nomenclature_bulk_max_items
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "items": [
+                        {"id": 1, "quantity": 10},
+                        {"id": 2, "quantity_delta": -1, "price": 18500},
+                    ]
+                }
+            ]
+        }
+    }
+
+
+class RejectedStockUpdate(BaseModel):
+    """Строка массового обновления, которая не применена."""
+
+    id: int
+    reason: Literal["not_found", "negative_quantity"] = Field(
+        ..., description="not_found — нет такого ID; negative_quantity — остаток ушёл бы в минус"
+    )
+
+
+class NomenclatureBulkUpdateResponse(BaseModel):
+    """Ответ: итог массового обновления."""
+
+    updated: int = Field(..., description="Количество применённых строк")
+    rejected: list[RejectedStockUpdate] = Field(default_factory=list)
+
+
+class NomenclaturePage(BaseModel):
+    """Ответ поиска и фильтрованного списка: страница товаров и курсор следующей."""
+
+    items: list[NomenclatureResponse]
+    next_cursor: str | None = Field(
+        None, description="Передайте в cursor, чтобы получить следующую страницу"
+    )
@@ -1,5 +1,6 @@
 """Схемы для заказов и добавления товара в заказ."""
 
+from datetime import datetime
 from decimal import Decimal
 
 from pydantic import BaseModel, Field
@@ -25,6 +26,37 @@ class AddItemToOrderRequest(BaseModel):
     }
 
 
+class OrderLineRequest(BaseModel):
+    """Позиция нового заказа."""
+
+    nomenclature_id: int = Field(..., description="ID номенклатуры (товара)", gt=0)
+    quantity: Decimal = Field(..., description="Количество", gt=0)
+
+
+class CreateOrderRequest(BaseModel):
+    """Тело запроса: новый заказ с начальными позициями."""
+
+    client_id: int | None = Field(None, description="ID клиента", gt=0)
+    lines: list[OrderLineRequest] = Field(
+        default_factory=list,
+        description="Позиции; повторы одной номенклатуры суммируются",
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "client_id": 1,
+                    "lines": [
+                        {"nomenclature_id": 1, "quantity": 2},
+                        {"nomenclature_id": 3, "quantity": 0.5},
+                    ],
+                }
+            ]
+        }
+    }
+
+
 class OrderItemResponse(BaseModel):
     """Ответ: позиция заказа после добавления/обновления."""
 
@@ -41,3 +73,57 @@ class ErrorDetail(BaseModel):
 
     detail: str = Field(..., description="Описание ошибки")
     code: str | None = Field(None, description="Код ошибки")
+
+
+class ShortLine(BaseModel):
+    """Позиция заказа, по которой не хватило остатка (при оформлении или повторе заказа)."""
+
+    nomenclature_id: int
+    requested: Decimal = Field(..., description="Количество в заказе")
+    available: Decimal = Field(..., description="Остаток на складе")
+
+
+class CheckoutShortageDetail(BaseModel):
+    """Детали ошибки оформления или создания заказа: какие позиции не обеспечены остатком."""
+
+    message: str
+    short_lines: list[ShortLine]
+
+
+class CheckoutErrorDetail(BaseModel):
+    """Ответ 400 при оформлении или создании заказа с нехваткой товара."""
+
+    detail: CheckoutShortageDetail
+
+
+class OrderCheckoutResponse(BaseModel):
+    """Ответ: оформленный заказ с позициями, по которым списан остаток."""
+
+    order_id: int
+    checked_out_at: datetime
+    items: list[OrderItemResponse]
+
+
+class OrderResponse(BaseModel):
+    """Заказ с позициями; archived — заказ перенесён в архив."""
+
+    id: int
+    client_id: int | None
+    created_at: datetime
+    checked_out_at: datetime | None
+    archived: bool = False
+    items: list[OrderItemResponse]
+
+
+class OrderPage(BaseModel):
+    """Страница заказов клиента от новых к старым; next_before_id — для следующей страницы."""
+
+    items: list[OrderResponse]
+    next_before_id: int | None = None
+
+
+class OrderCloneResponse(BaseModel):
+    """Ответ: новый заказ-повтор и позиции исходного, не скопированные из-за нехватки остатка."""
+
+    order: OrderResponse
+    short_lines: list[ShortLine] = Field(default_factory=list)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Разовая архивация заказов (например, из cron вместо фоновой задачи приложения).
+
+    python scripts/archive_orders.py --older-than-days 90
+    python scripts/archive_orders.py --older-than-days 90 --batch-size 200 --max-batches 10
+
+Оформленные заказы старше --older-than-days с позициями переносятся в
+orders_archive / order_items_archive пачками, каждая — в своей транзакции
+(services/order_archive.py). По умолчанию — ORDER_ARCHIVE_* из настроек.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# Корень проекта в PYTHONPATH
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.db_helper import db_helper
+from services.order_archive import archive_orders
+from settings.config import settings
+
+
+async def _run(args: argparse.Namespace) -> int:
+    try:
+        moved = await archive_orders(
+            db_helper.session_factory,
+            timedelta(days=args.older_than_days),
+            args.batch_size,
+            args.pause_seconds,
+            args.max_batches,
+        )
+    finally:
+        await db_helper.dispose()
+    print(f"Перенесено в архив заказов: {moved}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--older-than-days", type=float, default=settings.order_archive_after_days)
+    parser.add_argument("--batch-size", type=int, default=settings.order_archive_batch_size)
+    parser.add_argument("--pause-seconds", type=float, default=settings.order_archive_pause_seconds)
+    parser.add_argument("--max-batches", type=int, default=None, help="не больше стольких пачек")
+    args = parser.parse_args()
+    if args.older_than_days <= 0:
+        parser.error("укажите --older-than-days (или ORDER_ARCHIVE_AFTER_DAYS) больше 0")
+    sys.exit(asyncio.run(_run(args)))
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Советчик по индексам: планы запросов нагрузки, полные просмотры, сортировки
+во временных B-деревьях, неиспользуемые индексы и проверенные предложения.
+
+    # синтетическая нагрузка сервисов на временной БД с --seed товарами
+    python scripts/index_advisor.py --seed 20000
+
+    # своя БД (SQLite копируется во временный файл) и сохранение нагрузки
+    python scripts/index_advisor.py --database-url sqlite:///./app.db --save-workload workload.jsonl
+
+    # записанная нагрузка (JSONL: sql, parameters, count) против реплики PostgreSQL
+    python scripts/index_advisor.py --database-url postgresql://... --workload workload.jsonl
+
+Без --workload нагрузка получается вызовом сервисов (витрина с фильтрами,
+поиск, дерево категорий, лента изменений, товары по ID, добавление в заказ,
+оформление, массовое обновление остатков) с записью всех SQL; изменения
+откатываются. Кандидаты создаются внутри SAVEPOINT и откатываются, но на время
+проверки блокируют таблицу — для PostgreSQL указывайте реплику или копию.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from dataclasses import asdict
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _migrate(database_url: str) -> None:
+    subprocess.run(
+        [sys.executable, "scripts/migrate.py"],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": database_url},
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def _copy_sqlite(database_url: str, tmp: str) -> str:
+    """Копия файла SQLite через backup API (консистентна при работающем приложении)."""
+    source_path = database_url.split("///", 1)[1]
+    target_path = f"{tmp}/advisor.db"
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    with target:
+        source.backup(target)
+    source.close()
+    target.close()
+    return f"sqlite:///{target_path}"
+
+
+async def _seed(engine, rows: int) -> None:
+    """Объём для осмысленных планов: дерево категорий, товары, клиенты, заказы с позициями."""
+    from sqlalchemy import insert
+
+    from database.models import Category, Client, Nomenclature, Order, OrderItem
+
+    rng = random.Random(42)
+    async with engine.begin() as conn:
+        categories = [{"id": i, "name": f"Категория {i}", "parent_id": None} for i in range(1, 21)]
+        categories += [
+            {"id": i, "name": f"Категория {i}", "parent_id": rng.randint(1, i - 1)} for i in range(21, 201)
+        ]
+        await conn.execute(insert(Category), categories)
+        await conn.execute(
+            insert(Nomenclature),
+            [
+                {
+                    "name": f"Товар {i} {rng.choice(['синий', 'красный', 'большой', 'малый'])}",
+                    "quantity": rng.choice([0, 0, 1, 5, 20, 100]),
+                    "price": rng.randint(100, 100_000),
+                    "category_id": rng.randint(1, 200),
+                }
+                for i in range(1, rows + 1)
+            ],
+        )
+        await conn.execute(insert(Client), [{"name": f"Клиент {i}", "address": ""} for i in range(1, 201)])
+        orders = max(rows // 10, 1)
+        await conn.execute(insert(Order), [{"client_id": rng.randint(1, 200)} for _ in range(orders)])
+        await conn.execute(
+            insert(OrderItem),
+            [
+                {"order_id": order_id, "nomenclature_id": nomenclature_id, "quantity": 1}
+                for order_id in range(1, orders + 1)
+                for nomenclature_id in rng.sample(range(1, rows + 1), min(3, rows))
+            ],
+        )
+
+
+async def _synthetic_workload(helper) -> None:
+    """Вызовы сервисов с типичными параметрами; записи откатываются."""
+    from sqlalchemy import select
+
+    from database.models import Category, Nomenclature, Order
+    from schemas.nomenclature import NomenclatureStockUpdate
+    from services import catalog_service, category_service, nomenclature_service, order_service
+
+    async with helper.read_session_factory() as session:
+        category_ids = list((await session.scalars(select(Category.id).limit(50))).all())
+        nomenclature_ids = list(
+            (await session.scalars(select(Nomenclature.id).where(Nomenclature.quantity > 10).limit(50))).all()
+        )
+
+    rng = random.Random(7)
+    async with helper.read_session_factory() as session:
+        for _ in range(5):
+            category_id = rng.choice(category_ids) if category_ids else None
+            for kwargs in (
+                {},
+                {"sort": "-price"},
+                {"in_stock": True},
+                {"category_id": category_id},
+                {"category_id": category_id, "in_stock": True, "sort": "-price"},
+                {"price_min": Decimal(1000), "price_max": Decimal(5000)},
+            ):
+                await nomenclature_service.list_nomenclature_filtered(session, **kwargs)
+            await nomenclature_service.search_nomenclature(session, "товар син", 20)
+            await nomenclature_service.search_nomenclature(session, "крас", 20, category_id=category_id)
+            await nomenclature_service.get_nomenclature_batch(session, rng.sample(nomenclature_ids, 10))
+            await catalog_service.get_catalog_changes(session, 0, 100)
+        await category_service.get_category_tree(session)
+        await category_service.list_categories(session)
+
+    async with helper.session_factory() as session:
+        if nomenclature_ids:
+            order = Order()
+            session.add(order)
+            await session.flush()
+            for nomenclature_id in nomenclature_ids[:5]:
+                await order_service.add_product_to_order(session, order.id, nomenclature_id, Decimal(1))
+            await order_service.checkout_order(session, order.id)
+        await nomenclature_service.bulk_update_nomenclature(
+            session,
+            [NomenclatureStockUpdate(id=id, quantity=Decimal(50)) for id in nomenclature_ids[:20]],
+        )
+        await session.rollback()
+
+
+async def _run(args: argparse.Namespace, database_url: str) -> int:
+    from database.db_helper import DatabaseHelper
+    from database.index_advisor import (
+        WorkloadRecorder,
+        analyze,
+        format_report,
+        load_workload,
+        save_workload,
+    )
+
+    helper = DatabaseHelper(database_url)
+    try:
+        if args.seed:
+            await _seed(helper.engine, args.seed)
+        if args.workload:
+            workload = load_workload(args.workload)
+        else:
+            with WorkloadRecorder(helper.engine, helper.read_engine) as recorder:
+                await _synthetic_workload(helper)
+            workload = recorder.statements
+        if args.save_workload:
+            save_workload(args.save_workload, workload)
+        report = await analyze(helper.engine, workload, repeat=args.repeat, evaluate=not args.no_evaluate)
+    finally:
+        await helper.dispose()
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "statements": [
+                        {
+                            "sql": item.statement.sql,
+                            "count": item.statement.count,
+                            "time_ms": item.time_ms,
+                            "plan": item.plan,
+                            "findings": [asdict(finding) for finding in item.findings],
+                        }
+                        for item in report.statements
+                    ],
+                    "unused_indexes": report.unused_indexes,
+                    "proposals": [
+                        {**asdict(proposal), "benefit_ms": proposal.benefit_ms, "ddl": proposal.ddl()}
+                        for proposal in report.proposals
+                    ],
+                },
+                ensure_ascii=False,
+                indent=2,
+            )
+        )
+    else:
+        print(format_report(report, top=args.top))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", help="БД для анализа (по умолчанию DATABASE_URL из настроек)")
+    parser.add_argument("--seed", type=int, default=0, help="временная БД с этим числом товаров")
+    parser.add_argument("--workload", help="нагрузка из JSONL вместо синтетической")
+    parser.add_argument("--save-workload", help="сохранить нагрузку в JSONL")
+    parser.add_argument("--in-place", action="store_true", help="не копировать файл SQLite")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов замера времени (медиана)")
+    parser.add_argument("--top", type=int, default=10, help="сколько запросов и предложений показать")
+    parser.add_argument("--no-evaluate", action="store_true", help="без проверки кандидатов")
+    parser.add_argument("--json", action="store_true", help="отчёт в JSON")
+    args = parser.parse_args()
+
+    from settings.config import settings
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.seed:
+            database_url = f"sqlite:///{tmp}/advisor.db"
+            _migrate(database_url)
+        else:
+            database_url = args.database_url or settings.database_url
+            if database_url.startswith("sqlite") and not args.in_place:
+                database_url = _copy_sqlite(database_url, tmp)
+        # Кэш номенклатуры берёт глобальный db_helper — он должен смотреть в ту же БД
+        settings.database_url = database_url
+        return asyncio.run(_run(args, database_url))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
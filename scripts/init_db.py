@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""Создание таблиц БД через SQLAlchemy (для разработки)."""
+"""Создание таблиц БД через SQLAlchemy (для разработки; то же, что scripts/migrate.py)."""
 
 import sys
 from pathlib import Path
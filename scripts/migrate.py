@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Создание и обновление схемы БД до текущей версии (один раз на развёртывание).
+
+    python scripts/migrate.py          # применить миграции
+    python scripts/migrate.py --check  # только проверить; код 1, если схема устарела
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Корень проекта в PYTHONPATH
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.db_helper import db_helper
+from database.migrations import SchemaVersionError, check_schema_version, migrate
+from settings.config import settings
+
+
+async def _check() -> int:
+    try:
+        version = await check_schema_version(db_helper.engine)
+    except SchemaVersionError as e:
+        print(e)
+        return 1
+    finally:
+        await db_helper.dispose()
+    print(f"Схема актуальна (версия {version}): {settings.database_url}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="только проверить версию схемы")
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(asyncio.run(_check()))
+    before, after = migrate()
+    if before == after:
+        print(f"Схема актуальна (версия {after}): {settings.database_url}")
+    else:
+        print(f"Схема обновлена {before} -> {after}: {settings.database_url}")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Шардированные счётчики остатка товаров с горячей конкуренцией (services/stock_shards.py).
+
+    python scripts/stock_shards.py enable 42 --shards 32
+    python scripts/stock_shards.py disable 42
+    python scripts/stock_shards.py rebalance
+
+enable раскладывает текущий остаток товаров по --shards шардам (по умолчанию
+STOCK_SHARD_COUNT; повторный вызов меняет число шардов), disable собирает
+шарды обратно в nomenclature.quantity, rebalance выравнивает шарды и витринный
+остаток разово (как фоновая задача приложения).
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Корень проекта в PYTHONPATH
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.db_helper import db_helper
+from exceptions import NomenclatureNotFoundError
+from services.stock_shards import rebalance_stock_shards, set_stock_shards
+from settings.config import settings
+
+
+async def _run(args: argparse.Namespace) -> int:
+    try:
+        if args.command == "rebalance":
+            spread, synced = await rebalance_stock_shards(db_helper.session_factory)
+            print(f"Переразложено шардов у товаров: {spread}, обновлён витринный остаток: {synced}")
+            return 0
+        shards = args.shards if args.command == "enable" else 0
+        async with db_helper.session_factory() as session:
+            for nomenclature_id in args.ids:
+                await set_stock_shards(session, nomenclature_id, shards)
+            await session.commit()
+    except NomenclatureNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        await db_helper.dispose()
+    print(f"Товаров: {len(args.ids)}, шардов остатка: {shards}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    enable = commands.add_parser("enable", help="разложить остаток товаров по шардам")
+    enable.add_argument("ids", type=int, nargs="+", help="ID номенклатуры")
+    enable.add_argument("--shards", type=int, default=settings.stock_shard_count)
+    disable = commands.add_parser("disable", help="собрать шарды обратно в nomenclature.quantity")
+    disable.add_argument("ids", type=int, nargs="+", help="ID номенклатуры")
+    commands.add_parser("rebalance", help="выровнять шарды и витринный остаток")
+    args = parser.parse_args()
+    if args.command == "enable" and not 1 <= args.shards <= 1024:
+        parser.error("--shards — от 1 до 1024")
+    sys.exit(asyncio.run(_run(args)))
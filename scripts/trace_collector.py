@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Локальный приёмник и разбор трасс (OTLP/HTTP JSON) — замена коллектора для разработки.
+
+    # принимать трассы приложения (TRACING_EXPORTER=otlp) и печатать разбор
+    python scripts/trace_collector.py serve --port 4318 --out traces.jsonl
+
+    # разобрать файл (TRACING_EXPORTER=file или --out приёмника)
+    python scripts/trace_collector.py show traces.jsonl --limit 5 --min-ms 100
+
+Разбор трассы — дерево интервалов с длительностью (мс) и слоем; в конце —
+суммарное время по слоям и по имени интервала для всех показанных трасс.
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _spans(payload: dict) -> Iterator[dict]:
+    for resource in payload.get("resourceSpans", []):
+        for scope in resource.get("scopeSpans", []):
+            yield from scope.get("spans", [])
+
+
+def _attributes(span: dict) -> dict[str, str]:
+    result = {}
+    for attribute in span.get("attributes", []):
+        value = attribute["value"]
+        result[attribute["key"]] = next(iter(value.values()), "")
+    return result
+
+
+def _duration_ms(span: dict) -> float:
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+def group_traces(spans: Iterable[dict]) -> dict[str, list[dict]]:
+    traces: dict[str, list[dict]] = defaultdict(list)
+    for span in spans:
+        traces[span["traceId"]].append(span)
+    return traces
+
+
+def format_trace(spans: list[dict]) -> list[str]:
+    """Дерево интервалов одной трассы, дети — по времени начала."""
+    ids = {span["spanId"] for span in spans}
+    children: dict[str | None, list[dict]] = defaultdict(list)
+    for span in spans:
+        parent = span.get("parentSpanId")
+        children[parent if parent in ids else None].append(span)
+    lines: list[str] = []
+
+    def walk(parent: str | None, depth: int) -> None:
+        for span in sorted(children[parent], key=lambda s: int(s["startTimeUnixNano"])):
+            attributes = _attributes(span)
+            name = span["name"]
+            if "db.statement" in attributes:
+                name = f"{name}: {' '.join(attributes['db.statement'].split())[:80]}"
+            error = "  !" if span.get("status", {}).get("code") == 2 else ""
+            lines.append(
+                f"{_duration_ms(span):9.2f} ms  {attributes.get('layer', ''):<10} "
+                f"{'  ' * depth}{name}{error}"
+            )
+            walk(span["spanId"], depth + 1)
+
+    walk(None, 0)
+    return lines
+
+
+def summarize(traces: dict[str, list[dict]]) -> list[str]:
+    """Собственное время по слоям (без детей) и полное время по именам интервалов."""
+    by_layer: dict[str, float] = defaultdict(float)
+    by_name: dict[str, list[float]] = defaultdict(list)
+    for spans in traces.values():
+        child_time: dict[str, float] = defaultdict(float)
+        for span in spans:
+            if span.get("parentSpanId"):
+                child_time[span["parentSpanId"]] += _duration_ms(span)
+        for span in spans:
+            duration = _duration_ms(span)
+            layer = _attributes(span).get("layer", "")
+            by_layer[layer] += max(duration - child_time[span["spanId"]], 0.0)
+            by_name[span["name"]].append(duration)
+    lines = ["Собственное время по слоям, мс:"]
+    for layer, total in sorted(by_layer.items(), key=lambda item: -item[1]):
+        lines.append(f"  {total:10.2f}  {layer}")
+    lines.append("Интервалы (число, сумма мс, среднее мс):")
+    for name, durations in sorted(by_name.items(), key=lambda item: -sum(item[1]))[:20]:
+        lines.append(
+            f"  {len(durations):6d} {sum(durations):10.2f} {sum(durations) / len(durations):8.2f}  {name}"
+        )
+    return lines
+
+
+def show(path: str, limit: int, min_ms: float) -> None:
+    spans: list[dict] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                spans.extend(_spans(json.loads(line)))
+    traces = group_traces(spans)
+    shown: dict[str, list[dict]] = {}
+    for trace_id, trace_spans in traces.items():
+        root = max(trace_spans, key=_duration_ms)
+        if _duration_ms(root) >= min_ms:
+            shown[trace_id] = trace_spans
+    for trace_id, trace_spans in list(shown.items())[-limit:]:
+        print(f"trace {trace_id}")
+        print("\n".join(format_trace(trace_spans)))
+        print()
+    print(f"Трасс: {len(traces)}, показано: {min(len(shown), limit)}, с длительностью >= {min_ms} мс: {len(shown)}")
+    print("\n".join(summarize(shown)))
+
+
+def serve(host: str, port: int, out: str | None) -> None:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            payload = json.loads(body)
+            if out:
+                with open(out, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            for spans in group_traces(_spans(payload)).values():
+                print("\n".join(format_trace(spans)), end="\n\n", flush=True)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Приём трасс: http://{host}:{port}/v1/traces", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="принимать OTLP/HTTP JSON")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=4318)
+    serve_parser.add_argument("--out", help="дописывать принятые трассы в файл")
+    show_parser = commands.add_parser("show", help="разобрать файл трасс")
+    show_parser.add_argument("path")
+    show_parser.add_argument("--limit", type=int, default=10, help="сколько последних трасс показать")
+    show_parser.add_argument("--min-ms", type=float, default=0.0, help="только трассы не короче")
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args.host, args.port, args.out)
+    else:
+        show(args.path, args.limit, args.min_ms)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
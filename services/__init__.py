@@ -1,12 +1,45 @@
 """Сервисный слой приложения."""
 
-from services.category_service import get_category_tree, list_categories
-from services.nomenclature_service import list_nomenclature
-from services.order_service import add_product_to_order
+from services.catalog_service import get_catalog_changes
+from services.category_service import (
+    delete_category,
+    get_category_tree,
+    list_categories,
+    move_category,
+)
+from services.nomenclature_service import (
+    bulk_update_nomenclature,
+    get_nomenclature,
+    get_nomenclature_batch,
+    list_nomenclature,
+    list_nomenclature_filtered,
+    search_nomenclature,
+)
+from services.order_service import (
+    add_product_to_order,
+    checkout_order,
+    clone_order,
+    create_order,
+    get_order,
+    list_client_orders,
+)
 
 __all__ = [
     "add_product_to_order",
+    "bulk_update_nomenclature",
+    "checkout_order",
+    "clone_order",
+    "create_order",
+    "delete_category",
+    "get_catalog_changes",
     "get_category_tree",
+    "get_nomenclature",
+    "get_nomenclature_batch",
+    "get_order",
     "list_categories",
+    "list_client_orders",
     "list_nomenclature",
+    "list_nomenclature_filtered",
+    "move_category",
+    "search_nomenclature",
 ]
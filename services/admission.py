@@ -0,0 +1,138 @@
+"""
+Контроль допуска запросов (admission control) и сброс нагрузки.
+
+AdmissionLimiter ограничивает число одновременно выполняемых запросов одного
+класса. Сверх лимита запрос ждёт в очереди FIFO ограниченной длины не дольше
+queue_timeout; дальше — отказ без обращения к БД:
+
+- очередь заполнена — AdmissionRejectedError со статусом 429;
+- место не освободилось за queue_timeout — статус 503.
+
+У записи и чтения отдельные лимитеры (write_admission, read_admission), чтобы
+очередь к единственному писателю SQLite не забирала слоты у GET. Лимитеры
+свои у каждого воркера; счётчики отдаются в monitoring.metrics.
+"""
+
+import asyncio
+from collections import deque
+
+from exceptions import AdmissionRejectedError
+from settings.config import settings
+
+
+class AdmissionLimiter:
+    """Семафор с ограниченной очередью ожидания и сроком ожидания."""
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: int,
+    ) -> None:
+        self.name = name
+        self._limit = limit
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout
+        self._retry_after = retry_after
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._limit > 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float | None = None) -> None:
+        """
+        Занять слот: сразу, если есть свободный, иначе — дождаться в очереди.
+
+        :param timeout: остаток срока запроса; ожидание не дольше меньшего из
+            него и queue_timeout
+        :raises AdmissionRejectedError: очередь заполнена (429) или слот
+            не освободился за queue_timeout (503)
+        """
+        if not self.enabled:
+            return
+        if self._in_flight < self._limit and not self._waiters:
+            self._in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self._max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejectedError(self.name, 429, self._retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            wait = self._queue_timeout if timeout is None else min(self._queue_timeout, timeout)
+            async with asyncio.timeout(max(wait, 0)):
+                await waiter
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Слот передан одновременно с таймаутом/отменой — отдаём следующему
+                self.release()
+            else:
+                waiter.cancel()
+                # release() мог уже вынуть отменённого ожидающего и передать слот следующему
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            if isinstance(e, TimeoutError):
+                self.rejected_timeout += 1
+                raise AdmissionRejectedError(self.name, 503, self._retry_after) from None
+            raise
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Освободить слот: передать первому в очереди или уменьшить счётчик."""
+        if not self.enabled:
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Слот переходит ожидающему, in_flight не меняется
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def stats(self) -> dict[str, int | float]:
+        """Метрики для monitoring.metrics."""
+        return {
+            "limit": self._limit,
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue": self._max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+
+write_admission = AdmissionLimiter(
+    name="write",
+    limit=settings.admission_write_limit,
+    max_queue=settings.admission_write_queue,
+    queue_timeout=settings.admission_write_queue_timeout_seconds,
+    retry_after=settings.admission_retry_after_seconds,
+)
+read_admission = AdmissionLimiter(
+    name="read",
+    limit=settings.admission_read_limit,
+    max_queue=settings.admission_read_queue,
+    queue_timeout=settings.admission_read_queue_timeout_seconds,
+    retry_after=settings.admission_retry_after_seconds,
+)
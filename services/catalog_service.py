@@ -0,0 +1,70 @@
+"""Сервис ленты изменений каталога (категории и номенклатура)."""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from monitoring import traced
+from repositories import CatalogRepository
+from schemas.catalog import (
+    CatalogChangesResponse,
+    CategoryChange,
+    DeletedEntry,
+    NomenclatureChange,
+)
+
+
+@traced("service")
+async def get_catalog_changes(
+    session: AsyncSession, since: int, limit: int
+) -> CatalogChangesResponse:
+    """
+    Изменения каталога после версии since: не более limit строк плюс новая отметка.
+
+    Стоимость — O(изменений): по индексу change_version в каждой из трёх таблиц
+    (категории, номенклатура, надгробия). Версия никогда не делится между
+    страницами: если одна версия содержит больше limit строк, она отдаётся целиком.
+    """
+    repo = CatalogRepository(session)
+    # Сначала счётчик: всё, что <= current, уже закоммичено
+    current = await repo.get_version()
+
+    categories = await repo.get_changed_categories(since, current, limit + 1)
+    nomenclature = await repo.get_changed_nomenclature(since, current, limit + 1)
+    tombstones = await repo.get_tombstones(since, current, limit + 1)
+
+    versions = sorted(
+        [c.change_version for c in categories]
+        + [n.change_version for n in nomenclature]
+        + [t.change_version for t in tombstones]
+    )
+    high_water = current
+    has_more = False
+    if len(versions) > limit:
+        cut = versions[limit]
+        if versions[0] < cut:
+            high_water = cut - 1
+        else:
+            # Одна версия больше limit строк — отдаём её целиком
+            high_water = cut
+            categories = await repo.get_changed_categories(cut - 1, cut)
+            nomenclature = await repo.get_changed_nomenclature(cut - 1, cut)
+            tombstones = await repo.get_tombstones(cut - 1, cut)
+        has_more = high_water < current
+
+    return CatalogChangesResponse(
+        since=since,
+        version=high_water,
+        has_more=has_more,
+        categories=[
+            CategoryChange.model_validate(c) for c in categories if c.change_version <= high_water
+        ],
+        nomenclature=[
+            NomenclatureChange.model_validate(n)
+            for n in nomenclature
+            if n.change_version <= high_water
+        ],
+        deleted=[
+            DeletedEntry(table=t.table_name, id=t.entity_id, change_version=t.change_version)
+            for t in tombstones
+            if t.change_version <= high_water
+        ],
+    )
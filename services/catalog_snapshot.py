@@ -0,0 +1,387 @@
+"""
+Общий для воркеров снимок каталога в memory-mapped файле.
+
+При нескольких процессах uvicorn каждый держал бы свою копию каталога. Здесь
+один воркер (владелец file lock) строит снимок — дерево категорий и таблицу
+номенклатуры id -> (name, price, quantity, category_id) — и атомарно заменяет
+файл (os.replace); остальные отображают его через mmap только на чтение.
+Страницы файла общие в page cache ОС, поэтому память не дублируется, а поиск
+по ID — бинарный поиск прямо по отображённым байтам, без десериализации.
+
+Формат (little-endian): заголовок с версией каталога и моментом начала
+сборки, затем строки категорий, строки номенклатуры (отсортированы по id)
+и блок UTF-8 строк с наименованиями. Цена хранится в копейках (×10²),
+остаток — ×10⁴, как в Numeric(18, 2) / Numeric(18, 4).
+
+Свежесть: владелец проверяет версию каталога (одна строка catalog_state)
+каждые poll_seconds и пересобирает снимок, если она выросла; воркеры
+подхватывают новый файл на следующей проверке. Читатели сверяют версию снимка
+с текущей версией каталога и, пока снимок отстаёт, читают мимо него.
+Изменения, закоммиченные самим воркером, до появления снимка с ними тоже
+читаются мимо снимка.
+"""
+
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import time
+from collections.abc import Iterable
+from decimal import Decimal
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.commit_hooks import CatalogChanges
+from database.db_helper import db_helper
+from database.models import Category, Nomenclature
+from repositories import CatalogRepository
+from services.nomenclature_cache import NomenclatureRecord
+from settings.config import settings
+
+try:
+    import fcntl
+except ImportError:  # не POSIX: каждый процесс строит снимок сам
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CATSNAP1"
+# magic, версия каталога, начало сборки (unix time), категорий, товаров, байт строк
+_HEADER = struct.Struct("<8sqdIII4x")
+# id, parent_id (-1 — корень), смещение и длина имени
+_CATEGORY = struct.Struct("<qqII")
+# id, цена ×10², остаток ×10⁴, category_id (-1 — без категории), смещение и длина имени
+_NOMENCLATURE = struct.Struct("<qqqqII")
+_NO_ID = -1
+
+
+class SnapshotCategory(NamedTuple):
+    """Категория из снимка (поля как у модели Category)."""
+
+    id: int
+    name: str
+    parent_id: int | None
+
+
+async def build_snapshot(session: AsyncSession) -> bytes:
+    """
+    Собрать снимок каталога.
+
+    Версия и строки читаются отдельными запросами, без общего снимка данных
+    (pysqlite в autocommit, в PostgreSQL — READ COMMITTED): версия читается
+    первой, поэтому строки не старше неё, но могут содержать и более поздние
+    изменения — их версия выше, и снимок пересоберётся на следующей проверке.
+    built_at фиксируется до чтения, поэтому всё, что закоммичено раньше
+    built_at, в снимке есть.
+    """
+    built_at = time.time()
+    version = await CatalogRepository(session).get_version()
+    categories = (
+        await session.execute(
+            select(Category.id, Category.parent_id, Category.name).order_by(
+                Category.parent_id.nullsfirst(), Category.name
+            )
+        )
+    ).all()
+    nomenclature = (
+        await session.execute(
+            select(
+                Nomenclature.id,
+                Nomenclature.price,
+                Nomenclature.quantity,
+                Nomenclature.category_id,
+                Nomenclature.name,
+            ).order_by(Nomenclature.id)
+        )
+    ).all()
+
+    strings = bytearray()
+
+    def add_string(value: str) -> tuple[int, int]:
+        encoded = value.encode()
+        offset = len(strings)
+        strings.extend(encoded)
+        return offset, len(encoded)
+
+    parts = [
+        _HEADER.pack(MAGIC, version, built_at, len(categories), len(nomenclature), 0)
+    ]
+    for id, parent_id, name in categories:
+        parts.append(
+            _CATEGORY.pack(id, _NO_ID if parent_id is None else parent_id, *add_string(name))
+        )
+    for id, price, quantity, category_id, name in nomenclature:
+        parts.append(
+            _NOMENCLATURE.pack(
+                id,
+                int(price.scaleb(2).to_integral_value()),
+                int(quantity.scaleb(4).to_integral_value()),
+                _NO_ID if category_id is None else category_id,
+                *add_string(name),
+            )
+        )
+    parts[0] = _HEADER.pack(
+        MAGIC, version, built_at, len(categories), len(nomenclature), len(strings)
+    )
+    parts.append(bytes(strings))
+    return b"".join(parts)
+
+
+def write_snapshot(path: str, data: bytes) -> None:
+    """Записать снимок во временный файл и атомарно подменить им path."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class MappedSnapshot:
+    """Снимок, отображённый в память только на чтение."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, self.built_at, self._n_categories, self._n_nomenclature, _ = (
+            _HEADER.unpack_from(self._mm, 0)
+        )
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path}: не снимок каталога")
+        self._categories_at = _HEADER.size
+        self._nomenclature_at = self._categories_at + self._n_categories * _CATEGORY.size
+        self._strings_at = self._nomenclature_at + self._n_nomenclature * _NOMENCLATURE.size
+
+    @property
+    def size(self) -> int:
+        return len(self._mm)
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_at + offset
+        return self._mm[start:start + length].decode()
+
+    def _nomenclature_id(self, index: int) -> int:
+        offset = self._nomenclature_at + index * _NOMENCLATURE.size
+        return struct.unpack_from("<q", self._mm, offset)[0]
+
+    def get_nomenclature(self, id: int) -> NomenclatureRecord | None:
+        """Товар по ID (бинарный поиск по отображённому файлу)."""
+        lo, hi = 0, self._n_nomenclature
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._nomenclature_id(mid) < id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self._n_nomenclature or self._nomenclature_id(lo) != id:
+            return None
+        _, price, quantity, category_id, offset, length = _NOMENCLATURE.unpack_from(
+            self._mm, self._nomenclature_at + lo * _NOMENCLATURE.size
+        )
+        return NomenclatureRecord(
+            id=id,
+            name=self._string(offset, length),
+            price=Decimal(price).scaleb(-2),
+            quantity=Decimal(quantity).scaleb(-4),
+            category_id=None if category_id == _NO_ID else category_id,
+        )
+
+    def categories(self) -> list[SnapshotCategory]:
+        """Все категории в порядке (parent_id, name), как CategoryRepository.get_all_flat."""
+        with memoryview(self._mm) as view:
+            rows = list(_CATEGORY.iter_unpack(view[self._categories_at:self._nomenclature_at]))
+        return [
+            SnapshotCategory(
+                id, self._string(offset, length), None if parent_id == _NO_ID else parent_id
+            )
+            for id, parent_id, offset, length in rows
+        ]
+
+    def nomenclature_counts_by_category(self) -> dict[int, int]:
+        """Количество товаров по категориям (как get_nomenclature_counts_by_category)."""
+        counts: dict[int, int] = {}
+        with memoryview(self._mm) as view:
+            rows = view[self._nomenclature_at:self._strings_at]
+            for _, _, _, category_id, _, _ in _NOMENCLATURE.iter_unpack(rows):
+                if category_id != _NO_ID:
+                    counts[category_id] = counts.get(category_id, 0) + 1
+            rows.release()
+        return counts
+
+
+class CatalogSnapshotManager:
+    """Сборка (в одном воркере) и подхват (во всех) общего снимка каталога."""
+
+    def __init__(self, path: str, poll_seconds: float) -> None:
+        self._path = path
+        self._poll_seconds = poll_seconds
+        self._snapshot: MappedSnapshot | None = None
+        self._lock_file = None
+        self._task: asyncio.Task | None = None
+        # Изменения этого воркера, которых ещё нет в снимке: ID -> время commit
+        self._dirty_nomenclature: dict[int, float] = {}
+        self._categories_dirty_at: float | None = None
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.swaps = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._path)
+
+    @property
+    def is_builder(self) -> bool:
+        return self._lock_file is not None
+
+    @property
+    def version(self) -> int | None:
+        return self._snapshot.version if self._snapshot else None
+
+    async def start(self) -> None:
+        """Подхватить (или собрать) снимок и запустить фоновую проверку версии."""
+        if not self.enabled:
+            return
+        await self.poll()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._poll_seconds)
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Ошибка обновления снимка каталога")
+
+    async def poll(self) -> None:
+        """Один шаг: при владении блокировкой — пересобрать устаревший снимок; подхватить файл."""
+        if self._try_become_builder():
+            async with db_helper.session_factory() as session:
+                current = await CatalogRepository(session).get_version()
+                if self._snapshot is None or current > self._snapshot.version or (
+                    self._file_inode() != self._snapshot.inode
+                ):
+                    data = await build_snapshot(session)
+                    await asyncio.to_thread(write_snapshot, self._path, data)
+                    self.builds += 1
+        self.refresh()
+
+    def _try_become_builder(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        lock_file = open(f"{self._path}.lock", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        return True
+
+    def _file_inode(self) -> int | None:
+        try:
+            return os.stat(self._path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def refresh(self) -> None:
+        """Отобразить файл снимка, если он был заменён."""
+        inode = self._file_inode()
+        if inode is None or (self._snapshot is not None and self._snapshot.inode == inode):
+            return
+        snapshot = MappedSnapshot(self._path)
+        if self._snapshot is not None:
+            self._snapshot.close()
+        self._snapshot = snapshot
+        self.swaps += 1
+        self._dirty_nomenclature = {
+            id: at for id, at in self._dirty_nomenclature.items() if at >= snapshot.built_at
+        }
+        dirty_at = self._categories_dirty_at
+        if dirty_at is not None and dirty_at < snapshot.built_at:
+            self._categories_dirty_at = None
+
+    def on_commit(self, changes: CatalogChanges) -> None:
+        """Хук после commit: своё изменение читается мимо снимка, пока снимок его не догонит."""
+        now = time.time()
+        for id in changes.get("nomenclature", ()):
+            self._dirty_nomenclature[id] = now
+        if changes.get("categories"):
+            self._categories_dirty_at = now
+
+    def get_many(self, ids: Iterable[int], version: int) -> dict[int, NomenclatureRecord]:
+        """
+        Товары из снимка, если он ровно версии version (как current_for);
+        отсутствующие и изменённые этим воркером ID не возвращаются.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {}
+        if snapshot.version != version:
+            # Снимок отстал от каталога (изменения других воркеров) — читаем мимо него
+            self.misses += len(list(ids))
+            return {}
+        found: dict[int, NomenclatureRecord] = {}
+        for id in ids:
+            record = None
+            if id not in self._dirty_nomenclature:
+                record = snapshot.get_nomenclature(id)
+            if record is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                found[id] = record
+        return found
+
+    def current_for(self, version: int) -> MappedSnapshot | None:
+        """Снимок, если он ровно версии version и категории этого воркера не менялись после него."""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            return None
+        if self._categories_dirty_at is not None:
+            return None
+        return snapshot
+
+    def stats(self) -> dict[str, int | float]:
+        """Метрики для monitoring.metrics."""
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else -1,
+            "bytes": snapshot.size if snapshot else 0,
+            "is_builder": int(self.is_builder),
+            "builds": self.builds,
+            "swaps": self.swaps,
+            "hits": self.hits,
+            "misses": self.misses,
+            "dirty": len(self._dirty_nomenclature),
+        }
+
+
+catalog_snapshot = CatalogSnapshotManager(
+    path=settings.catalog_snapshot_path,
+    poll_seconds=settings.catalog_snapshot_poll_seconds,
+)
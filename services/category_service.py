@@ -2,23 +2,50 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from database.commit_hooks import track_changes
 from database.models import Category
-from repositories import CategoryRepository
-from schemas.category import CategoryResponse, CategoryTreeItem
+from exceptions import CategoryNotFoundError, CategoryTreeConflictError
+from monitoring import traced
+from repositories import CatalogRepository, CategoryRepository, NomenclatureRepository
+from repositories.category_repository import category_ids
+from schemas.category import CategoryDeleteResponse, CategoryResponse, CategoryTreeItem
+from services.catalog_snapshot import MappedSnapshot, catalog_snapshot
 
 
+async def _current_snapshot(session: AsyncSession) -> MappedSnapshot | None:
+    """Общий снимок каталога, если он соответствует текущей версии каталога."""
+    if catalog_snapshot.version is None:
+        return None
+    version = await CatalogRepository(session).get_version()
+    return catalog_snapshot.current_for(version)
+
+
+@traced("service")
 async def list_categories(session: AsyncSession) -> list[CategoryResponse]:
     """Получить плоский список всех категорий."""
-    repo = CategoryRepository(session)
-    items = await repo.get_all_flat()
+    snapshot = await _current_snapshot(session)
+    if snapshot is not None:
+        items = snapshot.categories()
+    else:
+        items = await CategoryRepository(session).get_all_flat()
     return [CategoryResponse.model_validate(c) for c in items]
 
 
+@traced("service")
 async def get_category_tree(session: AsyncSession) -> list[CategoryTreeItem]:
-    """Получить дерево категорий с подсчётом товаров в каждой (2 запроса вместо N)."""
-    repo = CategoryRepository(session)
-    all_categories = await repo.get_all_flat()
-    counts_by_category = await repo.get_nomenclature_counts_by_category()
+    """
+    Получить дерево категорий с подсчётом товаров в каждой (2 запроса вместо N).
+
+    Если общий снимок каталога актуален — без запросов к категориям и номенклатуре.
+    """
+    snapshot = await _current_snapshot(session)
+    if snapshot is not None:
+        all_categories = snapshot.categories()
+        counts_by_category = snapshot.nomenclature_counts_by_category()
+    else:
+        repo = CategoryRepository(session)
+        all_categories = await repo.get_all_flat()
+        counts_by_category = await repo.get_nomenclature_counts_by_category()
 
     # Группируем по parent_id, дочерние отсортированы по name (порядок из get_all_flat)
     children_by_parent: dict[int | None, list[Category]] = {}
@@ -39,3 +66,93 @@ async def get_category_tree(session: AsyncSession) -> list[CategoryTreeItem]:
 
     roots = children_by_parent.get(None, [])
     return [build_node(r) for r in roots]
+
+
+async def _get_category(repo: CategoryRepository, category_id: int) -> Category:
+    category = await repo.get_by_id(category_id)
+    if category is None:
+        raise CategoryNotFoundError(f"Категория с ID {category_id} не найдена")
+    return category
+
+
+@traced("service")
+async def move_category(
+    session: AsyncSession, category_id: int, parent_id: int | None
+) -> CategoryResponse:
+    """
+    Перенести категорию (вместе с поддеревом) под parent_id или в корень.
+
+    Один UPDATE строки категории; проверка цикла — подъём от нового родителя
+    по предкам (O(глубины), поддерево не читается). Версия каталога берётся
+    первой: её строка блокирует другие изменения каталога до commit, поэтому
+    параллельные переносы не создадут цикл между проверкой и записью.
+
+    :raises CategoryNotFoundError: нет категории или нового родителя
+    :raises CategoryTreeConflictError: новый родитель — сама категория или её потомок
+    """
+    repo = CategoryRepository(session)
+    version = await CatalogRepository(session).next_version()
+    category = await _get_category(repo, category_id)
+    if parent_id is not None:
+        await _get_category(repo, parent_id)
+        if await repo.is_in_subtree(parent_id, category_id):
+            raise CategoryTreeConflictError(
+                f"Категорию {category_id} нельзя перенести в её же поддерево ({parent_id})"
+            )
+
+    await repo.set_parent(category_id, parent_id, version)
+    track_changes(session, "categories", [category_id])
+    return CategoryResponse(id=category.id, name=category.name, parent_id=parent_id)
+
+
+@traced("service")
+async def delete_category(
+    session: AsyncSession,
+    category_id: int,
+    cascade: bool = False,
+    move_items_to: int | None = None,
+) -> CategoryDeleteResponse:
+    """
+    Удалить категорию; без cascade дочерние категории перевешиваются на её
+    родителя, с cascade удаляется всё поддерево.
+
+    Товары удалённых категорий переносятся в move_items_to, по умолчанию — в
+    родителя удалённой категории (у корневой — без категории). Объём работы
+    не зависит от ORM: поддерево выбирается рекурсивным CTE по индексу
+    parent_id прямо в запросах — надгробия (INSERT ... SELECT), перенос товаров
+    (UPDATE) и удаление (DELETE), без загрузки категорий в сессию.
+
+    :raises CategoryNotFoundError: нет категории или категории move_items_to
+    :raises CategoryTreeConflictError: move_items_to — в удаляемом поддереве
+    """
+    repo = CategoryRepository(session)
+    catalog_repo = CatalogRepository(session)
+    version = await catalog_repo.next_version()
+    category = await _get_category(repo, category_id)
+    target = category.parent_id
+    if move_items_to is not None:
+        await _get_category(repo, move_items_to)
+        if move_items_to == category_id or (
+            cascade and await repo.is_in_subtree(move_items_to, category_id)
+        ):
+            raise CategoryTreeConflictError(
+                f"Товары нельзя перенести в удаляемую категорию {move_items_to}"
+            )
+        target = move_items_to
+
+    reattached: list[int] = []
+    if not cascade:
+        reattached = await repo.reattach_children(category_id, category.parent_id, version)
+    doomed = category_ids(category_id, subtree=cascade)
+    moved = await NomenclatureRepository(session).move_to_category(doomed, target, version)
+    await catalog_repo.add_tombstones_from("categories", doomed, version)
+    deleted = await repo.delete_many(doomed)
+
+    track_changes(session, "categories", [*deleted, *reattached])
+    track_changes(session, "nomenclature", moved)
+    return CategoryDeleteResponse(
+        deleted=len(deleted),
+        reattached=len(reattached),
+        moved_nomenclature=len(moved),
+        items_moved_to=target,
+    )
@@ -0,0 +1,227 @@
+"""
+Кэш «горячей» номенклатуры в процессе (read-through, LRU + TTL).
+
+Хранит компактные неизменяемые записи NomenclatureRecord (не ORM-объекты),
+поэтому их можно отдавать из разных сессий и запросов. Используется только
+путями чтения (карточка товара, выборка по ID); записи инвалидируются хуком
+после commit (database.commit_hooks) по ID изменённой номенклатуры.
+
+- Ограничен по числу записей: при переполнении вытесняется давно не читанная.
+- Запись свежая в течение ttl; после — ещё stale_ttl секунд отдаётся как есть,
+  а в фоне перечитывается (stale-while-revalidate). stale_ttl = 0 — выключено.
+- Данные, прочитанные из БД до инвалидации, в кэш не кладутся: чтение,
+  начатое до commit, не вернёт в кэш устаревшие значения.
+
+Кэш не авторитетен: проверка остатка при добавлении в заказ
+(add_product_to_order) всегда читает БД. Кэш свой у каждого воркера.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.commit_hooks import CatalogChanges
+from database.db_helper import db_helper
+from database.deadline import deadline_scope
+from database.models import Nomenclature
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class NomenclatureRecord:
+    """Снимок товара для чтения."""
+
+    id: int
+    name: str
+    price: Decimal
+    quantity: Decimal
+    category_id: int | None
+
+
+RecordFetch = Callable[[list[int]], Awaitable[list[NomenclatureRecord]]]
+
+
+async def fetch_records(session: AsyncSession, ids: list[int]) -> list[NomenclatureRecord]:
+    """Прочитать записи по ID одним запросом (только нужные колонки)."""
+    result = await session.execute(
+        select(
+            Nomenclature.id,
+            Nomenclature.name,
+            Nomenclature.price,
+            Nomenclature.quantity,
+            Nomenclature.category_id,
+        ).where(Nomenclature.id.in_(ids))
+    )
+    return [NomenclatureRecord(*row) for row in result.all()]
+
+
+async def _fetch_in_new_session(ids: list[int]) -> list[NomenclatureRecord]:
+    # Фоновая задача наследует контекст запроса, но не его срок
+    with deadline_scope(None):
+        async with db_helper.read_session_factory() as session:
+            return await fetch_records(session, ids)
+
+
+class NomenclatureCache:
+    """LRU + TTL кэш записей номенклатуры по ID с метриками попаданий."""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        revalidate: RecordFetch | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._revalidate = revalidate
+        self._clock = clock
+        # ID -> (запись, момент устаревания)
+        self._entries: OrderedDict[int, tuple[NomenclatureRecord, float]] = OrderedDict()
+        # Растёт при каждой инвалидации; чтения, начатые до неё, не сохраняются
+        self._epoch = 0
+        self._refreshing: set[int] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_size > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_many(
+        self, ids: Iterable[int], fetch: RecordFetch
+    ) -> dict[int, NomenclatureRecord]:
+        """
+        Записи по ID: из кэша, промахи — одним вызовом fetch.
+
+        Несуществующие ID отсутствуют в результате (и не кэшируются).
+        """
+        ids = list(dict.fromkeys(ids))
+        if not self.enabled:
+            return {record.id: record for record in await fetch(ids)}
+
+        now = self._clock()
+        found: dict[int, NomenclatureRecord] = {}
+        missing: list[int] = []
+        stale: list[int] = []
+        for id in ids:
+            entry = self._entries.get(id)
+            if entry is None:
+                missing.append(id)
+                continue
+            record, expires_at = entry
+            if now < expires_at:
+                self.hits += 1
+            elif now < expires_at + self._stale_ttl:
+                self.stale_hits += 1
+                stale.append(id)
+            else:
+                del self._entries[id]
+                missing.append(id)
+                continue
+            self._entries.move_to_end(id)
+            found[id] = record
+
+        self.misses += len(missing)
+        if stale:
+            self._schedule_revalidate(stale)
+        if missing:
+            epoch = self._epoch
+            records = await fetch(missing)
+            self._store(records, epoch)
+            found.update((record.id, record) for record in records)
+        return found
+
+    def invalidate(self, ids: Iterable[int]) -> None:
+        """Удалить записи (после commit изменений)."""
+        self._epoch += 1
+        self._drop(ids)
+
+    def clear(self) -> None:
+        self._epoch += 1
+        self._entries.clear()
+
+    async def on_commit(self, changes: CatalogChanges) -> None:
+        """Хук после commit: инвалидировать изменённую номенклатуру."""
+        ids = changes.get("nomenclature")
+        if ids:
+            self.invalidate(ids)
+
+    def stats(self) -> dict[str, int | float]:
+        """Метрики для monitoring.metrics."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self._max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+    def _store(self, records: Iterable[NomenclatureRecord], epoch: int) -> None:
+        if epoch != self._epoch:
+            return
+        expires_at = self._clock() + self._ttl
+        for record in records:
+            self._entries[record.id] = (record, expires_at)
+            self._entries.move_to_end(record.id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _schedule_revalidate(self, ids: list[int]) -> None:
+        ids = [id for id in ids if id not in self._refreshing]
+        if not ids or self._revalidate is None:
+            return
+        self._refreshing.update(ids)
+        task = asyncio.get_running_loop().create_task(self._run_revalidate(ids))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_revalidate(self, ids: list[int]) -> None:
+        epoch = self._epoch
+        try:
+            records = await self._revalidate(ids)
+        except Exception:
+            logger.exception("Ошибка фонового обновления кэша номенклатуры")
+            return
+        finally:
+            self._refreshing.difference_update(ids)
+        found = {record.id for record in records}
+        # Удалённые из БД товары уходят из кэша
+        self._drop(id for id in ids if id not in found)
+        self._store(records, epoch)
+
+    def _drop(self, ids: Iterable[int]) -> None:
+        for id in ids:
+            if self._entries.pop(id, None) is not None:
+                self.invalidations += 1
+
+
+nomenclature_cache = NomenclatureCache(
+    max_size=settings.nomenclature_cache_size,
+    ttl=settings.nomenclature_cache_ttl_seconds,
+    stale_ttl=settings.nomenclature_cache_stale_seconds,
+    revalidate=_fetch_in_new_session,
+)
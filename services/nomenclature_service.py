@@ -1,13 +1,236 @@
 """Сервис работы с номенклатурой."""
 
+import base64
+import re
+from collections.abc import Sequence
+from decimal import Decimal, InvalidOperation
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from repositories import NomenclatureRepository
-from schemas.nomenclature import NomenclatureResponse
+from database.commit_hooks import track_changes
+from exceptions import InvalidCursorError, NomenclatureNotFoundError
+from monitoring import traced
+from repositories import CatalogRepository, NomenclatureRepository
+from schemas.nomenclature import (
+    NomenclatureBulkUpdateResponse,
+    NomenclatureResponse,
+    NomenclaturePage,
+    NomenclatureStockUpdate,
+    RejectedStockUpdate,
+)
+from services.catalog_snapshot import catalog_snapshot
+from services.nomenclature_cache import NomenclatureRecord, fetch_records, nomenclature_cache
+from settings.config import settings
 
 
+@traced("service")
 async def list_nomenclature(session: AsyncSession) -> list[NomenclatureResponse]:
     """Получить список всех товаров (номенклатуры)."""
     repo = NomenclatureRepository(session)
     items = await repo.get_all()
     return [NomenclatureResponse.model_validate(item) for item in items]
+
+
+async def _get_records(
+    session: AsyncSession, ids: Sequence[int]
+) -> dict[int, NomenclatureRecord]:
+    """Записи товаров: общий снимок каталога текущей версии, затем кэш процесса, затем БД."""
+    found: dict[int, NomenclatureRecord] = {}
+    if catalog_snapshot.version is not None:
+        version = await CatalogRepository(session).get_version()
+        found = catalog_snapshot.get_many(ids, version)
+    rest = [id for id in ids if id not in found]
+    if rest:
+        found.update(
+            await nomenclature_cache.get_many(
+                rest, lambda missing: fetch_records(session, missing)
+            )
+        )
+    return found
+
+
+@traced("service")
+async def get_nomenclature(session: AsyncSession, nomenclature_id: int) -> NomenclatureResponse:
+    """
+    Карточка товара (через снимок каталога / кэш горячей номенклатуры).
+
+    Для проверки остатка при изменении данных не использовать — кэш не авторитетен.
+    """
+    found = await _get_records(session, [nomenclature_id])
+    if nomenclature_id not in found:
+        raise NomenclatureNotFoundError(f"Номенклатура с ID {nomenclature_id} не найдена")
+    return NomenclatureResponse.model_validate(found[nomenclature_id])
+
+
+@traced("service")
+async def get_nomenclature_batch(
+    session: AsyncSession, ids: Sequence[int]
+) -> list[NomenclatureResponse]:
+    """
+    Товары по списку ID в порядке запроса: из снимка каталога или кэша горячей
+    номенклатуры, промахи — одним запросом.
+
+    Несуществующие ID пропускаются, повторы возвращаются один раз.
+    """
+    found = await _get_records(session, ids)
+    return [
+        NomenclatureResponse.model_validate(found[id])
+        for id in dict.fromkeys(ids)
+        if id in found
+    ]
+
+
+@traced("service")
+async def bulk_update_nomenclature(
+    session: AsyncSession,
+    updates: Sequence[NomenclatureStockUpdate],
+    chunk_size: int | None = None,
+) -> NomenclatureBulkUpdateResponse:
+    """
+    Массово обновить остатки и цены.
+
+    На пачку — два запроса: чтение текущих значений с блокировкой и один
+    executemany UPDATE. Строки с несуществующим ID или уходящим в минус остатком
+    не применяются (CHECK quantity >= 0 не нарушается) и возвращаются в rejected.
+    Хуки изменений каталога срабатывают один раз после commit всей транзакции.
+    """
+    repo = NomenclatureRepository(session)
+    catalog_repo = CatalogRepository(session)
+    chunk_size = chunk_size or settings.nomenclature_bulk_chunk_size
+    rejected: list[RejectedStockUpdate] = []
+    changed_ids: set[int] = set()
+    updated = 0
+
+    for start in range(0, len(updates), chunk_size):
+        chunk = updates[start:start + chunk_size]
+        current = await repo.lock_stock(list({u.id for u in chunk}))
+
+        # Дубликаты ID внутри пачки применяются последовательно
+        new_values: dict[int, tuple] = {}
+        for u in chunk:
+            if u.id not in current:
+                rejected.append(RejectedStockUpdate(id=u.id, reason="not_found"))
+                continue
+            quantity, price = new_values.get(u.id, current[u.id])
+            if u.quantity is not None:
+                quantity = u.quantity
+            elif u.quantity_delta is not None:
+                quantity = quantity + u.quantity_delta
+            if quantity < 0:
+                rejected.append(RejectedStockUpdate(id=u.id, reason="negative_quantity"))
+                continue
+            if u.price is not None:
+                price = u.price
+            new_values[u.id] = (quantity, price)
+            updated += 1
+
+        if not new_values:
+            continue
+        version = await catalog_repo.next_version()
+        await repo.bulk_set_stock(
+            [
+                {"id": id, "quantity": quantity, "price": price, "change_version": version}
+                for id, (quantity, price) in new_values.items()
+            ]
+        )
+        changed_ids.update(new_values)
+
+    track_changes(session, "nomenclature", changed_ids)
+    return NomenclatureBulkUpdateResponse(updated=updated, rejected=rejected)
+
+
+def search_terms(query: str) -> list[str]:
+    """Термы поискового запроса: слова в нижнем регистре, «ё» → «е»."""
+    return re.findall(r"\w+", query.casefold().replace("ё", "е"))
+
+
+def encode_cursor(*key: object) -> str:
+    """Курсор keyset-пагинации: ключ последней строки страницы."""
+    raw = ":".join(str(part) for part in key)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return float(rank), int(id)
+    except ValueError as e:
+        raise InvalidCursorError("Некорректный курсор") from e
+
+
+@traced("service")
+async def search_nomenclature(
+    session: AsyncSession,
+    query: str,
+    limit: int,
+    category_id: int | None = None,
+    cursor: str | None = None,
+) -> NomenclaturePage:
+    """
+    Поиск товаров по наименованию (префиксы слов, без учёта регистра).
+
+    Опционально — только в поддереве категории category_id. Пагинация по
+    ключу (релевантность, ID): next_cursor передаётся в следующий запрос.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return NomenclaturePage(items=[])
+    after = decode_search_cursor(cursor) if cursor else None
+
+    repo = NomenclatureRepository(session)
+    rows = await repo.search(terms, limit, category_id=category_id, after=after)
+
+    next_cursor = None
+    if len(rows) == limit:
+        last, rank = rows[-1]
+        next_cursor = encode_cursor(rank, last.id)
+    return NomenclaturePage(
+        items=[NomenclatureResponse.model_validate(item) for item, _ in rows],
+        next_cursor=next_cursor,
+    )
+
+
+def decode_listing_cursor(cursor: str, sort: str) -> tuple[Decimal, int]:
+    try:
+        cursor_sort, price, id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        if cursor_sort != sort:
+            raise ValueError(sort)
+        return Decimal(price), int(id)
+    except (ValueError, InvalidOperation) as e:
+        raise InvalidCursorError("Некорректный курсор") from e
+
+
+@traced("service")
+async def list_nomenclature_filtered(
+    session: AsyncSession,
+    *,
+    category_id: int | None = None,
+    price_min: Decimal | None = None,
+    price_max: Decimal | None = None,
+    in_stock: bool = False,
+    sort: str = "price",
+    limit: int = 50,
+    cursor: str | None = None,
+) -> NomenclaturePage:
+    """
+    Витрина: товары поддерева категории в диапазоне цен (опционально — только в наличии),
+    отсортированные по цене ("price" или "-price"), с keyset-пагинацией по (price, id).
+    """
+    after = decode_listing_cursor(cursor, sort) if cursor else None
+    repo = NomenclatureRepository(session)
+    items = await repo.list_filtered(
+        category_id=category_id,
+        price_min=price_min,
+        price_max=price_max,
+        in_stock=in_stock,
+        descending=sort == "-price",
+        after=after,
+        limit=limit,
+    )
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(sort, items[-1].price, items[-1].id)
+    return NomenclaturePage(
+        items=[NomenclatureResponse.model_validate(item) for item in items],
+        next_cursor=next_cursor,
+    )
@@ -0,0 +1,120 @@
+"""
+Архивация заказов: оформленные заказы старше ORDER_ARCHIVE_AFTER_DAYS вместе
+с позициями переносятся в orders_archive / order_items_archive.
+
+Горячие таблицы orders и order_items (и их индексы, включая
+uq_order_nomenclature на пути добавления товара) перестают расти с историей.
+Перенос идёт пачками по ORDER_ARCHIVE_BATCH_SIZE заказов, каждая — в своей
+короткой транзакции, с паузой между пачками: блокировка записи SQLite
+удерживается недолго, запросы API встают между пачками. Открытые заказы не
+архивируются. Чтение архива — GET /api/orders/...?include_archived=true.
+
+Запуск: фоновая задача приложения (ORDER_ARCHIVE_INTERVAL_SECONDS) или разово
+scripts/archive_orders.py (cron).
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.db_helper import db_helper
+from repositories import OrderArchiveRepository
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def archive_orders(
+    session_factory: async_sessionmaker[AsyncSession],
+    older_than: timedelta,
+    batch_size: int,
+    pause_seconds: float = 0.0,
+    max_batches: int | None = None,
+) -> int:
+    """
+    Перенести в архив оформленные заказы, созданные раньше now - older_than.
+
+    :param max_batches: не больше стольких пачек за вызов (None — до конца)
+    :return: число перенесённых заказов
+    """
+    cutoff = datetime.utcnow() - older_than
+    moved = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        async with session_factory() as session:
+            ids = await OrderArchiveRepository(session).archive_batch(cutoff, batch_size)
+            await session.commit()
+        moved += len(ids)
+        batches += 1
+        if len(ids) < batch_size:
+            break
+        await asyncio.sleep(pause_seconds)
+    return moved
+
+
+class OrderArchiver:
+    """Периодическая архивация заказов в фоне приложения."""
+
+    def __init__(
+        self,
+        after_days: float,
+        batch_size: int,
+        pause_seconds: float,
+        interval_seconds: float,
+    ) -> None:
+        self._after = timedelta(days=after_days)
+        self._batch_size = batch_size
+        self._pause_seconds = pause_seconds
+        self._interval_seconds = interval_seconds
+        self._task: asyncio.Task | None = None
+        self.runs = 0
+        self.archived = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._after > timedelta(0) and self._interval_seconds > 0
+
+    async def start(self) -> None:
+        if self.enabled:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> int:
+        moved = await archive_orders(
+            db_helper.session_factory, self._after, self._batch_size, self._pause_seconds
+        )
+        self.runs += 1
+        self.archived += moved
+        return moved
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("Ошибка архивации заказов")
+            await asyncio.sleep(self._interval_seconds)
+
+    def stats(self) -> dict[str, int]:
+        """Метрики для monitoring.metrics."""
+        return {"runs": self.runs, "archived": self.archived, "errors": self.errors}
+
+
+order_archiver = OrderArchiver(
+    after_days=settings.order_archive_after_days,
+    batch_size=settings.order_archive_batch_size,
+    pause_seconds=settings.order_archive_pause_seconds,
+    interval_seconds=settings.order_archive_interval_seconds,
+)
@@ -1,22 +1,83 @@
-"""Сервис добавления товара в заказ."""
+"""Сервис заказов: добавление товара в заказ, оформление заказа и чтение заказов (с архивом)."""
 
+from collections import defaultdict
+from collections.abc import Sequence
+from datetime import datetime, timedelta
 from decimal import Decimal
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from database.commit_hooks import track_changes
 from database.models import OrderItem
 from exceptions import (
+    ClientNotFoundError,
     InsufficientStockError,
     NomenclatureNotFoundError,
+    OrderAlreadyCheckedOutError,
+    OrderLinesShortageError,
     OrderNotFoundError,
+    OrderStockShortageError,
 )
+from monitoring import traced
 from repositories import (
+    CatalogRepository,
     NomenclatureRepository,
     OrderItemRepository,
     OrderRepository,
+    StockHoldRepository,
 )
+from repositories.order_item_repository import order_nomenclature_ids
+from schemas.order import (
+    OrderCheckoutResponse,
+    OrderCloneResponse,
+    OrderItemResponse,
+    OrderPage,
+    OrderResponse,
+    ShortLine,
+)
+from settings.config import settings
+
+
+def _hold_expires_at() -> datetime | None:
+    """Срок удержания позиций, добавляемых сейчас; None — удержания выключены."""
+    if settings.stock_hold_ttl_seconds <= 0:
+        return None
+    return datetime.utcnow() + timedelta(seconds=settings.stock_hold_ttl_seconds)
+
+
+async def _hold_new_lines(
+    session: AsyncSession,
+    order_id: int,
+    lines: Sequence,
+    unsharded: set[int],
+    expires_at: datetime,
+) -> set[int]:
+    """
+    Удержать позиции нового заказа: нешардированных товаров — одним
+    INSERT ... SELECT, шардированных — по позиции на шард со свободным
+    остатком (claim_shard). Возвращает ID товаров, которым свободного остатка
+    шардов не хватило.
+    """
+    nom_repo = NomenclatureRepository(session)
+    hold_repo = StockHoldRepository(session)
+    if any(line.nomenclature_id in unsharded for line in lines):
+        await hold_repo.hold_order_lines(order_id, expires_at, sorted(unsharded))
+    short = set()
+    # По возрастанию ID товара: одинаковый порядок блокировок шардов во всех транзакциях
+    for line in sorted(lines, key=lambda line: line.nomenclature_id):
+        if line.nomenclature_id in unsharded:
+            continue
+        shard = await nom_repo.claim_shard(line.nomenclature_id, line.quantity, order_id)
+        if shard is None:
+            short.add(line.nomenclature_id)
+        else:
+            await hold_repo.set_hold(
+                order_id, line.nomenclature_id, line.quantity, expires_at, shard
+            )
+    return short
 
 
+@traced("service")
 async def add_product_to_order(
     session: AsyncSession,
     order_id: int,
@@ -28,7 +89,13 @@ async def add_product_to_order(
 
     - Если позиция с данной номенклатурой уже есть в заказе — увеличивает количество.
     - Если позиции нет — создаёт новую.
-    - Если товара нет в наличии в нужном количестве — выбрасывает InsufficientStockError.
+    - Если товара нет в наличии в нужном количестве (остаток минус активные
+      удержания других заказов) — выбрасывает InsufficientStockError.
+    - Если заказ уже оформлен — выбрасывает OrderAlreadyCheckedOutError.
+    - Количество позиции удерживается за заказом на STOCK_HOLD_TTL_SECONDS
+      (services/stock_holds.py); строка товара (у шардированного — один его
+      шард) блокируется только до конца этой транзакции, а не на время, пока
+      покупатель думает.
 
     :param session: асинхронная сессия БД
     :param order_id: ID заказа
@@ -40,12 +107,20 @@ async def add_product_to_order(
     nom_repo = NomenclatureRepository(session)
     item_repo = OrderItemRepository(session)
 
-    order = await order_repo.get_by_id(order_id)
+    # Блокировка заказа: проверка «не оформлен» и запись позиции атомарны
+    # относительно checkout_order и параллельных добавлений в тот же заказ
+    order = await order_repo.lock_for_update(order_id)
     if order is None:
         raise OrderNotFoundError(f"Заказ с ID {order_id} не найден")
+    if order.checked_out_at is not None:
+        raise OrderAlreadyCheckedOutError(f"Заказ с ID {order_id} уже оформлен")
 
-    nomenclature = await nom_repo.get_by_id(nomenclature_id)
-    if nomenclature is None:
+    expires_at = _hold_expires_at()
+    unsharded: set[int] = set()
+    if expires_at is not None:
+        unsharded = await nom_repo.lock_for_hold([nomenclature_id])
+    found = await nom_repo.get_available([nomenclature_id], order_id)
+    if nomenclature_id not in found:
         raise NomenclatureNotFoundError(
             f"Номенклатура с ID {nomenclature_id} не найдена"
         )
@@ -56,11 +131,293 @@ async def add_product_to_order(
     current_in_order = existing_item.quantity if existing_item else Decimal("0")
     total_required = current_in_order + quantity
 
-    available = nomenclature.quantity
+    available = found[nomenclature_id]
     if available < total_required:
         raise InsufficientStockError(available=available, requested=total_required)
 
+    if expires_at is not None:
+        shard = 0
+        if nomenclature_id not in unsharded:
+            # Шардированный товар: удержание — на шард со свободным остатком
+            shard = await nom_repo.claim_shard(nomenclature_id, total_required, order_id)
+            if shard is None:
+                found = await nom_repo.get_available([nomenclature_id], order_id)
+                raise InsufficientStockError(
+                    available=found[nomenclature_id], requested=total_required
+                )
+        await StockHoldRepository(session).set_hold(
+            order_id, nomenclature_id, total_required, expires_at, shard
+        )
     if existing_item:
         return await item_repo.update_quantity(existing_item, total_required)
 
     return await item_repo.create(order_id, nomenclature_id, quantity)
+
+
+@traced("service")
+async def checkout_order(session: AsyncSession, order_id: int) -> OrderCheckoutResponse:
+    """
+    Оформляет заказ: списывает остатки по всем позициям сразу, удержания
+    заказа превращаются в списание и снимаются.
+
+    Число запросов не зависит от числа позиций: UPDATE заказа, один SELECT
+    позиций, увеличение версии каталога, один UPDATE ... FROM order_items по
+    номенклатуре (остатка за вычетом удержаний других заказов должно хватать)
+    и один DELETE удержаний. Шардированные товары (services/stock_shards.py) списываются
+    отдельно — с шарда, свободного остатка которого (за вычетом чужих
+    удержаний на нём) хватает, под той же блокировкой шарда, что и удержания
+    (claim_shard); без версии каталога: заказ только из них не блокирует
+    строку счётчика версий. Если хотя бы одной позиции не
+    хватает остатка — выбрасывает OrderStockShortageError, и транзакция
+    откатывается целиком (get_session делает rollback).
+
+    :param session: асинхронная сессия БД
+    :param order_id: ID заказа
+    :return: оформленный заказ с позициями
+    """
+    order_repo = OrderRepository(session)
+    nom_repo = NomenclatureRepository(session)
+    item_repo = OrderItemRepository(session)
+    catalog_repo = CatalogRepository(session)
+
+    checked_out_at = datetime.utcnow()
+    if not await order_repo.mark_checked_out(order_id, checked_out_at):
+        if await order_repo.get_by_id(order_id) is None:
+            raise OrderNotFoundError(f"Заказ с ID {order_id} не найден")
+        raise OrderAlreadyCheckedOutError(f"Заказ с ID {order_id} уже оформлен")
+
+    lines = await item_repo.get_lines_with_stock(order_id)
+    sharded = sorted(
+        (line for line in lines if line.stock_shards), key=lambda line: line.nomenclature_id
+    )
+    reserved_ids: set[int] = set()
+    if len(sharded) < len(lines):
+        version = await catalog_repo.next_version()
+        reserved_ids = await nom_repo.reserve_for_order(order_id, version)
+    # Шарды — по возрастанию ID товара: одинаковый порядок блокировок во всех транзакциях
+    taken_ids = {
+        line.nomenclature_id
+        for line in sharded
+        if await nom_repo.take_from_shards(line.nomenclature_id, line.quantity, order_id)
+    }
+
+    failed = {line.nomenclature_id for line in lines} - reserved_ids - taken_ids
+    if failed:
+        # Только на пути ошибки: по непрошедшим строкам остаток не менялся — перечитываем
+        short_lines = [
+            (line.nomenclature_id, line.quantity, line.available)
+            for line in await item_repo.get_lines_with_stock(order_id)
+            if line.nomenclature_id in failed
+        ]
+        raise OrderStockShortageError(order_id, short_lines)
+
+    await StockHoldRepository(session).release_order(order_id)
+    # Списанные с шардов тоже: хуки сбросят кэш и разошлют остаток (сумму шардов);
+    # витринный quantity и версию каталога обновит выравнивание шардов
+    track_changes(session, "nomenclature", reserved_ids | taken_ids)
+    return OrderCheckoutResponse(
+        order_id=order_id,
+        checked_out_at=checked_out_at,
+        items=[
+            OrderItemResponse(
+                id=line.id,
+                order_id=order_id,
+                nomenclature_id=line.nomenclature_id,
+                quantity=line.quantity,
+            )
+            for line in lines
+        ],
+    )
+
+
+@traced("service")
+async def create_order(
+    session: AsyncSession,
+    client_id: int | None,
+    lines: Sequence[tuple[int, Decimal]] = (),
+) -> OrderResponse:
+    """
+    Создать заказ с начальными позициями (nomenclature_id, quantity).
+
+    Запросов не больше четырёх при любом числе позиций: INSERT заказа с
+    RETURNING (с проверкой клиента в том же запросе), блокировка строк товаров
+    (в SQLite — только чтение ID нешардированных), один INSERT ... SELECT
+    позиций из VALUES с условием на доступный остаток и один INSERT удержаний
+    позиций; удержание позиции шардированного товара — отдельно, на его шарде.
+    Повторы номенклатуры суммируются. Если хоть одна
+    позиция не вставлена — выбрасывается ошибка, и транзакция откатывается
+    целиком (get_session делает rollback): заказ не создаётся частично.
+
+    :raises ClientNotFoundError: клиента нет
+    :raises NomenclatureNotFoundError: какой-то номенклатуры нет
+    :raises OrderLinesShortageError: остатка не хватает по части позиций
+    """
+    order_repo = OrderRepository(session)
+    item_repo = OrderItemRepository(session)
+
+    requested: dict[int, Decimal] = defaultdict(Decimal)
+    for nomenclature_id, quantity in lines:
+        requested[nomenclature_id] += quantity
+
+    order = await order_repo.create(client_id)
+    if order is None:
+        raise ClientNotFoundError(f"Клиент с ID {client_id} не найден")
+    expires_at = _hold_expires_at()
+    inserted = []
+    short: set[int] = set()
+    if requested:
+        unsharded = set()
+        if expires_at is not None:
+            unsharded = await NomenclatureRepository(session).lock_for_hold(sorted(requested))
+        inserted = await item_repo.insert_lines(order.id, requested.items())
+        if inserted and expires_at is not None and len(inserted) == len(requested):
+            short = await _hold_new_lines(session, order.id, inserted, unsharded, expires_at)
+
+    if len(inserted) < len(requested) or short:
+        # Только на пути ошибки: почему позиции не вставлены или не удержаны
+        inserted_ids = {line.nomenclature_id for line in inserted}
+        missing = [id for id in requested if id in short or id not in inserted_ids]
+        found = await NomenclatureRepository(session).get_available(missing, order.id)
+        unknown = [id for id in missing if id not in found]
+        if unknown:
+            raise NomenclatureNotFoundError(f"Номенклатура с ID {unknown[0]} не найдена")
+        raise OrderLinesShortageError(
+            [(id, requested[id], found[id]) for id in missing]
+        )
+
+    return OrderResponse(
+        id=order.id,
+        client_id=order.client_id,
+        created_at=order.created_at,
+        checked_out_at=None,
+        items=[
+            OrderItemResponse(
+                id=line.id,
+                order_id=order.id,
+                nomenclature_id=line.nomenclature_id,
+                quantity=line.quantity,
+            )
+            for line in inserted
+        ],
+    )
+
+
+@traced("service")
+async def clone_order(session: AsyncSession, order_id: int) -> OrderCloneResponse:
+    """
+    Повторить заказ: новый заказ того же клиента с копией позиций исходного.
+
+    Исходный заказ ищется и в архиве. Запросов не больше шести при любом числе
+    позиций: поиск заказа, INSERT нового заказа, блокировка строк товаров
+    (в SQLite — только чтение ID нешардированных), один INSERT ... SELECT
+    позиций с условием на доступный остаток, INSERT удержаний скопированных
+    позиций и выборка не скопированных; удержание позиции шардированного
+    товара — отдельно, на его шарде. Позиции, которые остаток не покрывает, не
+    копируются (или удаляются, если не хватило свободного остатка шардов) и
+    возвращаются в short_lines; остатки списываются только при оформлении.
+
+    :raises OrderNotFoundError: исходного заказа нет
+    :raises ClientNotFoundError: клиент исходного заказа удалён
+    """
+    order_repo = OrderRepository(session)
+    item_repo = OrderItemRepository(session)
+
+    source = await order_repo.get_row(order_id, include_archived=True)
+    if source is None:
+        raise OrderNotFoundError(f"Заказ с ID {order_id} не найден")
+
+    order = await order_repo.create(source.client_id)
+    if order is None:
+        raise ClientNotFoundError(f"Клиент с ID {source.client_id} не найден")
+    expires_at = _hold_expires_at()
+    unsharded = set()
+    if expires_at is not None:
+        unsharded = await NomenclatureRepository(session).lock_for_hold(
+            order_nomenclature_ids(order_id, source.archived)
+        )
+    lines = await item_repo.copy_lines(order_id, order.id, source.archived)
+    if lines and expires_at is not None:
+        unheld = await _hold_new_lines(session, order.id, lines, unsharded, expires_at)
+        if unheld:
+            await item_repo.delete_lines(order.id, unheld)
+            lines = [line for line in lines if line.nomenclature_id not in unheld]
+    short = await item_repo.get_uncopied_lines(order_id, order.id, source.archived)
+
+    return OrderCloneResponse(
+        order=OrderResponse(
+            id=order.id,
+            client_id=order.client_id,
+            created_at=order.created_at,
+            checked_out_at=None,
+            items=[
+                OrderItemResponse(
+                    id=line.id,
+                    order_id=order.id,
+                    nomenclature_id=line.nomenclature_id,
+                    quantity=line.quantity,
+                )
+                for line in lines
+            ],
+        ),
+        short_lines=[
+            ShortLine(
+                nomenclature_id=line.nomenclature_id,
+                requested=line.requested,
+                available=line.available,
+            )
+            for line in short
+        ],
+    )
+
+
+async def _with_items(
+    session: AsyncSession, rows: list, include_archived: bool
+) -> list[OrderResponse]:
+    """Заказы с позициями: все позиции — одним запросом."""
+    lines = await OrderRepository(session).get_lines([row.id for row in rows], include_archived)
+    by_order: dict[int, list[OrderItemResponse]] = defaultdict(list)
+    for line in lines:
+        by_order[line.order_id].append(OrderItemResponse.model_validate(line))
+    return [
+        OrderResponse(
+            id=row.id,
+            client_id=row.client_id,
+            created_at=row.created_at,
+            checked_out_at=row.checked_out_at,
+            archived=row.archived,
+            items=by_order[row.id],
+        )
+        for row in rows
+    ]
+
+
+@traced("service")
+async def get_order(
+    session: AsyncSession, order_id: int, include_archived: bool = False
+) -> OrderResponse:
+    """
+    Заказ с позициями. Архивные заказы (services/order_archive.py) ищутся
+    только при include_archived — горячий путь не читает архивные таблицы.
+
+    :raises OrderNotFoundError: заказа нет (или он в архиве, а include_archived=False)
+    """
+    row = await OrderRepository(session).get_row(order_id, include_archived)
+    if row is None:
+        raise OrderNotFoundError(f"Заказ с ID {order_id} не найден")
+    return (await _with_items(session, [row], include_archived))[0]
+
+
+@traced("service")
+async def list_client_orders(
+    session: AsyncSession,
+    client_id: int,
+    limit: int,
+    before_id: int | None = None,
+    include_archived: bool = False,
+) -> OrderPage:
+    """Заказы клиента от новых к старым с позициями; при include_archived — вместе с архивом."""
+    rows = await OrderRepository(session).list_by_client(client_id, limit, before_id, include_archived)
+    return OrderPage(
+        items=await _with_items(session, rows, include_archived),
+        next_before_id=rows[-1].id if len(rows) == limit else None,
+    )
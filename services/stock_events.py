@@ -0,0 +1,174 @@
+"""
+Поток изменений остатков и цен (server-sent events).
+
+StockEventBroker получает ID изменённой номенклатуры из хука после commit
+(database.commit_hooks), одним запросом читает актуальные (остаток, price) —
+у шардированного товара сумму шардов, а не витринный quantity — и
+раскладывает события по очередям подписчиков — одна рассылка на commit вместо
+периодического чтения всей таблицы каждым клиентом.
+
+- У каждого подписчика ограниченная очередь; при переполнении очередь
+  сбрасывается и клиенту уходит событие resync (перечитать /api/nomenclature/).
+- Каждое событие имеет токен возобновления "<эпоха>-<номер>" (SSE id): клиент
+  передаёт Last-Event-ID и получает пропущенные события из кольцевого буфера,
+  а если они уже вытеснены или процесс перезапущен (другая эпоха) — resync.
+
+Брокер живёт в процессе: при нескольких воркерах каждый рассылает только
+изменения, закоммиченные через него.
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from database.commit_hooks import CatalogChanges
+from database.db_helper import db_helper
+from database.models import Nomenclature
+from repositories.nomenclature_repository import available_quantity
+from settings.config import settings
+
+
+@dataclass(frozen=True, slots=True)
+class StockEvent:
+    """Изменение остатка/цены одного товара."""
+
+    seq: int
+    nomenclature_id: int
+    quantity: Decimal
+    price: Decimal
+
+
+class StockSubscription:
+    """Подписка одного клиента: ограниченная очередь событий и флаг resync."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.queue: asyncio.Queue[StockEvent] = asyncio.Queue(maxsize=maxsize)
+        self.needs_resync = False
+        self._wakeup = asyncio.Event()
+
+    def push(self, event: StockEvent) -> None:
+        """Положить событие; при переполнении — сбросить очередь и потребовать resync."""
+        if self.needs_resync:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.request_resync()
+            return
+        self._wakeup.set()
+
+    def request_resync(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.needs_resync = True
+        self._wakeup.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Дождаться события или resync; False — истёк таймаут (пора слать heartbeat)."""
+        if self.needs_resync or not self.queue.empty():
+            return True
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+
+class StockEventBroker:
+    """Рассылка событий изменений остатков всем подписчикам процесса."""
+
+    def __init__(self, queue_size: int, history_size: int) -> None:
+        self._queue_size = queue_size
+        self._history: deque[StockEvent] = deque(maxlen=history_size)
+        self._subscribers: set[StockSubscription] = set()
+        self._seq = 0
+        self._epoch = time.time_ns()
+
+    @property
+    def last_seq(self) -> int:
+        """Номер последнего события."""
+        return self._seq
+
+    def token(self, seq: int) -> str:
+        """Токен возобновления для события с номером seq."""
+        return f"{self._epoch}-{seq}"
+
+    def parse_token(self, token: str) -> int | None:
+        """Номер события из токена; None — токен чужой эпохи или некорректен."""
+        epoch, _, seq = token.partition("-")
+        if epoch != str(self._epoch) or not seq.isdigit():
+            return None
+        return int(seq)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, resume_token: str | None = None) -> StockSubscription:
+        """
+        Подписаться на события.
+
+        Если передан токен и пропущенные события ещё в буфере — они сразу
+        кладутся в очередь; если вытеснены или токен не распознан — подписка
+        начинается с resync.
+        """
+        subscription = StockSubscription(self._queue_size)
+        if resume_token is not None:
+            last_seq = self.parse_token(resume_token)
+            oldest = self._history[0].seq if self._history else self._seq + 1
+            if last_seq is None or last_seq > self._seq or last_seq + 1 < oldest:
+                subscription.request_resync()
+            else:
+                for event in self._history:
+                    if event.seq > last_seq:
+                        subscription.push(event)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: StockSubscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, rows: list[tuple[int, Decimal, Decimal]]) -> None:
+        """Присвоить номера и разослать события (nomenclature_id, quantity, price)."""
+        for nomenclature_id, quantity, price in rows:
+            self._seq += 1
+            event = StockEvent(self._seq, nomenclature_id, quantity, price)
+            self._history.append(event)
+            for subscription in self._subscribers:
+                subscription.push(event)
+
+    def skip(self) -> None:
+        """
+        Изменения без подписчиков не читаются из БД; буфер сбрасывается, чтобы
+        возобновление через этот разрыв закончилось resync, а не потерей событий.
+        """
+        self._seq += 1
+        self._history.clear()
+
+    async def on_commit(self, changes: CatalogChanges) -> None:
+        """Хук после commit: прочитать изменённые строки одним запросом и разослать."""
+        ids = changes.get("nomenclature")
+        if not ids:
+            return
+        if not self._subscribers:
+            self.skip()
+            return
+        async with db_helper.read_session_factory() as session:
+            result = await session.execute(
+                select(Nomenclature.id, available_quantity(), Nomenclature.price)
+                .where(Nomenclature.id.in_(ids))
+                .order_by(Nomenclature.id)
+            )
+            rows = [tuple(row) for row in result.all()]
+        self.publish(rows)
+
+
+stock_broker = StockEventBroker(
+    queue_size=settings.stock_stream_queue_size,
+    history_size=settings.stock_stream_history_size,
+)
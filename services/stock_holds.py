@@ -0,0 +1,108 @@
+"""
+Удержания остатка открытыми заказами (stock_holds).
+
+Добавление товара в заказ (а также создание и повтор заказа) удерживает
+количество позиции за заказом на STOCK_HOLD_TTL_SECONDS. Доступный остаток —
+остаток на складе минус активные (expires_at > now) удержания других заказов:
+сумма по индексу (nomenclature_id, expires_at), без отдельного счётчика, —
+строка счётчика снова стала бы общей горячей строкой. Проверка и запись
+удержания идут под блокировкой строки товара только до конца короткой
+транзакции запроса, а не пока покупатель думает. Оформление списывает остаток
+(остатка за вычетом чужих удержаний должно хватать) и снимает удержания заказа.
+
+Истёкшие удержания уже не учитываются при чтении; фоновая очистка удаляет их
+пачками, чтобы таблица и индексы не росли.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.db_helper import db_helper
+from repositories import StockHoldRepository
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def release_expired_holds(
+    session_factory: async_sessionmaker[AsyncSession],
+    batch_size: int,
+    pause_seconds: float = 0.0,
+    max_batches: int | None = None,
+) -> int:
+    """
+    Удалить истёкшие удержания пачками по batch_size, каждая — в своей транзакции.
+
+    :param max_batches: не больше стольких пачек за вызов (None — до конца)
+    :return: число удалённых удержаний
+    """
+    now = datetime.utcnow()
+    released = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        async with session_factory() as session:
+            deleted = await StockHoldRepository(session).delete_expired(now, batch_size)
+            await session.commit()
+        released += deleted
+        batches += 1
+        if deleted < batch_size:
+            break
+        await asyncio.sleep(pause_seconds)
+    return released
+
+
+class StockHoldSweeper:
+    """Периодическая очистка истёкших удержаний в фоне приложения."""
+
+    def __init__(self, batch_size: int, interval_seconds: float) -> None:
+        self._batch_size = batch_size
+        self._interval_seconds = interval_seconds
+        self._task: asyncio.Task | None = None
+        self.runs = 0
+        self.released = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._interval_seconds > 0
+
+    async def start(self) -> None:
+        if self.enabled:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> int:
+        released = await release_expired_holds(db_helper.session_factory, self._batch_size)
+        self.runs += 1
+        self.released += released
+        return released
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("Ошибка очистки удержаний остатка")
+            await asyncio.sleep(self._interval_seconds)
+
+    def stats(self) -> dict[str, int]:
+        """Метрики для monitoring.metrics."""
+        return {"runs": self.runs, "released": self.released, "errors": self.errors}
+
+
+stock_hold_sweeper = StockHoldSweeper(
+    batch_size=settings.stock_hold_sweep_batch_size,
+    interval_seconds=settings.stock_hold_sweep_interval_seconds,
+)
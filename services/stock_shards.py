@@ -0,0 +1,221 @@
+"""
+Шардированные счётчики остатка для товаров с горячей конкуренцией (флеш-распродажи).
+
+Оформление заказа списывает остаток UPDATE строки nomenclature, и на
+PostgreSQL все заказы одного товара ждут блокировку этой строки. У
+шардированного товара (nomenclature.stock_shards = N > 0) остаток разложен по
+N строкам nomenclature_stock_shards: оформление берёт случайный шард с
+достаточным свободным остатком (FOR UPDATE SKIP LOCKED), при нехватке на одном
+шарде — блокирует все шарды товара и переносит остаток на один из них;
+доступный остаток при добавлении в заказ — сумма шардов. Заказ только из
+шардированных товаров не увеличивает версию каталога, поэтому не ждёт и строку
+счётчика версий.
+
+Удержание остатка (services/stock_holds.py) шардированного товара записывается
+на один шард и под блокировкой этого шарда, так же как списание
+(NomenclatureRepository.claim_shard): свободный остаток шарда — его остаток
+минус удержания на нём — проверяется и расходуется под одной и той же
+блокировкой, а строка nomenclature при добавлении в заказ не блокируется.
+
+nomenclature.quantity такого товара — витринное значение (карточка, витрина,
+ETag, снимок каталога, лента изменений): оформление отмечает товар изменённым
+(кэш сбрасывается, поток остатков сразу получает сумму шардов), но версию
+каталога не увеличивает. Витринный остаток, как и равномерность шардов,
+обновляет выравнивание: фоновая задача приложения
+(STOCK_SHARD_REBALANCE_INTERVAL_SECONDS) или scripts/stock_shards.py rebalance;
+при нескольких воркерах выравнивает один — владелец flock на
+STOCK_SHARD_REBALANCE_LOCK_PATH, как сборщик снимка каталога. Массовое
+обновление остатков (PATCH /api/nomenclature:bulk) раскладывает новый остаток
+по шардам сразу.
+
+На SQLite запись сериализована единственным writer — шарды корректны, но
+пропускную способность не увеличивают.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.commit_hooks import track_changes
+from database.db_helper import db_helper
+from exceptions import NomenclatureNotFoundError
+from repositories import CatalogRepository, NomenclatureRepository
+from repositories.nomenclature_repository import split_evenly, spread_over_holds
+from settings.config import settings
+
+try:
+    import fcntl
+except ImportError:  # не POSIX: выравнивает каждый процесс
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+async def set_stock_shards(session: AsyncSession, nomenclature_id: int, shards: int) -> None:
+    """
+    Перевести товар на shards счётчиков остатка (0 — обратно в nomenclature.quantity).
+
+    Текущий остаток (у шардированного товара — сумма шардов) читается с
+    блокировкой и раскладывается по новым шардам поровну.
+
+    :raises NomenclatureNotFoundError: товара нет
+    """
+    repo = NomenclatureRepository(session)
+    current = await repo.lock_stock([nomenclature_id])
+    if nomenclature_id not in current:
+        raise NomenclatureNotFoundError(f"Номенклатура с ID {nomenclature_id} не найдена")
+    quantity, _ = current[nomenclature_id]
+    version = await CatalogRepository(session).next_version()
+    await repo.set_sharding(nomenclature_id, quantity, shards, version)
+    track_changes(session, "nomenclature", [nomenclature_id])
+
+
+def _needs_spread(shards: list, held: list) -> bool:
+    """
+    Свободный остаток шардов (за вычетом удержаний на них) разошёлся больше чем
+    на одну равную долю (и больше чем на единицу).
+    """
+    free = [part - hold for part, hold in zip(shards, held)]
+    total = sum(free)
+    if total < 0 or sorted(free) == sorted(split_evenly(total, len(free))):
+        return False
+    return max(free) - min(free) > max(total / len(free), 1)
+
+
+async def rebalance_stock_shards(
+    session_factory: async_sessionmaker[AsyncSession], batch_size: int = 100
+) -> tuple[int, int]:
+    """
+    Выровнять шарды и обновить витринный остаток шардированных товаров.
+
+    Товары обрабатываются пачками по batch_size, каждая — в своей транзакции:
+    строки nomenclature и шарды блокируются (в том же порядке, что при
+    оформлении), разошедшиеся шарды раскладываются так, чтобы свободный остаток
+    (за вычетом удержаний на шарде) был поровну, nomenclature.quantity
+    приравнивается сумме шардов (с версией каталога и хуками изменений).
+
+    :return: (число товаров с переразложенными шардами, число товаров с обновлённым quantity)
+    """
+    async with session_factory() as session:
+        ids = await NomenclatureRepository(session).get_sharded_ids()
+    spread = synced = 0
+    for start in range(0, len(ids), batch_size):
+        async with session_factory() as session:
+            repo = NomenclatureRepository(session)
+            displayed = await repo.lock_displayed_stock(ids[start:start + batch_size])
+            shards = await repo.lock_shards(list(displayed))
+            holds = await repo.get_shard_holds(list(shards), datetime.utcnow())
+            changed = []
+            for id, quantity in displayed.items():
+                parts = shards.get(id)
+                if not parts:
+                    continue
+                total = sum(parts)
+                held = [holds.get(id, {}).get(shard, Decimal(0)) for shard in range(len(parts))]
+                if _needs_spread(parts, held):
+                    await repo.set_shards(
+                        id,
+                        [
+                            {"shard": shard, "quantity": part}
+                            for shard, part in enumerate(spread_over_holds(total, held))
+                        ],
+                    )
+                    spread += 1
+                if total != quantity:
+                    changed.append({"id": id, "quantity": total})
+            if changed:
+                version = await CatalogRepository(session).next_version()
+                await repo.set_displayed_stock(changed, version)
+                track_changes(session, "nomenclature", [row["id"] for row in changed])
+                synced += len(changed)
+            await session.commit()
+    return spread, synced
+
+
+class StockShardRebalancer:
+    """Периодическое выравнивание шардов остатка в фоне приложения."""
+
+    def __init__(self, interval_seconds: float, lock_path: str = "") -> None:
+        self._interval_seconds = interval_seconds
+        self._lock_path = lock_path
+        self._lock_file = None
+        self._task: asyncio.Task | None = None
+        self.runs = 0
+        self.spread = 0
+        self.synced = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._interval_seconds > 0
+
+    async def start(self) -> None:
+        if self.enabled:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    @property
+    def is_leader(self) -> bool:
+        return not self._lock_path or self._lock_file is not None
+
+    def _try_become_leader(self) -> bool:
+        """Взять flock на lock_path без ожидания; без lock_path выравнивает каждый воркер."""
+        if self.is_leader:
+            return True
+        lock_file = open(self._lock_path, "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        return True
+
+    async def run_once(self) -> tuple[int, int]:
+        spread, synced = await rebalance_stock_shards(db_helper.session_factory)
+        self.runs += 1
+        self.spread += spread
+        self.synced += synced
+        return spread, synced
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Остальные воркеры ждут, пока владелец блокировки не завершится
+                if self._try_become_leader():
+                    await self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("Ошибка выравнивания шардов остатка")
+            await asyncio.sleep(self._interval_seconds)
+
+    def stats(self) -> dict[str, int]:
+        """Метрики для monitoring.metrics."""
+        return {
+            "leader": int(self.is_leader),
+            "runs": self.runs,
+            "spread": self.spread,
+            "synced": self.synced,
+            "errors": self.errors,
+        }
+
+
+stock_shard_rebalancer = StockShardRebalancer(
+    interval_seconds=settings.stock_shard_rebalance_interval_seconds,
+    lock_path=settings.stock_shard_rebalance_lock_path,
+)
@@ -1,5 +1,8 @@
 """Конфигурация приложения через переменные окружения."""
 
+import os
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -32,11 +35,48 @@ class DatabaseConfig:
 
 
 class RunConfig:
-    """Параметры запуска приложения."""
+    """
+    Параметры запуска приложения.
+
+    mode="dev" — один процесс с reload; mode="prod" — несколько воркеров
+    (workers=0 — по числу доступных CPU) с настройками uvicorn ниже.
+    """
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        *,
+        mode: str = "dev",
+        workers: int = 0,
+        loop: str = "auto",
+        http: str = "auto",
+        keep_alive: int = 5,
+        backlog: int = 2048,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        graceful_timeout: int = 30,
+        warmup: bool = True,
+    ) -> None:
         self.host = host
         self.port = port
+        self.mode = mode
+        self.workers = workers or _available_cpus()
+        self.loop = loop
+        self.http = http
+        self.keep_alive = keep_alive
+        self.backlog = backlog
+        self.max_requests = max_requests or None
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.warmup = warmup
+
+
+def _available_cpus() -> int:
+    """CPU, доступные процессу (с учётом affinity контейнера)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
 
 
 class Settings(BaseSettings):
@@ -53,8 +93,105 @@ class Settings(BaseSettings):
     database_pool_size: int = 5
     database_max_overflow: int = 10
 
+    # Цены и количества хранятся в БД целыми (BIGINT: цена × 100, количество × 10^4)
+    # вместо NUMERIC; при смене режима — python scripts/migrate.py (database/types.py)
+    storage_scaled_numbers: bool = False
+
+    # Cache-Control max-age (сек) для GET каталога; клиенты перепроверяют ETag после истечения
+    catalog_cache_max_age: int = 0
+
+    # Размер пачки при массовом обновлении остатков/цен (PATCH /api/nomenclature:bulk)
+    nomenclature_bulk_chunk_size: int = 1000
+    # Максимум строк в одном PATCH /api/nomenclature:bulk (больше — 422)
+    nomenclature_bulk_max_items: int = 10000
+
+    # Максимум ID в одном запросе GET /api/nomenclature/?ids=
+    nomenclature_batch_max_ids: int = 200
+
+    # Кэш горячей номенклатуры в процессе: размер (0 — выключен), TTL и окно
+    # stale-while-revalidate (сек; 0 — устаревшие записи не отдаются)
+    nomenclature_cache_size: int = 10000
+    nomenclature_cache_ttl_seconds: float = 30.0
+    nomenclature_cache_stale_seconds: float = 0.0
+
+    # Общий снимок каталога для нескольких воркеров (mmap-файл; пусто — выключен)
+    # и период проверки версии каталога (сек)
+    catalog_snapshot_path: str = ""
+    catalog_snapshot_poll_seconds: float = 1.0
+
+    # Поток изменений остатков (SSE): очередь подписчика, буфер для возобновления, heartbeat
+    stock_stream_queue_size: int = 256
+    stock_stream_history_size: int = 4096
+    stock_stream_heartbeat_seconds: float = 15.0
+
+    # Трассировка: экспорт (none — выключена, file — строки OTLP/JSON в файл,
+    # otlp — POST OTLP/JSON на коллектор), доля трасс в выборке, имя сервиса
+    tracing_exporter: Literal["none", "file", "otlp"] = "none"
+    tracing_sample_rate: float = 1.0
+    tracing_file: str = "traces.jsonl"
+    tracing_otlp_endpoint: str = "http://127.0.0.1:4318/v1/traces"
+    tracing_service_name: str = "orders-api"
+
+    # Срок запроса к БД по умолчанию (сек; 0 — без срока) и сроки отдельных маршрутов
+    # по имени обработчика, например {"category_tree_endpoint": 2}; клиент может
+    # сократить срок заголовком X-Request-Timeout
+    request_deadline_seconds: float = 10.0
+    request_deadlines: dict[str, float] = {}
+
+    # Допуск запросов: одновременных запросов записи/чтения (0 — без лимита),
+    # длина очереди ожидания, срок ожидания в очереди (сек) и Retry-After отказа
+    admission_write_limit: int = 4
+    admission_write_queue: int = 32
+    admission_write_queue_timeout_seconds: float = 2.0
+    admission_read_limit: int = 64
+    admission_read_queue: int = 256
+    admission_read_queue_timeout_seconds: float = 1.0
+    admission_retry_after_seconds: int = 1
+
+    # Максимум позиций в теле POST /api/orders (все вставляются одним запросом)
+    order_max_lines: int = 500
+
+    # Удержания остатка открытыми заказами (services/stock_holds.py): срок удержания
+    # позиции (сек; 0 — без удержаний, доступность — только по остатку) и фоновая
+    # очистка истёкших удержаний пачками по batch_size раз в interval (сек; 0 — выключена)
+    stock_hold_ttl_seconds: float = 900.0
+    stock_hold_sweep_batch_size: int = 1000
+    stock_hold_sweep_interval_seconds: float = 60.0
+
+    # Шардированные счётчики остатка (services/stock_shards.py): число шардов по
+    # умолчанию для scripts/stock_shards.py и период выравнивания шардов и витринного
+    # остатка в фоне приложения (сек; 0 — только скрипт); lock_path — файл flock, владелец
+    # которого единственный выравнивает при нескольких воркерах (пусто — каждый воркер)
+    stock_shard_count: int = 16
+    stock_shard_rebalance_interval_seconds: float = 5.0
+    stock_shard_rebalance_lock_path: str = ""
+
+    # Архивация заказов: оформленные заказы старше N дней (0 — выключена) переносятся
+    # в архивные таблицы пачками по batch_size с паузой между пачками (сек);
+    # фоновая задача приложения запускается раз в interval (сек; 0 — только скрипт)
+    order_archive_after_days: float = 0.0
+    order_archive_batch_size: int = 500
+    order_archive_pause_seconds: float = 0.05
+    order_archive_interval_seconds: float = 600.0
+
     run_host: str = "127.0.0.1"
     run_port: int = 8000
+    # Режим запуска main.py: dev (reload, один процесс) или prod (воркеры)
+    run_mode: Literal["dev", "prod"] = "dev"
+    # prod: число воркеров (0 — по числу CPU), event loop и HTTP-парсер uvicorn
+    run_workers: int = 0
+    run_loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    run_http: Literal["auto", "h11", "httptools"] = "auto"
+    # prod: keep-alive (сек) и backlog сокета
+    run_keep_alive: int = 5
+    run_backlog: int = 2048
+    # prod: перезапуск воркера после N запросов (0 — нет) + случайная добавка до jitter
+    run_max_requests: int = 0
+    run_max_requests_jitter: int = 0
+    # Сколько ждать завершения запросов и транзакций при остановке (сек)
+    run_graceful_timeout: int = 30
+    # Прогрев пула соединений и кэшей каталога до приёма запросов
+    run_warmup: bool = True
 
     @property
     def db(self) -> DatabaseConfig:
@@ -67,7 +204,20 @@ class Settings(BaseSettings):
 
     @property
     def run(self) -> RunConfig:
-        return RunConfig(host=self.run_host, port=self.run_port)
+        return RunConfig(
+            host=self.run_host,
+            port=self.run_port,
+            mode=self.run_mode,
+            workers=self.run_workers,
+            loop=self.run_loop,
+            http=self.run_http,
+            keep_alive=self.run_keep_alive,
+            backlog=self.run_backlog,
+            max_requests=self.run_max_requests,
+            max_requests_jitter=self.run_max_requests_jitter,
+            graceful_timeout=self.run_graceful_timeout,
+            warmup=self.run_warmup,
+        )
 
 
 settings = Settings()
@@ -9,11 +9,13 @@ CREATE TABLE IF NOT EXISTS categories (
     id          SERIAL PRIMARY KEY,
     name        VARCHAR(255) NOT NULL,
     parent_id   INTEGER NULL REFERENCES categories (id) ON DELETE SET NULL,
+    change_version BIGINT NOT NULL DEFAULT 0,
     CONSTRAINT categories_parent_fk FOREIGN KEY (parent_id) REFERENCES categories (id) ON DELETE SET NULL
 );
 
 CREATE INDEX IF NOT EXISTS idx_categories_name ON categories (name);
 CREATE INDEX IF NOT EXISTS idx_categories_parent_id ON categories (parent_id);
+CREATE INDEX IF NOT EXISTS idx_categories_change_version ON categories (change_version);
 
 COMMENT ON TABLE categories IS 'Дерево категорий номенклатуры с неограниченной вложенностью';
 COMMENT ON COLUMN categories.parent_id IS 'Родительская категория; NULL для корневого уровня';
@@ -27,14 +29,36 @@ CREATE TABLE IF NOT EXISTS nomenclature (
     quantity    NUMERIC(18, 4) NOT NULL DEFAULT 0,
     price       NUMERIC(18, 2) NOT NULL,
     category_id INTEGER NULL REFERENCES categories (id) ON DELETE SET NULL,
+    change_version BIGINT NOT NULL DEFAULT 0,
+    stock_shards SMALLINT NOT NULL DEFAULT 0,
     CONSTRAINT nomenclature_category_fk FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE SET NULL
 );
 
 CREATE INDEX IF NOT EXISTS idx_nomenclature_name ON nomenclature (name);
-CREATE INDEX IF NOT EXISTS idx_nomenclature_category_id ON nomenclature (category_id);
+-- Витрина: категория + цена (keyset по (price, id)); префикс заменяет индекс по category_id
+CREATE INDEX IF NOT EXISTS idx_nomenclature_category_price_id ON nomenclature (category_id, price, id);
+CREATE INDEX IF NOT EXISTS idx_nomenclature_price_id ON nomenclature (price, id);
+CREATE INDEX IF NOT EXISTS idx_nomenclature_in_stock_price_id ON nomenclature (price, id) WHERE quantity > 0;
+CREATE INDEX IF NOT EXISTS idx_nomenclature_change_version ON nomenclature (change_version);
+-- Полнотекстовый поиск по наименованию («ё» приводится к «е»)
+CREATE INDEX IF NOT EXISTS ix_nomenclature_name_fts ON nomenclature
+    USING GIN (to_tsvector('simple', translate(name, 'ёЁ', 'еЕ')));
 
 COMMENT ON TABLE nomenclature IS 'Номенклатура: наименование, количество, цена';
 COMMENT ON COLUMN nomenclature.category_id IS 'Категория товара; NULL допустимо';
+COMMENT ON COLUMN nomenclature.stock_shards IS 'Число шардов остатка (0 — остаток в quantity, иначе quantity — витринное значение)';
+
+-- Шарды остатка товаров с горячей конкуренцией: остаток = сумма шардов
+-- (nomenclature.stock_shards > 0); services/stock_shards.py
+CREATE TABLE IF NOT EXISTS nomenclature_stock_shards (
+    nomenclature_id INTEGER NOT NULL REFERENCES nomenclature (id) ON DELETE CASCADE,
+    shard           SMALLINT NOT NULL,
+    quantity        NUMERIC(18, 4) NOT NULL DEFAULT 0,
+    PRIMARY KEY (nomenclature_id, shard),
+    CONSTRAINT check_stock_shard_quantity_non_negative CHECK (quantity >= 0)
+);
+
+COMMENT ON TABLE nomenclature_stock_shards IS 'Счётчики остатка шардированного товара; списание — со случайного шарда';
 
 -- ---------------------------------------------------------------------------
 -- Клиенты (наименование, адрес) — ТЗ 1.3
@@ -54,12 +78,16 @@ COMMENT ON TABLE clients IS 'Клиенты: наименование и адр
 -- ---------------------------------------------------------------------------
 CREATE TABLE IF NOT EXISTS orders (
     id        SERIAL PRIMARY KEY,
-    client_id INTEGER NULL REFERENCES clients (id) ON DELETE SET NULL
+    client_id INTEGER NULL REFERENCES clients (id) ON DELETE SET NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    checked_out_at TIMESTAMP NULL
 );
 
 CREATE INDEX IF NOT EXISTS idx_orders_client_id ON orders (client_id);
+CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at);
 
 COMMENT ON TABLE orders IS 'Заказ; позиции в order_items';
+COMMENT ON COLUMN orders.checked_out_at IS 'Момент оформления: остатки по всем позициям списаны; NULL — заказ открыт';
 
 CREATE TABLE IF NOT EXISTS order_items (
     id          SERIAL PRIMARY KEY,
@@ -73,3 +101,80 @@ CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
 CREATE INDEX IF NOT EXISTS idx_order_items_nomenclature_id ON order_items (nomenclature_id);
 
 COMMENT ON TABLE order_items IS 'Позиция заказа: номенклатура и количество; один товар в заказе — одна строка';
+
+-- Удержания остатка открытыми заказами до expires_at: доступно = остаток − активные удержания
+-- других заказов; оформление удаляет удержания заказа, истёкшие — фоновая очистка.
+-- shard — шард остатка шардированного товара, за которым записано удержание (иначе 0)
+CREATE TABLE IF NOT EXISTS stock_holds (
+    order_id        INTEGER NOT NULL REFERENCES orders (id) ON DELETE CASCADE,
+    nomenclature_id INTEGER NOT NULL REFERENCES nomenclature (id) ON DELETE CASCADE,
+    shard           SMALLINT NOT NULL DEFAULT 0,
+    quantity        NUMERIC(18, 4) NOT NULL,
+    expires_at      TIMESTAMP NOT NULL,
+    PRIMARY KEY (order_id, nomenclature_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_stock_holds_nomenclature_shard_expires ON stock_holds (nomenclature_id, shard, expires_at) INCLUDE (quantity);
+CREATE INDEX IF NOT EXISTS ix_stock_holds_expires_at ON stock_holds (expires_at);
+
+COMMENT ON TABLE stock_holds IS 'Удержание остатка позицией открытого заказа (STOCK_HOLD_TTL_SECONDS)';
+
+-- ---------------------------------------------------------------------------
+-- Архив заказов: оформленные заказы старше ORDER_ARCHIVE_AFTER_DAYS
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS orders_archive (
+    id             INTEGER PRIMARY KEY,
+    client_id      INTEGER NULL,
+    created_at     TIMESTAMP NOT NULL,
+    checked_out_at TIMESTAMP NULL,
+    archived_at    TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_orders_archive_client_id ON orders_archive (client_id);
+
+CREATE TABLE IF NOT EXISTS order_items_archive (
+    order_id        INTEGER NOT NULL REFERENCES orders_archive (id) ON DELETE CASCADE,
+    nomenclature_id INTEGER NOT NULL,
+    id              INTEGER NOT NULL,
+    quantity        NUMERIC(18, 4) NOT NULL,
+    PRIMARY KEY (order_id, nomenclature_id)
+);
+
+COMMENT ON TABLE orders_archive IS 'Архивные заказы (перенесены из orders, ID сохранены)';
+COMMENT ON TABLE order_items_archive IS 'Позиции архивных заказов; без ссылки на номенклатуру';
+
+-- ---------------------------------------------------------------------------
+-- Версии каталога: счётчик (одна строка) и надгробия удалённых строк
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS catalog_state (
+    id      INTEGER PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO catalog_state (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS catalog_tombstones (
+    id             SERIAL PRIMARY KEY,
+    table_name     VARCHAR(32) NOT NULL,
+    entity_id      INTEGER NOT NULL,
+    change_version BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_catalog_tombstones_change_version ON catalog_tombstones (change_version);
+
+COMMENT ON TABLE catalog_state IS 'Счётчик версий каталога; увеличивается один раз на транзакцию с изменениями';
+COMMENT ON TABLE catalog_tombstones IS 'Удалённые строки каталога для ленты изменений';
+
+-- ---------------------------------------------------------------------------
+-- Версия схемы (одна строка); должна совпадать с database.migrations.SCHEMA_VERSION
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS schema_version (
+    id             INTEGER PRIMARY KEY,
+    version        INTEGER NOT NULL,
+    scaled_numbers BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+INSERT INTO schema_version (id, version) VALUES (1, 5) ON CONFLICT (id) DO NOTHING;
+
+COMMENT ON TABLE schema_version IS 'Версия схемы БД; записывается scripts/migrate.py, проверяется при старте';
+COMMENT ON COLUMN schema_version.scaled_numbers IS 'Цены и количества хранятся BIGINT (× 100 / × 10^4) вместо NUMERIC — STORAGE_SCALED_NUMBERS';
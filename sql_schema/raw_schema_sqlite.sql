@@ -7,11 +7,13 @@
 CREATE TABLE IF NOT EXISTS categories (
     id          INTEGER PRIMARY KEY AUTOINCREMENT,
     name        VARCHAR(255) NOT NULL,
-    parent_id   INTEGER NULL REFERENCES categories (id) ON DELETE SET NULL
+    parent_id   INTEGER NULL REFERENCES categories (id) ON DELETE SET NULL,
+    change_version BIGINT NOT NULL DEFAULT 0
 );
 
 CREATE INDEX IF NOT EXISTS idx_categories_name ON categories (name);
 CREATE INDEX IF NOT EXISTS idx_categories_parent_id ON categories (parent_id);
+CREATE INDEX IF NOT EXISTS idx_categories_change_version ON categories (change_version);
 
 -- ---------------------------------------------------------------------------
 -- Номенклатура (наименование, количество, цена)
@@ -21,11 +23,54 @@ CREATE TABLE IF NOT EXISTS nomenclature (
     name        VARCHAR(512) NOT NULL,
     quantity    NUMERIC(18, 4) NOT NULL DEFAULT 0,
     price       NUMERIC(18, 2) NOT NULL,
-    category_id INTEGER NULL REFERENCES categories (id) ON DELETE SET NULL
+    category_id INTEGER NULL REFERENCES categories (id) ON DELETE SET NULL,
+    change_version BIGINT NOT NULL DEFAULT 0,
+    stock_shards SMALLINT NOT NULL DEFAULT 0
 );
 
 CREATE INDEX IF NOT EXISTS idx_nomenclature_name ON nomenclature (name);
-CREATE INDEX IF NOT EXISTS idx_nomenclature_category_id ON nomenclature (category_id);
+-- Витрина: категория + цена (keyset по (price, id)); префикс заменяет индекс по category_id
+CREATE INDEX IF NOT EXISTS idx_nomenclature_category_price_id ON nomenclature (category_id, price, id);
+CREATE INDEX IF NOT EXISTS idx_nomenclature_price_id ON nomenclature (price, id);
+CREATE INDEX IF NOT EXISTS idx_nomenclature_in_stock_price_id ON nomenclature (price, id) WHERE quantity > 0;
+CREATE INDEX IF NOT EXISTS idx_nomenclature_change_version ON nomenclature (change_version);
+
+-- Шарды остатка товаров с горячей конкуренцией: остаток = сумма шардов
+-- (nomenclature.stock_shards > 0); services/stock_shards.py
+CREATE TABLE IF NOT EXISTS nomenclature_stock_shards (
+    nomenclature_id INTEGER NOT NULL REFERENCES nomenclature (id) ON DELETE CASCADE,
+    shard           SMALLINT NOT NULL,
+    quantity        NUMERIC(18, 4) NOT NULL DEFAULT 0,
+    PRIMARY KEY (nomenclature_id, shard),
+    CONSTRAINT check_stock_shard_quantity_non_negative CHECK (quantity >= 0)
+);
+
+-- Полнотекстовый поиск по наименованию: FTS5 поверх nomenclature, синхронизация триггерами
+-- («ё» приводится к «е»; prefix — индексы коротких префиксов для typeahead)
+CREATE VIRTUAL TABLE IF NOT EXISTS nomenclature_fts USING fts5(
+    name,
+    content='nomenclature',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS nomenclature_fts_ai AFTER INSERT ON nomenclature BEGIN
+    INSERT INTO nomenclature_fts (rowid, name)
+    VALUES (new.id, replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS nomenclature_fts_ad AFTER DELETE ON nomenclature BEGIN
+    INSERT INTO nomenclature_fts (nomenclature_fts, rowid, name)
+    VALUES ('delete', old.id, replace(replace(old.name, 'ё', 'е'), 'Ё', 'Е'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS nomenclature_fts_au AFTER UPDATE OF name ON nomenclature BEGIN
+    INSERT INTO nomenclature_fts (nomenclature_fts, rowid, name)
+    VALUES ('delete', old.id, replace(replace(old.name, 'ё', 'е'), 'Ё', 'Е'));
+    INSERT INTO nomenclature_fts (rowid, name)
+    VALUES (new.id, replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е'));
+END;
 
 -- ---------------------------------------------------------------------------
 -- Клиенты (наименование, адрес) — ТЗ 1.3
@@ -43,10 +88,13 @@ CREATE INDEX IF NOT EXISTS idx_clients_name ON clients (name);
 -- ---------------------------------------------------------------------------
 CREATE TABLE IF NOT EXISTS orders (
     id        INTEGER PRIMARY KEY AUTOINCREMENT,
-    client_id INTEGER NULL REFERENCES clients (id) ON DELETE SET NULL
+    client_id INTEGER NULL REFERENCES clients (id) ON DELETE SET NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    checked_out_at DATETIME NULL
 );
 
 CREATE INDEX IF NOT EXISTS idx_orders_client_id ON orders (client_id);
+CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at);
 
 CREATE TABLE IF NOT EXISTS order_items (
     id             INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -58,3 +106,69 @@ CREATE TABLE IF NOT EXISTS order_items (
 
 CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
 CREATE INDEX IF NOT EXISTS idx_order_items_nomenclature_id ON order_items (nomenclature_id);
+
+-- Удержания остатка открытыми заказами до expires_at: доступно = остаток − активные удержания
+-- других заказов; оформление удаляет удержания заказа, истёкшие — фоновая очистка.
+-- shard — шард остатка шардированного товара, за которым записано удержание (иначе 0)
+CREATE TABLE IF NOT EXISTS stock_holds (
+    order_id        INTEGER NOT NULL REFERENCES orders (id) ON DELETE CASCADE,
+    nomenclature_id INTEGER NOT NULL REFERENCES nomenclature (id) ON DELETE CASCADE,
+    shard           SMALLINT NOT NULL DEFAULT 0,
+    quantity        NUMERIC(18, 4) NOT NULL,
+    expires_at      DATETIME NOT NULL,
+    PRIMARY KEY (order_id, nomenclature_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_stock_holds_nomenclature_shard_expires ON stock_holds (nomenclature_id, shard, expires_at);
+CREATE INDEX IF NOT EXISTS ix_stock_holds_expires_at ON stock_holds (expires_at);
+
+-- ---------------------------------------------------------------------------
+-- Архив заказов: оформленные заказы старше ORDER_ARCHIVE_AFTER_DAYS
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS orders_archive (
+    id             INTEGER PRIMARY KEY,
+    client_id      INTEGER NULL,
+    created_at     DATETIME NOT NULL,
+    checked_out_at DATETIME NULL,
+    archived_at    DATETIME NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_orders_archive_client_id ON orders_archive (client_id);
+
+CREATE TABLE IF NOT EXISTS order_items_archive (
+    order_id        INTEGER NOT NULL REFERENCES orders_archive (id) ON DELETE CASCADE,
+    nomenclature_id INTEGER NOT NULL,
+    id              INTEGER NOT NULL,
+    quantity        NUMERIC(18, 4) NOT NULL,
+    PRIMARY KEY (order_id, nomenclature_id)
+);
+
+-- ---------------------------------------------------------------------------
+-- Версии каталога: счётчик (одна строка) и надгробия удалённых строк
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS catalog_state (
+    id      INTEGER PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO catalog_state (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS catalog_tombstones (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name     VARCHAR(32) NOT NULL,
+    entity_id      INTEGER NOT NULL,
+    change_version BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_catalog_tombstones_change_version ON catalog_tombstones (change_version);
+
+-- ---------------------------------------------------------------------------
+-- Версия схемы (одна строка); должна совпадать с database.migrations.SCHEMA_VERSION
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS schema_version (
+    id             INTEGER PRIMARY KEY,
+    version        INTEGER NOT NULL,
+    scaled_numbers BOOLEAN NOT NULL DEFAULT 0
+);
+
+INSERT INTO schema_version (id, version) VALUES (1, 5) ON CONFLICT (id) DO NOTHING;
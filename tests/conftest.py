@@ -7,8 +7,11 @@ from typing import Any
 import sys
 
 import pytest
+import pytest_asyncio
 from fastapi import FastAPI
 from httpx import AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
 
 # Обеспечиваем, что корень проекта (где лежит main.py) есть в sys.path
@@ -16,6 +19,8 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+from database.base import Base
+from database.migrations import migrate
 from main import app as fastapi_app
 
 
@@ -40,3 +45,20 @@ async def async_client(app: FastAPI) -> AsyncGenerator[AsyncClient, Any]:
     """HTTP-клиент для интеграционных/API-тестов."""
     async with AsyncClient(app=app, base_url="http://testserver") as client:
         yield client
+
+
+@pytest_asyncio.fixture
+async def migrated_sqlite(tmp_path: Path) -> AsyncGenerator[AsyncEngine, None]:
+    """Async-движок на временном SQLite-файле со схемой последней версии (migrate())."""
+    path = tmp_path / "test.db"
+    migrate(f"sqlite:///{path}")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield engine
+    await engine.dispose()
+
+
+async def seed(engine: AsyncEngine, rows: dict[type[Base], list[dict]]) -> None:
+    """Вставить строки моделей (в порядке ключей — с учётом внешних ключей) одной транзакцией."""
+    async with engine.begin() as conn:
+        for model, values in rows.items():
+            await conn.execute(insert(model), values)
@@ -0,0 +1,119 @@
+"""Тесты допуска запросов: лимит, очередь, отказы 429/503 и маршруты."""
+
+import asyncio
+
+import pytest
+from fastapi.routing import APIRoute
+
+from api.admission import admit_read, admit_write
+from database.db_helper import db_helper
+from exceptions import AdmissionRejectedError
+from main import app
+from services.admission import AdmissionLimiter
+
+
+def _limiter(limit: int = 1, max_queue: int = 1, queue_timeout: float = 1.0) -> AdmissionLimiter:
+    return AdmissionLimiter("write", limit, max_queue, queue_timeout, retry_after=2)
+
+
+@pytest.mark.asyncio
+async def test_queue_full_rejected_with_429() -> None:
+    limiter = _limiter()
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 1
+
+    with pytest.raises(AdmissionRejectedError) as exc_info:
+        await limiter.acquire()
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.retry_after == 2
+
+    limiter.release()
+    await waiter
+    assert limiter.in_flight == 1
+    assert limiter.queue_depth == 0
+    limiter.release()
+    assert limiter.stats()["rejected_queue_full"] == 1
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_rejected_with_503() -> None:
+    limiter = _limiter(queue_timeout=0.01)
+    await limiter.acquire()
+    with pytest.raises(AdmissionRejectedError) as exc_info:
+        await limiter.acquire()
+    assert exc_info.value.status_code == 503
+    assert limiter.queue_depth == 0
+
+    limiter.release()
+    assert limiter.in_flight == 0
+    assert limiter.stats()["rejected_timeout"] == 1
+
+
+@pytest.mark.asyncio
+async def test_slots_handed_over_in_fifo_order() -> None:
+    limiter = _limiter(max_queue=4)
+    await limiter.acquire()
+    order: list[int] = []
+
+    async def worker(n: int) -> None:
+        await limiter.acquire()
+        order.append(n)
+        limiter.release()
+
+    tasks = [asyncio.create_task(worker(n)) for n in range(3)]
+    await asyncio.sleep(0)
+    # Новый запрос не обгоняет очередь, даже если слот освобождается
+    cancelled = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    limiter.release()
+    await asyncio.gather(*tasks)
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert order == [0, 1, 2]
+    assert limiter.in_flight == 0
+    assert limiter.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_released_in_same_tick_passes_slot_on() -> None:
+    limiter = _limiter(max_queue=2)
+    await limiter.acquire()
+    first = asyncio.create_task(limiter.acquire())
+    second = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 2
+
+    # Отмена и release() до того, как отменённый ожидающий возобновится
+    first.cancel()
+    limiter.release()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    await second
+    assert limiter.in_flight == 1
+    assert limiter.queue_depth == 0
+
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_disabled_limiter_admits_everything() -> None:
+    limiter = _limiter(limit=0, max_queue=0)
+    for _ in range(10):
+        await limiter.acquire()
+    assert limiter.in_flight == 0
+
+
+def test_db_routes_have_admission_budget() -> None:
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        calls = {dependency.call for dependency in route.dependant.dependencies}
+        if db_helper.get_session in calls:
+            assert admit_write in calls, route.path
+        if db_helper.get_read_session in calls:
+            assert admit_read in calls, route.path
@@ -0,0 +1,87 @@
+"""Unit-тесты ленты изменений каталога."""
+
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.catalog_service import get_catalog_changes
+
+
+@pytest.fixture()
+def session() -> AsyncSession:
+    return MagicMock(spec=AsyncSession)
+
+
+class FakeNomenclature:
+    def __init__(self, id: int, change_version: int):
+        self.id = id
+        self.name = f"Товар {id}"
+        self.quantity = Decimal("1")
+        self.price = Decimal("10")
+        self.category_id = None
+        self.change_version = change_version
+
+
+class FakeTombstone:
+    def __init__(self, entity_id: int, change_version: int):
+        self.table_name = "categories"
+        self.entity_id = entity_id
+        self.change_version = change_version
+
+
+def mock_repo(repo_cls: MagicMock, current: int, nomenclature: list, tombstones: list) -> MagicMock:
+    repo = repo_cls.return_value
+    repo.get_version = AsyncMock(return_value=current)
+    repo.get_changed_categories = AsyncMock(return_value=[])
+    repo.get_changed_nomenclature = AsyncMock(return_value=nomenclature)
+    repo.get_tombstones = AsyncMock(return_value=tombstones)
+    return repo
+
+
+@pytest.mark.asyncio
+async def test_changes_within_limit_return_current_version(session: AsyncSession) -> None:
+    """Если изменений не больше limit — отдаются все, отметка равна текущей версии."""
+    with patch("services.catalog_service.CatalogRepository") as repo_cls:
+        repo = mock_repo(repo_cls, 5, [FakeNomenclature(1, 4)], [FakeTombstone(7, 5)])
+
+        result = await get_catalog_changes(session, since=3, limit=10)
+
+        repo.get_changed_nomenclature.assert_awaited_once_with(3, 5, 11)
+        assert result.version == 5
+        assert not result.has_more
+        assert [n.id for n in result.nomenclature] == [1]
+        assert [(d.table, d.id) for d in result.deleted] == [("categories", 7)]
+
+
+@pytest.mark.asyncio
+async def test_truncated_page_stops_before_split_version(session: AsyncSession) -> None:
+    """Страница обрезается по границе версии, чтобы версия не делилась."""
+    rows = [FakeNomenclature(1, 2), FakeNomenclature(2, 3), FakeNomenclature(3, 3)]
+    with patch("services.catalog_service.CatalogRepository") as repo_cls:
+        mock_repo(repo_cls, 9, rows, [])
+
+        result = await get_catalog_changes(session, since=0, limit=2)
+
+        assert result.version == 2
+        assert result.has_more
+        assert [n.id for n in result.nomenclature] == [1]
+
+
+@pytest.mark.asyncio
+async def test_single_version_larger_than_limit_is_returned_whole(
+    session: AsyncSession,
+) -> None:
+    """Если одна версия больше limit строк — она дочитывается и отдаётся целиком."""
+    page = [FakeNomenclature(1, 4), FakeNomenclature(2, 4)]
+    whole = page + [FakeNomenclature(3, 4)]
+    with patch("services.catalog_service.CatalogRepository") as repo_cls:
+        repo = mock_repo(repo_cls, 6, page, [])
+        repo.get_changed_nomenclature = AsyncMock(side_effect=[page, whole])
+
+        result = await get_catalog_changes(session, since=3, limit=1)
+
+        assert result.version == 4
+        assert result.has_more
+        assert [n.id for n in result.nomenclature] == [1, 2, 3]
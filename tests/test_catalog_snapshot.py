@@ -0,0 +1,114 @@
+"""Тесты общего снимка каталога (сборка, отображение, подмена файла)."""
+
+from collections.abc import AsyncGenerator
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from database.base import Base
+from database.models import Category, Nomenclature
+from repositories import CatalogRepository, CategoryRepository
+from services.catalog_snapshot import (
+    CatalogSnapshotManager,
+    MappedSnapshot,
+    build_snapshot,
+    write_snapshot,
+)
+
+
+@pytest_asyncio.fixture()
+async def session_factory() -> AsyncGenerator[async_sessionmaker[AsyncSession], None]:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Category),
+            [
+                {"id": 1, "name": "Техника", "parent_id": None},
+                {"id": 2, "name": "Ноутбуки", "parent_id": 1},
+                {"id": 3, "name": "Аксессуары", "parent_id": 1},
+            ],
+        )
+        await conn.execute(
+            insert(Nomenclature),
+            [
+                {"id": 10, "name": "Ноутбук «Ёж»", "quantity": Decimal("2.5"),
+                 "price": Decimal("65000.99"), "category_id": 2},
+                {"id": 4, "name": "Мышь", "quantity": 0, "price": 700, "category_id": 3},
+                {"id": 7, "name": "Без категории", "quantity": 1, "price": 1, "category_id": None},
+            ],
+        )
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_round_trip(session_factory, tmp_path: Path) -> None:
+    """Снимок отдаёт те же данные, что и репозитории."""
+    path = str(tmp_path / "catalog.snapshot")
+    async with session_factory() as session:
+        write_snapshot(path, await build_snapshot(session))
+        flat = await CategoryRepository(session).get_all_flat()
+        counts = await CategoryRepository(session).get_nomenclature_counts_by_category()
+
+    snapshot = MappedSnapshot(path)
+    try:
+        record = snapshot.get_nomenclature(10)
+        assert record.name == "Ноутбук «Ёж»"
+        assert (record.price, record.quantity, record.category_id) == (
+            Decimal("65000.99"),
+            Decimal("2.5"),
+            2,
+        )
+        assert snapshot.get_nomenclature(7).category_id is None
+        assert snapshot.get_nomenclature(5) is None
+        assert snapshot.get_nomenclature(99) is None
+        assert [(c.id, c.name, c.parent_id) for c in snapshot.categories()] == [
+            (c.id, c.name, c.parent_id) for c in flat
+        ]
+        assert snapshot.nomenclature_counts_by_category() == counts
+    finally:
+        snapshot.close()
+
+
+@pytest.mark.asyncio
+async def test_manager_swaps_on_new_version_and_bypasses_own_changes(
+    session_factory, tmp_path: Path
+) -> None:
+    """Владелец пересобирает снимок при росте версии; свои изменения читаются мимо снимка."""
+    path = str(tmp_path / "catalog.snapshot")
+    builder = CatalogSnapshotManager(path, poll_seconds=60)
+    reader = CatalogSnapshotManager(path, poll_seconds=60)
+
+    with patch("services.catalog_snapshot.db_helper") as helper:
+        helper.session_factory = session_factory
+        await builder.poll()
+        await reader.poll()
+        assert builder.is_builder and not reader.is_builder
+        assert reader.version == 0
+
+        async with session_factory() as session:
+            await session.execute(
+                update(Nomenclature).where(Nomenclature.id == 4).values(price=900)
+            )
+            await CatalogRepository(session).next_version()
+            await session.commit()
+        reader.on_commit({"nomenclature": {4}})
+        assert list(reader.get_many([4, 10], 0)) == [10]
+        # Снимок старше версии каталога (изменение другого воркера) — мимо снимка
+        assert builder.get_many([4, 10], 1) == {}
+
+        await builder.poll()
+        reader.refresh()
+        assert reader.version == 1
+        assert reader.get_many([4], 1)[4].price == Decimal("900.00")
+        assert reader.current_for(1) is not None
+        assert reader.current_for(0) is None
+
+    await reader.stop()
+    await builder.stop()
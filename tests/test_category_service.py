@@ -3,10 +3,21 @@
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from sqlalchemy.ext.asyncio import AsyncSession
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from database.commit_hooks import discard_changes
+from database.models import CatalogTombstone, Category, Nomenclature
+from exceptions import CategoryNotFoundError, CategoryTreeConflictError
 from schemas.category import CategoryResponse, CategoryTreeItem
-from services.category_service import get_category_tree, list_categories
+from services.category_service import (
+    delete_category,
+    get_category_tree,
+    list_categories,
+    move_category,
+)
+from tests.conftest import seed
 
 
 @pytest.fixture()
@@ -72,3 +83,105 @@ async def test_get_category_tree_builds_recursive_tree(session: AsyncSession) ->
         assert child_node.id == 2
         assert child_node.item_count == 2
 
+
+@pytest_asyncio.fixture
+async def tree(migrated_sqlite) -> async_sessionmaker[AsyncSession]:
+    """
+    Дерево на SQLite-файле:
+
+        1 ─ 2 ─ 4 ─ 5
+        │   └ 6
+        └ 3
+        7
+
+    Товары: 10 в 2, 11 в 4, 12 в 5, 13 в 3.
+    """
+    await seed(
+        migrated_sqlite,
+        {
+            Category: [
+                {"id": id, "name": f"c{id}", "parent_id": parent_id}
+                for id, parent_id in [(1, None), (2, 1), (3, 1), (4, 2), (5, 4), (6, 2), (7, None)]
+            ],
+            Nomenclature: [
+                {"id": id, "name": f"n{id}", "price": 1, "quantity": 1, "category_id": category_id}
+                for id, category_id in [(10, 2), (11, 4), (12, 5), (13, 3)]
+            ],
+        },
+    )
+    return async_sessionmaker(migrated_sqlite, expire_on_commit=False)
+
+
+async def _state(factory) -> tuple[dict[int, int | None], dict[int, int | None], list[int]]:
+    async with factory() as session:
+        parents = dict((await session.execute(select(Category.id, Category.parent_id))).all())
+        items = dict((await session.execute(select(Nomenclature.id, Nomenclature.category_id))).all())
+        tombstones = sorted(
+            (await session.scalars(
+                select(CatalogTombstone.entity_id).where(CatalogTombstone.table_name == "categories")
+            )).all()
+        )
+    return parents, items, tombstones
+
+
+@pytest.mark.asyncio
+async def test_move_category_reparents_subtree_and_rejects_cycles(tree) -> None:
+    async with tree.begin() as session:
+        moved = await move_category(session, 4, 7)
+        discard_changes(session)
+
+    assert moved == CategoryResponse(id=4, name="c4", parent_id=7)
+    parents, items, _ = await _state(tree)
+    assert parents[4] == 7 and parents[5] == 4
+    assert items[11] == 4
+
+    async with tree() as session:
+        for parent_id in (4, 5):
+            with pytest.raises(CategoryTreeConflictError):
+                await move_category(session, 4, parent_id)
+        with pytest.raises(CategoryNotFoundError):
+            await move_category(session, 4, 99)
+        with pytest.raises(CategoryNotFoundError):
+            await move_category(session, 99, None)
+        assert (await move_category(session, 4, None)).parent_id is None
+        await session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_delete_category_reattaches_children_and_moves_items_to_parent(tree) -> None:
+    async with tree.begin() as session:
+        result = await delete_category(session, 2)
+        discard_changes(session)
+
+    assert (result.deleted, result.reattached, result.moved_nomenclature) == (1, 2, 1)
+    assert result.items_moved_to == 1
+    parents, items, tombstones = await _state(tree)
+    assert 2 not in parents and parents[4] == 1 and parents[6] == 1
+    assert items == {10: 1, 11: 4, 12: 5, 13: 3}
+    assert tombstones == [2]
+
+
+@pytest.mark.asyncio
+async def test_delete_category_cascade_removes_subtree_in_bulk(tree) -> None:
+    async with tree() as session:
+        with pytest.raises(CategoryTreeConflictError):
+            await delete_category(session, 2, cascade=True, move_items_to=5)
+        await session.rollback()
+
+    async with tree.begin() as session:
+        result = await delete_category(session, 2, cascade=True, move_items_to=3)
+        discard_changes(session)
+
+    assert (result.deleted, result.reattached, result.moved_nomenclature) == (4, 0, 3)
+    parents, items, tombstones = await _state(tree)
+    assert parents == {1: None, 3: 1, 7: None}
+    assert items == {10: 3, 11: 3, 12: 3, 13: 3}
+    assert tombstones == [2, 4, 5, 6]
+
+    # Корень: товары остаются без категории
+    async with tree.begin() as session:
+        result = await delete_category(session, 1, cascade=True)
+        discard_changes(session)
+    parents, items, _ = await _state(tree)
+    assert result.items_moved_to is None and parents == {7: None}
+    assert set(items.values()) == {None}
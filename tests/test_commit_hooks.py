@@ -0,0 +1,67 @@
+"""Unit-тесты хуков изменений каталога после commit."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from database.commit_hooks import (
+    discard_changes,
+    on_close,
+    register_commit_hook,
+    run_close_callbacks,
+    run_commit_hooks,
+    track_changes,
+    unregister_commit_hook,
+)
+
+
+def make_session() -> MagicMock:
+    session = MagicMock()
+    session.info = {}
+    return session
+
+
+@pytest.mark.asyncio
+async def test_hooks_receive_accumulated_changes_once() -> None:
+    """Изменения нескольких вызовов track_changes доставляются хуку одним вызовом."""
+    session = make_session()
+    hook = AsyncMock()
+    register_commit_hook(hook)
+    try:
+        track_changes(session, "nomenclature", [1, 2])
+        track_changes(session, "nomenclature", [2, 3])
+        await run_commit_hooks(session)
+        await run_commit_hooks(session)
+    finally:
+        unregister_commit_hook(hook)
+
+    hook.assert_awaited_once_with({"nomenclature": {1, 2, 3}})
+
+
+@pytest.mark.asyncio
+async def test_discarded_changes_do_not_reach_hooks() -> None:
+    """После rollback (discard_changes) хуки не вызываются."""
+    session = make_session()
+    hook = MagicMock()
+    register_commit_hook(hook)
+    try:
+        track_changes(session, "nomenclature", [1])
+        discard_changes(session)
+        await run_commit_hooks(session)
+    finally:
+        unregister_commit_hook(hook)
+
+    hook.assert_not_called()
+
+
+def test_close_callbacks_run_once() -> None:
+    """Колбэки закрытия сессии вызываются один раз; ошибка одного не мешает остальным."""
+    session = make_session()
+    calls = []
+    on_close(session, lambda: calls.append(1))
+    on_close(session, MagicMock(side_effect=RuntimeError("boom")))
+    on_close(session, lambda: calls.append(2))
+
+    run_close_callbacks(session)
+    run_close_callbacks(session)
+    assert calls == [1, 2]
@@ -0,0 +1,70 @@
+"""Unit-тесты условных GET каталога (ETag / 304 / готовые сжатые тела)."""
+
+import gzip
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.conditional import catalog_response_cache, conditional_catalog_response
+
+
+def make_request(**headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+        }
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> None:
+    catalog_response_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_matching_etag_returns_304_without_producing_body() -> None:
+    """Совпавший If-None-Match — 304, данные каталога не читаются."""
+    session = MagicMock(spec=AsyncSession)
+    produce = AsyncMock()
+
+    with patch("api.conditional.CatalogRepository") as repo_cls:
+        repo_cls.return_value.get_version = AsyncMock(return_value=4)
+        response = await conditional_catalog_response(
+            make_request(if_none_match='W/"nomenclature-4"'),
+            session,
+            "nomenclature",
+            list[int],
+            produce,
+        )
+
+    assert response.status_code == 304
+    produce.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_body_is_built_once_per_version_and_precompressed() -> None:
+    """Тело строится один раз на версию; большие ответы отдаются сжатыми."""
+    session = MagicMock(spec=AsyncSession)
+    produce = AsyncMock(return_value=list(range(1000)))
+
+    with patch("api.conditional.CatalogRepository") as repo_cls:
+        repo_cls.return_value.get_version = AsyncMock(return_value=1)
+        first = await conditional_catalog_response(
+            make_request(accept_encoding="gzip"), session, "k", list[int], produce
+        )
+        second = await conditional_catalog_response(
+            make_request(), session, "k", list[int], produce
+        )
+        repo_cls.return_value.get_version = AsyncMock(return_value=2)
+        await conditional_catalog_response(make_request(), session, "k", list[int], produce)
+
+    assert produce.await_count == 2
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"] == 'W/"k-1"'
+    assert gzip.decompress(first.body) == second.body
+    assert "content-encoding" not in second.headers
@@ -0,0 +1,67 @@
+"""Тесты DatabaseHelper: прогрев пула, ожидание транзакций и сессии чтения."""
+
+from pathlib import Path
+
+import pytest
+from fastapi.routing import APIRoute
+from sqlalchemy import select, text
+from sqlalchemy.exc import InvalidRequestError, OperationalError
+
+from database.db_helper import DatabaseHelper, db_helper
+from database.models import Base, Category
+from main import app
+from settings.config import RunConfig
+
+
+@pytest.mark.asyncio
+async def test_wait_idle_waits_for_open_sessions(tmp_path: Path) -> None:
+    helper = DatabaseHelper(f"sqlite:///{tmp_path / 'test.db'}")
+    await helper.warm_pool()
+
+    sessions = helper.get_session()
+    await anext(sessions)
+    assert helper.active_sessions == 1
+    assert await helper.wait_idle(0.01) is False
+
+    with pytest.raises(StopAsyncIteration):
+        await anext(sessions)
+    assert helper.active_sessions == 0
+    assert await helper.wait_idle(0.01) is True
+    await helper.dispose()
+
+
+def test_run_config_defaults_workers_to_cpu_count() -> None:
+    run = RunConfig(mode="prod", max_requests=0)
+    assert run.workers >= 1
+    assert run.max_requests is None
+    assert RunConfig(workers=3).workers == 3
+
+
+@pytest.mark.asyncio
+async def test_read_session_rejects_writes(tmp_path: Path) -> None:
+    helper = DatabaseHelper(f"sqlite:///{tmp_path / 'test.db'}")
+    async with helper.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text("INSERT INTO categories (id, name) VALUES (1, 'Овощи')"))
+
+    sessions = helper.get_read_session()
+    session = await anext(sessions)
+    assert (await session.execute(select(Category.name))).scalars().all() == ["Овощи"]
+    with pytest.raises(OperationalError, match="readonly"):
+        await session.execute(text("DELETE FROM categories"))
+
+    session.add(Category(name="Фрукты"))
+    with pytest.raises(InvalidRequestError):
+        await session.flush()
+    with pytest.raises(StopAsyncIteration):
+        await anext(sessions)
+    assert helper.active_sessions == 0
+    await helper.dispose()
+
+
+def test_get_routes_use_read_session() -> None:
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or "GET" not in route.methods:
+            continue
+        calls = {dependency.call for dependency in route.dependant.dependencies}
+        assert db_helper.get_session not in calls, route.path
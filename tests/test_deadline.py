@@ -0,0 +1,105 @@
+"""Тесты сроков запросов: прерывание запроса SQLite, 504 и разбор заголовка."""
+
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from api.deadline import DEADLINE_HEADER, _route_deadline
+from database.db_helper import DatabaseHelper
+from database.deadline import _pg_before_execute, deadline_scope
+from exceptions import DeadlineExceededError
+from settings.config import settings
+
+# Счёт до 10^9 рекурсивным CTE — заведомо дольше срока теста
+SLOW_QUERY = text(
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000000000) "
+    "SELECT count(*) FROM n"
+)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("read", [False, True])
+async def test_slow_query_interrupted_and_connection_reused(tmp_path: Path, read: bool) -> None:
+    helper = DatabaseHelper(f"sqlite:///{tmp_path / 'test.db'}")
+    factory = helper.read_session_factory if read else helper.session_factory
+
+    started = asyncio.get_running_loop().time()
+    with deadline_scope(0.05):
+        async with factory() as session:
+            with pytest.raises(DeadlineExceededError):
+                await session.execute(SLOW_QUERY)
+    assert asyncio.get_running_loop().time() - started < 2
+
+    # То же соединение из пула (pool_size 1) работает без срока
+    async with factory() as session:
+        assert (await session.execute(text("SELECT 1"))).scalar() == 1
+    await helper.dispose()
+
+
+@pytest.mark.asyncio
+async def test_expired_deadline_skips_query(tmp_path: Path) -> None:
+    helper = DatabaseHelper(f"sqlite:///{tmp_path / 'test.db'}")
+    with deadline_scope(0.0):
+        async with helper.read_session_factory() as session:
+            with pytest.raises(DeadlineExceededError):
+                await session.execute(text("SELECT 1"))
+    await helper.dispose()
+
+
+class _Cursor:
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    def execute(self, statement: str) -> None:
+        self.statements.append(statement)
+
+
+def test_pg_statement_timeout_follows_remaining_deadline(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Второй запрос того же срока получает меньший statement_timeout, если остаток заметно сократился."""
+    now = [100.0]
+    monkeypatch.setattr("database.deadline.time.monotonic", lambda: now[0])
+    conn, cursor = SimpleNamespace(info={}), _Cursor()
+
+    def execute() -> None:
+        _pg_before_execute(conn, cursor, "SELECT 1", {}, None, False)
+
+    with deadline_scope(10):
+        execute()
+        now[0] += 0.5  # остаток 9.5 с — в пределах 10%, timeout не меняется
+        execute()
+        now[0] += 3.5
+        execute()
+    execute()
+    execute()
+
+    assert cursor.statements == [
+        "SELECT set_config('statement_timeout', '10000', false)",
+        "SELECT set_config('statement_timeout', '6000', false)",
+        "SELECT set_config('statement_timeout', '0', false)",
+    ]
+
+
+def _request(headers: dict[str, str], name: str = "category_tree_endpoint") -> SimpleNamespace:
+    return SimpleNamespace(scope={"route": SimpleNamespace(name=name)}, headers=headers)
+
+
+def test_route_deadline_from_settings_and_header(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "request_deadline_seconds", 10.0)
+    monkeypatch.setattr(settings, "request_deadlines", {"category_tree_endpoint": 2.0})
+
+    assert _route_deadline(_request({})) == 2.0
+    assert _route_deadline(_request({}, name="other")) == 10.0
+    # Заголовок только сокращает срок
+    assert _route_deadline(_request({DEADLINE_HEADER: "0.5"})) == 0.5
+    assert _route_deadline(_request({DEADLINE_HEADER: "60"})) == 2.0
+    for raw in ("abc", "0", "-1", "inf", "Infinity", "nan"):
+        with pytest.raises(HTTPException) as exc_info:
+            _route_deadline(_request({DEADLINE_HEADER: raw}))
+        assert exc_info.value.status_code == 400
+
+    monkeypatch.setattr(settings, "request_deadline_seconds", 0.0)
+    assert _route_deadline(_request({}, name="other")) is None
@@ -0,0 +1,102 @@
+"""Советчик по индексам: разбор планов SQLite, кандидаты, проверка внутри SAVEPOINT."""
+
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from database.index_advisor import (
+    WorkloadRecorder,
+    WorkloadStatement,
+    analyze,
+    candidate_indexes,
+    load_workload,
+    save_workload,
+)
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path: Path) -> AsyncEngine:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/advisor.db")
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, owner_id INTEGER, price INTEGER, quantity INTEGER)"
+        )
+        await conn.exec_driver_sql("CREATE INDEX ix_items_quantity ON items (quantity)")
+        await conn.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 5000) "
+            "INSERT INTO items (owner_id, price, quantity) SELECT i % 100, i % 997, i % 5 FROM n"
+        )
+    yield engine
+    await engine.dispose()
+
+
+def test_candidate_indexes_equality_then_order() -> None:
+    sql = "SELECT items.id FROM items WHERE items.owner_id = ? AND items.quantity > 0 ORDER BY items.price"
+
+    candidates = candidate_indexes(sql, "items", {"items"})
+
+    assert (["owner_id", "price"], None) in candidates
+    assert (["owner_id", "price"], "quantity > 0") in candidates
+
+
+def test_candidate_indexes_resolve_alias() -> None:
+    sql = "SELECT i.id FROM items AS i JOIN owners AS o ON o.id = i.owner_id WHERE i.price >= ?"
+
+    candidates = candidate_indexes(sql, "items", {"items", "owners"})
+
+    assert candidates == [(["price"], None)]
+
+
+@pytest.mark.asyncio
+async def test_analyze_finds_scan_and_proposes_index(engine: AsyncEngine) -> None:
+    workload = [
+        WorkloadStatement("SELECT items.id FROM items WHERE items.owner_id = ? ORDER BY items.price", [7], 10),
+        WorkloadStatement("UPDATE items SET price = ? WHERE items.id = ?", [1, 1], 3),
+    ]
+
+    report = await analyze(engine, workload, repeat=1)
+
+    select_report = report.statements[0]
+    assert {finding.kind for finding in select_report.findings} == {"table_scan", "temp_sort"}
+    assert report.statements[1].time_ms is None
+    assert report.unused_indexes == {"items": ["ix_items_quantity"]}
+    best = report.proposals[0]
+    assert (best.table, best.columns, best.where) == ("items", ["owner_id", "price"], None)
+    assert best.fixed_findings == 2
+    assert best.write_statements == 3
+    # Кандидат откатывается вместе с SAVEPOINT
+    async with engine.connect() as conn:
+        indexes = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_indexes("items"))
+    assert [index["name"] for index in indexes] == ["ix_items_quantity"]
+
+
+@pytest.mark.asyncio
+async def test_analyze_indexed_query_has_no_findings(engine: AsyncEngine) -> None:
+    workload = [WorkloadStatement("SELECT items.id FROM items WHERE items.quantity = ?", [3])]
+
+    report = await analyze(engine, workload, repeat=1)
+
+    assert report.statements[0].findings == []
+    assert report.statements[0].used_indexes == {"ix_items_quantity"}
+    assert report.unused_indexes == {}
+    assert report.proposals == []
+
+
+@pytest.mark.asyncio
+async def test_recorder_counts_repeats_and_roundtrips(engine: AsyncEngine, tmp_path: Path) -> None:
+    with WorkloadRecorder(engine) as recorder:
+        async with engine.connect() as conn:
+            for _ in range(3):
+                await conn.exec_driver_sql("SELECT id FROM items WHERE owner_id = ?", (5,))
+            await conn.exec_driver_sql("PRAGMA table_info(items)")
+    path = tmp_path / "workload.jsonl"
+
+    save_workload(path, recorder.statements)
+    loaded = load_workload(path)
+
+    assert [(s.sql, s.parameters, s.count) for s in loaded] == [
+        ("SELECT id FROM items WHERE owner_id = ?", [5], 3)
+    ]
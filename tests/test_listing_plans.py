@@ -0,0 +1,63 @@
+"""Планы запросов витрины: каждое сочетание фильтров обслуживается индексом."""
+
+import itertools
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Engine, create_engine, insert
+
+from database.base import Base
+from database.models import Category, Nomenclature
+from repositories.nomenclature_repository import listing_query
+
+
+@pytest.fixture(scope="module")
+def engine() -> Engine:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Category),
+            [{"id": i, "name": f"c{i}", "parent_id": (i // 3) or None} for i in range(1, 50)],
+        )
+        conn.execute(
+            insert(Nomenclature),
+            [
+                {"name": f"n{i}", "price": i % 97, "quantity": i % 3, "category_id": i % 49 + 1}
+                for i in range(2000)
+            ],
+        )
+    return engine
+
+
+@pytest.mark.parametrize(
+    "category_id, price_range, in_stock, descending, after",
+    list(
+        itertools.product(
+            [None, 3], [False, True], [False, True], [False, True], [None, (Decimal(20), 5)]
+        )
+    ),
+)
+def test_listing_uses_index(
+    engine: Engine,
+    category_id: int | None,
+    price_range: bool,
+    in_stock: bool,
+    descending: bool,
+    after: tuple[Decimal, int] | None,
+) -> None:
+    stmt = listing_query(
+        category_id=category_id,
+        price_min=Decimal(10) if price_range else None,
+        price_max=Decimal(50) if price_range else None,
+        in_stock=in_stock,
+        descending=descending,
+        after=after,
+    )
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        plan = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+    nomenclature_steps = [step for step in plan if " nomenclature" in step]
+    assert nomenclature_steps, plan
+    assert all("INDEX" in step for step in nomenclature_steps), plan
@@ -0,0 +1,200 @@
+"""Тесты версии схемы и миграций (на временном SQLite-файле)."""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database.base import Base, get_engine
+from database.db_helper import DatabaseHelper, db_helper
+from database.migrations import (
+    SCHEMA_VERSION,
+    SchemaVersionError,
+    check_schema_version,
+    migrate,
+)
+
+# Исходная схема (create_all моделей до появления версий), как в catalog.db
+UNVERSIONED_SCHEMA = (
+    "CREATE TABLE categories (id INTEGER NOT NULL, name VARCHAR(255) NOT NULL, "
+    "parent_id INTEGER, PRIMARY KEY (id), "
+    "FOREIGN KEY(parent_id) REFERENCES categories (id) ON DELETE SET NULL)",
+    "CREATE INDEX ix_categories_parent_id ON categories (parent_id)",
+    "CREATE INDEX ix_categories_name ON categories (name)",
+    "CREATE TABLE clients (id INTEGER NOT NULL, name VARCHAR(255) NOT NULL, "
+    "address VARCHAR(512) NOT NULL, PRIMARY KEY (id))",
+    "CREATE INDEX ix_clients_name ON clients (name)",
+    "CREATE TABLE nomenclature (id INTEGER NOT NULL, name VARCHAR(512) NOT NULL, "
+    "quantity NUMERIC(18, 4) NOT NULL, price NUMERIC(18, 2) NOT NULL, category_id INTEGER, "
+    "PRIMARY KEY (id), "
+    "CONSTRAINT check_nomenclature_quantity_non_negative CHECK (quantity >= 0), "
+    "CONSTRAINT check_nomenclature_price_non_negative CHECK (price >= 0), "
+    "FOREIGN KEY(category_id) REFERENCES categories (id) ON DELETE SET NULL)",
+    "CREATE INDEX ix_nomenclature_category_id ON nomenclature (category_id)",
+    "CREATE INDEX ix_nomenclature_name ON nomenclature (name)",
+    "CREATE TABLE orders (id INTEGER NOT NULL, client_id INTEGER, created_at DATETIME NOT NULL, "
+    "PRIMARY KEY (id), FOREIGN KEY(client_id) REFERENCES clients (id) ON DELETE SET NULL)",
+    "CREATE INDEX ix_orders_created_at ON orders (created_at)",
+    "CREATE INDEX ix_orders_client_id ON orders (client_id)",
+    "CREATE TABLE order_items (id INTEGER NOT NULL, order_id INTEGER NOT NULL, "
+    "nomenclature_id INTEGER NOT NULL, quantity NUMERIC(18, 4) NOT NULL, PRIMARY KEY (id), "
+    "CONSTRAINT uq_order_nomenclature UNIQUE (order_id, nomenclature_id), "
+    "FOREIGN KEY(order_id) REFERENCES orders (id) ON DELETE CASCADE, "
+    "FOREIGN KEY(nomenclature_id) REFERENCES nomenclature (id) ON DELETE CASCADE)",
+    "CREATE INDEX ix_order_items_nomenclature_id ON order_items (nomenclature_id)",
+    "CREATE INDEX ix_order_items_order_id ON order_items (order_id)",
+    "INSERT INTO categories (id, name, parent_id) VALUES (1, 'Бытовая техника', NULL)",
+    "INSERT INTO nomenclature (id, name, quantity, price, category_id) "
+    "VALUES (1, 'Холодильник', 5, 35000, 1), (2, 'Чайник', 3, 1800, 1), "
+    "(3, 'Ёлочная гирлянда', 0, 900, NULL)",
+    "INSERT INTO orders (id, client_id, created_at) VALUES (1, NULL, CURRENT_TIMESTAMP)",
+    "INSERT INTO order_items (order_id, nomenclature_id, quantity) VALUES (1, 1, 2)",
+)
+
+
+def _urls(tmp_path: Path) -> tuple[str, str]:
+    path = tmp_path / "test.db"
+    return f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}"
+
+
+@pytest.mark.asyncio
+async def test_fresh_database_is_created_at_current_version(tmp_path: Path) -> None:
+    url, async_url = _urls(tmp_path)
+    engine = create_async_engine(async_url)
+    with pytest.raises(SchemaVersionError):
+        await check_schema_version(engine)
+
+    assert migrate(url) == (0, SCHEMA_VERSION)
+    assert migrate(url) == (SCHEMA_VERSION, SCHEMA_VERSION)
+    assert await check_schema_version(engine) == SCHEMA_VERSION
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_unversioned_database_is_stamped_and_migrated(tmp_path: Path) -> None:
+    """БД без schema_version считается версией 0; шаги применяются по порядку, начиная с 1."""
+    url, async_url = _urls(tmp_path)
+    engine = get_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE schema_version"))
+
+    applied = []
+
+    def step(version: int):
+        return lambda conn: applied.append((version, inspect(conn).has_table("schema_version")))
+
+    with patch("database.migrations.SCHEMA_VERSION", 2), patch.dict(
+        "database.migrations.MIGRATIONS", {1: step(1), 2: step(2)}
+    ):
+        assert migrate(url) == (0, 2)
+        assert applied == [(1, True), (2, True)]
+        async_engine = create_async_engine(async_url)
+        assert await check_schema_version(async_engine) == 2
+        await async_engine.dispose()
+    engine.dispose()
+
+
+def test_version_1_database_gets_order_archive(tmp_path: Path) -> None:
+    url, _ = _urls(tmp_path)
+    engine = get_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE order_items_archive"))
+        conn.execute(text("DROP TABLE orders_archive"))
+        conn.execute(text("INSERT INTO schema_version (id, version) VALUES (1, 1)"))
+
+    assert migrate(url) == (1, SCHEMA_VERSION)
+    with engine.connect() as conn:
+        assert {"orders_archive", "order_items_archive"} <= set(inspect(conn).get_table_names())
+    engine.dispose()
+
+
+@pytest.fixture()
+def unversioned_url(tmp_path: Path) -> str:
+    url, _ = _urls(tmp_path)
+    engine = get_engine(url)
+    with engine.begin() as conn:
+        for statement in UNVERSIONED_SCHEMA:
+            conn.execute(text(statement))
+    engine.dispose()
+    return url
+
+
+@pytest.mark.asyncio
+async def test_unversioned_schema_is_upgraded_for_api(app, unversioned_url: str) -> None:
+    """Исходная схема без версии доводится до текущей: эндпоинты каталога и заказов работают."""
+    assert migrate(unversioned_url) == (0, SCHEMA_VERSION)
+    engine = get_engine(unversioned_url)
+    with engine.connect() as conn:
+        indexes = {index["name"] for index in inspect(conn).get_indexes("nomenclature")}
+        assert conn.execute(text("SELECT version FROM catalog_state")).scalar() == 0
+    engine.dispose()
+    assert "ix_nomenclature_category_price_id" in indexes
+    assert "ix_nomenclature_category_id" not in indexes
+
+    helper = DatabaseHelper(unversioned_url)
+    app.dependency_overrides[db_helper.get_session] = helper.get_session
+    app.dependency_overrides[db_helper.get_read_session] = helper.get_read_session
+    try:
+        assert await check_schema_version(helper.engine) == SCHEMA_VERSION
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver") as client:
+            listing = await client.get("/api/nomenclature/")
+            tree = await client.get("/api/categories/tree")
+            search = await client.get("/api/nomenclature/search", params={"q": "елоч"})
+            checkout = await client.post("/api/orders/1/checkout")
+            remaining = await client.get("/api/nomenclature/", params={"ids": "1"})
+    finally:
+        app.dependency_overrides.clear()
+        await helper.dispose()
+
+    assert listing.status_code == 200
+    assert [item["name"] for item in listing.json()] == ["Холодильник", "Чайник", "Ёлочная гирлянда"]
+    assert search.status_code == 200
+    assert [item["id"] for item in search.json()["items"]] == [3]
+    assert tree.status_code == 200
+    assert checkout.status_code == 200
+    assert float(remaining.json()[0]["quantity"]) == 3
+
+
+def test_unversioned_schema_is_converted_to_scaled_numbers(unversioned_url: str) -> None:
+    """Данные исходной схемы — NUMERIC: в режиме целых они пересчитываются, а не просто помечаются."""
+    assert migrate(unversioned_url, scaled_numbers=True) == (0, SCHEMA_VERSION)
+    engine = get_engine(unversioned_url)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version, scaled_numbers FROM schema_version")).one() == (
+            SCHEMA_VERSION,
+            1,
+        )
+        assert conn.execute(text("SELECT quantity, price FROM nomenclature ORDER BY id")).all() == [
+            (50000, 3500000),
+            (30000, 180000),
+            (0, 90000),
+        ]
+        assert conn.execute(text("SELECT quantity FROM order_items")).scalar() == 20000
+    engine.dispose()
+
+
+def test_unversioned_schema_gets_autoincrement_ids(unversioned_url: str) -> None:
+    """Миграция 7 пересоздаёт orders и order_items с AUTOINCREMENT, сохраняя строки и индексы."""
+    migrate(unversioned_url)
+    engine = get_engine(unversioned_url)
+    with engine.begin() as conn:
+        ddl = dict(
+            conn.execute(
+                text("SELECT name, sql FROM sqlite_master WHERE name IN ('orders', 'order_items')")
+            ).all()
+        )
+        indexes = {index["name"] for index in inspect(conn).get_indexes("order_items")}
+        assert conn.execute(text("SELECT count(*) FROM order_items WHERE order_id = 1")).scalar() == 1
+        conn.execute(text("DELETE FROM order_items"))
+        conn.execute(text("DELETE FROM orders"))
+        conn.execute(text("INSERT INTO orders (client_id, created_at) VALUES (NULL, CURRENT_TIMESTAMP)"))
+        new_id = conn.execute(text("SELECT max(id) FROM orders")).scalar()
+    engine.dispose()
+    assert all("AUTOINCREMENT" in sql for sql in ddl.values()) and len(ddl) == 2
+    assert {"ix_order_items_nomenclature_id", "ix_order_items_order_id"} <= indexes
+    assert new_id == 2
@@ -0,0 +1,115 @@
+"""Unit-тесты кэша горячей номенклатуры."""
+
+import asyncio
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import pytest
+
+from services.nomenclature_cache import NomenclatureCache, NomenclatureRecord
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def record(id: int, price: int = 10) -> NomenclatureRecord:
+    return NomenclatureRecord(
+        id=id, name=f"Товар {id}", price=Decimal(price), quantity=Decimal(1), category_id=None
+    )
+
+
+def fetcher(prices: dict[int, int]) -> AsyncMock:
+    """fetch, возвращающий записи для существующих ID."""
+    return AsyncMock(side_effect=lambda ids: [record(id, prices[id]) for id in ids if id in prices])
+
+
+@pytest.mark.asyncio
+async def test_read_through_hits_and_ratio() -> None:
+    """Повторное чтение — из кэша; несуществующие ID не кэшируются."""
+    cache = NomenclatureCache(max_size=10, ttl=60)
+    fetch = fetcher({1: 10, 2: 20})
+
+    assert set(await cache.get_many([1, 2, 3], fetch)) == {1, 2}
+    assert set(await cache.get_many([1, 2], fetch)) == {1, 2}
+    fetch.assert_awaited_once_with([1, 2, 3])
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 3, 2)
+    assert stats["hit_ratio"] == pytest.approx(0.4)
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_ttl_expiry() -> None:
+    """Вытесняется давно не читанная запись; после TTL запись перечитывается."""
+    clock = FakeClock()
+    cache = NomenclatureCache(max_size=2, ttl=30, clock=clock)
+    fetch = fetcher({1: 10, 2: 20, 3: 30})
+
+    await cache.get_many([1, 2], fetch)
+    await cache.get_many([1], fetch)
+    await cache.get_many([3], fetch)
+    assert cache.stats()["evictions"] == 1
+    await cache.get_many([1, 3], fetch)
+    assert fetch.await_count == 2
+    await cache.get_many([2], fetch)
+    fetch.assert_awaited_with([2])
+
+    clock.now = 31
+    await cache.get_many([1], fetch)
+    fetch.assert_awaited_with([1])
+
+
+@pytest.mark.asyncio
+async def test_commit_invalidates_and_discards_reads_started_before() -> None:
+    """Хук после commit удаляет запись; чтение, начатое до commit, в кэш не попадает."""
+    cache = NomenclatureCache(max_size=10, ttl=60)
+    prices = {1: 10}
+    await cache.get_many([1], fetcher(prices))
+
+    prices[1] = 99
+    await cache.on_commit({"nomenclature": {1}})
+    assert len(cache) == 0
+
+    async def slow_fetch(ids: list[int]) -> list[NomenclatureRecord]:
+        await cache.on_commit({"nomenclature": {1}})
+        return [record(1, 50)]
+
+    assert (await cache.get_many([1], slow_fetch))[1].price == 50
+    assert len(cache) == 0
+    assert (await cache.get_many([1], fetcher(prices)))[1].price == 99
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate() -> None:
+    """В окне stale запись отдаётся сразу, а в фоне перечитывается один раз."""
+    clock = FakeClock()
+    prices = {1: 10}
+    revalidate = fetcher(prices)
+    cache = NomenclatureCache(max_size=10, ttl=30, stale_ttl=30, revalidate=revalidate, clock=clock)
+    fetch = fetcher(prices)
+    await cache.get_many([1], fetch)
+
+    prices[1] = 20
+    clock.now = 40
+    assert (await cache.get_many([1], fetch))[1].price == 10
+    assert (await cache.get_many([1], fetch))[1].price == 10
+    await asyncio.sleep(0)
+
+    revalidate.assert_awaited_once_with([1])
+    assert (await cache.get_many([1], fetch))[1].price == 20
+    assert fetch.await_count == 1
+    assert cache.stats()["stale_hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_always_fetches() -> None:
+    cache = NomenclatureCache(max_size=0, ttl=60)
+    fetch = fetcher({1: 10})
+    await cache.get_many([1], fetch)
+    await cache.get_many([1], fetch)
+    assert fetch.await_count == 2
@@ -4,10 +4,23 @@ from decimal import Decimal
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from schemas.nomenclature import NomenclatureResponse
-from services.nomenclature_service import list_nomenclature
+from database.db_helper import db_helper
+from exceptions import InvalidCursorError, NomenclatureNotFoundError
+from schemas.nomenclature import NomenclatureResponse, NomenclatureStockUpdate
+from services.nomenclature_cache import NomenclatureCache, NomenclatureRecord
+from services.nomenclature_service import (
+    bulk_update_nomenclature,
+    get_nomenclature,
+    get_nomenclature_batch,
+    list_nomenclature,
+    list_nomenclature_filtered,
+    search_nomenclature,
+    search_terms,
+)
+from settings.config import settings
 
 
 class FakeNomenclature:
@@ -58,3 +71,164 @@ async def test_list_nomenclature_uses_repository_and_maps_to_schema(
         assert result[0].id == 1
         assert result[0].name == "Товар"
 
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_applies_absolute_and_delta_updates_per_chunk(
+    session: AsyncSession,
+) -> None:
+    """Абсолютные значения и дельты применяются одним executemany на пачку."""
+    updates = [
+        NomenclatureStockUpdate(id=1, quantity=Decimal("10")),
+        NomenclatureStockUpdate(id=2, quantity_delta=Decimal("-1"), price=Decimal("5")),
+        NomenclatureStockUpdate(id=3, quantity_delta=Decimal("2")),
+    ]
+
+    with patch("services.nomenclature_service.NomenclatureRepository") as repo_cls, patch(
+        "services.nomenclature_service.CatalogRepository"
+    ) as catalog_repo_cls:
+        catalog_repo_cls.return_value.next_version = AsyncMock(return_value=7)
+        repo = repo_cls.return_value
+        repo.lock_stock = AsyncMock(
+            side_effect=[
+                {1: (Decimal("1"), Decimal("9")), 2: (Decimal("3"), Decimal("7"))},
+                {3: (Decimal("0"), Decimal("1"))},
+            ]
+        )
+        repo.bulk_set_stock = AsyncMock()
+
+        result = await bulk_update_nomenclature(session, updates, chunk_size=2)
+
+        assert result.updated == 3
+        assert result.rejected == []
+        assert repo.bulk_set_stock.await_count == 2
+        first_chunk = repo.bulk_set_stock.await_args_list[0].args[0]
+        assert first_chunk == [
+            {"id": 1, "quantity": Decimal("10"), "price": Decimal("9"), "change_version": 7},
+            {"id": 2, "quantity": Decimal("2"), "price": Decimal("5"), "change_version": 7},
+        ]
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_rejects_unknown_ids_and_negative_stock(
+    session: AsyncSession,
+) -> None:
+    """Несуществующие ID и уход остатка в минус попадают в rejected и не пишутся."""
+    updates = [
+        NomenclatureStockUpdate(id=1, quantity_delta=Decimal("-5")),
+        NomenclatureStockUpdate(id=99, price=Decimal("1")),
+    ]
+
+    with patch("services.nomenclature_service.NomenclatureRepository") as repo_cls, patch(
+        "services.nomenclature_service.CatalogRepository"
+    ) as catalog_repo_cls:
+        catalog_repo = catalog_repo_cls.return_value
+        catalog_repo.next_version = AsyncMock()
+        repo = repo_cls.return_value
+        repo.lock_stock = AsyncMock(return_value={1: (Decimal("3"), Decimal("1"))})
+        repo.bulk_set_stock = AsyncMock()
+
+        result = await bulk_update_nomenclature(session, updates)
+
+        assert result.updated == 0
+        assert [(r.id, r.reason) for r in result.rejected] == [
+            (1, "negative_quantity"),
+            (99, "not_found"),
+        ]
+        repo.bulk_set_stock.assert_not_awaited()
+        catalog_repo.next_version.assert_not_awaited()
+
+
+def test_search_terms_fold_case_and_yo() -> None:
+    """Термы поиска: нижний регистр, «ё» → «е», знаки препинания отбрасываются."""
+    assert search_terms("Холодильник  ЁЛКА, 17\"") == ["холодильник", "елка", "17"]
+
+
+@pytest.mark.asyncio
+async def test_search_nomenclature_pages_by_rank_and_id(session: AsyncSession) -> None:
+    """Полная страница возвращает курсор (rank, id), который передаётся в репозиторий."""
+    items = [(FakeNomenclature(id=i, name="Товар", quantity=1, price=1), -1.5) for i in (3, 7)]
+
+    with patch("services.nomenclature_service.NomenclatureRepository") as repo_cls:
+        repo = repo_cls.return_value
+        repo.search = AsyncMock(return_value=items)
+
+        page = await search_nomenclature(session, "тов", limit=2, category_id=5)
+        repo.search.assert_awaited_once_with(["тов"], 2, category_id=5, after=None)
+        assert [item.id for item in page.items] == [3, 7]
+        assert page.next_cursor is not None
+
+        await search_nomenclature(session, "тов", limit=2, cursor=page.next_cursor)
+        assert repo.search.await_args.kwargs["after"] == (-1.5, 7)
+
+        with pytest.raises(InvalidCursorError):
+            await search_nomenclature(session, "тов", limit=2, cursor="мусор")
+
+
+@pytest.mark.asyncio
+async def test_list_filtered_pages_by_price_and_id(session: AsyncSession) -> None:
+    """Курсор витрины несёт (price, id) и привязан к направлению сортировки."""
+    items = [FakeNomenclature(id=i, name="Товар", quantity=1, price=100 * i) for i in (2, 5)]
+
+    with patch("services.nomenclature_service.NomenclatureRepository") as repo_cls:
+        repo = repo_cls.return_value
+        repo.list_filtered = AsyncMock(return_value=items)
+
+        page = await list_nomenclature_filtered(
+            session, category_id=3, in_stock=True, sort="-price", limit=2
+        )
+        assert repo.list_filtered.await_args.kwargs["descending"] is True
+        assert repo.list_filtered.await_args.kwargs["after"] is None
+        assert page.next_cursor is not None
+
+        await list_nomenclature_filtered(session, sort="-price", limit=2, cursor=page.next_cursor)
+        assert repo.list_filtered.await_args.kwargs["after"] == (Decimal("500"), 5)
+
+        with pytest.raises(InvalidCursorError):
+            await list_nomenclature_filtered(session, sort="price", cursor=page.next_cursor)
+
+
+@pytest.mark.asyncio
+async def test_get_nomenclature_batch_keeps_request_order(session: AsyncSession) -> None:
+    """Товары возвращаются в порядке ids, без повторов и ненайденных; промахи — одним запросом."""
+    records = [
+        NomenclatureRecord(id=i, name="Товар", price=Decimal(1), quantity=Decimal(1), category_id=None)
+        for i in (1, 3)
+    ]
+    fetch = AsyncMock(return_value=records)
+
+    with patch(
+        "services.nomenclature_service.nomenclature_cache", NomenclatureCache(max_size=10, ttl=60)
+    ), patch("services.nomenclature_service.fetch_records", fetch):
+        result = await get_nomenclature_batch(session, [3, 99, 1, 3])
+        assert [item.id for item in result] == [3, 1]
+        fetch.assert_awaited_once_with(session, [3, 99, 1])
+
+        await get_nomenclature(session, 3)
+        assert fetch.await_count == 1
+
+        with pytest.raises(NomenclatureNotFoundError):
+            fetch.return_value = []
+            await get_nomenclature(session, 99)
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_endpoint_rejects_oversized_request(app, monkeypatch) -> None:
+    """Строк больше NOMENCLATURE_BULK_MAX_ITEMS — 422 до обращения к сервису."""
+
+    async def no_session():
+        yield None
+
+    service = AsyncMock()
+    monkeypatch.setattr("api.nomenclature.bulk_update_nomenclature", service)
+    app.dependency_overrides[db_helper.get_session] = no_session
+    items = [{"id": i, "quantity": 1} for i in range(1, settings.nomenclature_bulk_max_items + 2)]
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver") as client:
+            response = await client.patch("/api/nomenclature:bulk", json={"items": items})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "items"]
+    service.assert_not_awaited()
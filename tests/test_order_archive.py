@@ -0,0 +1,136 @@
+"""Архивация заказов и чтение с архивом (на временном SQLite-файле)."""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    Client,
+    Nomenclature,
+    Order,
+    OrderItem,
+)
+from exceptions import OrderNotFoundError
+from services.order_archive import archive_orders
+from services.order_service import get_order, list_client_orders
+from tests.conftest import seed
+
+OLD = datetime.utcnow() - timedelta(days=100)
+NEW = datetime.utcnow()
+
+
+@pytest_asyncio.fixture
+async def session_factory(migrated_sqlite) -> async_sessionmaker[AsyncSession]:
+    await seed(
+        migrated_sqlite,
+        {
+            Nomenclature: [{"id": i, "name": f"n{i}", "price": 1, "quantity": 10} for i in (1, 2)],
+            Order: [
+                # 1-3, 6: старые оформленные, 4: старый открытый, 5: новый оформленный
+                {"id": 1, "client_id": None, "created_at": OLD, "checked_out_at": OLD},
+                {"id": 2, "client_id": None, "created_at": OLD, "checked_out_at": OLD},
+                {"id": 3, "client_id": None, "created_at": OLD, "checked_out_at": OLD},
+                {"id": 4, "client_id": None, "created_at": OLD, "checked_out_at": None},
+                {"id": 5, "client_id": None, "created_at": NEW, "checked_out_at": NEW},
+                {"id": 6, "client_id": None, "created_at": OLD, "checked_out_at": OLD},
+            ],
+            OrderItem: [
+                {"order_id": order_id, "nomenclature_id": nomenclature_id, "quantity": Decimal(order_id)}
+                for order_id in range(1, 7)
+                for nomenclature_id in (1, 2)
+            ],
+        },
+    )
+    return async_sessionmaker(migrated_sqlite, expire_on_commit=False)
+
+
+async def _ids(factory, column) -> list[int]:
+    async with factory() as session:
+        return sorted((await session.scalars(select(column))).all())
+
+
+@pytest.mark.asyncio
+async def test_archive_moves_old_checked_out_orders_in_batches(session_factory) -> None:
+    moved = await archive_orders(session_factory, timedelta(days=30), batch_size=2)
+
+    assert moved == 4
+    assert await _ids(session_factory, Order.id) == [4, 5]
+    assert await _ids(session_factory, ArchivedOrder.id) == [1, 2, 3, 6]
+    assert await _ids(session_factory, ArchivedOrderItem.order_id) == [1, 1, 2, 2, 3, 3, 6, 6]
+    async with session_factory() as session:
+        assert await session.scalar(
+            select(func.count()).select_from(OrderItem).where(OrderItem.order_id.not_in([4, 5]))
+        ) == 0
+    # Повторный запуск ничего не переносит
+    assert await archive_orders(session_factory, timedelta(days=30), batch_size=2) == 0
+
+
+@pytest.mark.asyncio
+async def test_archived_ids_are_not_reused(session_factory) -> None:
+    """Архивирован заказ с наибольшим ID: новые заказ и позиция получают ID больше архивных."""
+    await archive_orders(session_factory, timedelta(days=30), batch_size=10)
+    async with session_factory.begin() as session:
+        order_id = (
+            await session.execute(insert(Order).values(client_id=None, created_at=NEW))
+        ).inserted_primary_key[0]
+        item_id = (
+            await session.execute(
+                insert(OrderItem).values(order_id=order_id, nomenclature_id=1, quantity=Decimal(1))
+            )
+        ).inserted_primary_key[0]
+
+    assert order_id == 7
+    assert item_id > max(await _ids(session_factory, ArchivedOrderItem.id))
+
+
+@pytest.mark.asyncio
+async def test_archive_respects_max_batches(session_factory) -> None:
+    moved = await archive_orders(session_factory, timedelta(days=30), batch_size=1, max_batches=2)
+
+    assert moved == 2
+    assert await _ids(session_factory, ArchivedOrder.id) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_get_order_reads_archive_only_when_asked(session_factory) -> None:
+    await archive_orders(session_factory, timedelta(days=30), batch_size=10)
+
+    async with session_factory() as session:
+        with pytest.raises(OrderNotFoundError):
+            await get_order(session, 2)
+        order = await get_order(session, 2, include_archived=True)
+        hot = await get_order(session, 5, include_archived=True)
+
+    assert order.archived is True
+    assert [(item.nomenclature_id, item.quantity) for item in order.items] == [
+        (1, Decimal(2)),
+        (2, Decimal(2)),
+    ]
+    assert hot.archived is False and len(hot.items) == 2
+
+
+@pytest.mark.asyncio
+async def test_list_client_orders_unions_archive(session_factory) -> None:
+    async with session_factory.begin() as session:
+        await session.execute(insert(Client), [{"id": 7, "name": "c"}])
+        await session.execute(update(Order).where(Order.id.in_([2, 3, 5])).values(client_id=7))
+    await archive_orders(session_factory, timedelta(days=30), batch_size=10)
+
+    async with session_factory() as session:
+        hot_only = await list_client_orders(session, 7, limit=10)
+        first = await list_client_orders(session, 7, limit=2, include_archived=True)
+        rest = await list_client_orders(
+            session, 7, limit=2, before_id=first.next_before_id, include_archived=True
+        )
+
+    assert [order.id for order in hot_only.items] == [5]
+    assert [(order.id, order.archived) for order in first.items] == [(5, False), (3, True)]
+    assert [order.id for order in rest.items] == [2]
+    assert rest.next_before_id is None
+    assert all(len(order.items) == 2 for order in first.items + rest.items)
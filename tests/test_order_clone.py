@@ -0,0 +1,128 @@
+"""Создание и повтор заказа: позиции одним INSERT ... SELECT (на временном SQLite-файле)."""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import ArchivedOrder, ArchivedOrderItem, Client, Nomenclature, Order, OrderItem
+from exceptions import (
+    ClientNotFoundError,
+    NomenclatureNotFoundError,
+    OrderLinesShortageError,
+    OrderNotFoundError,
+)
+from services.order_service import clone_order, create_order
+from tests.conftest import seed
+
+
+@pytest_asyncio.fixture
+async def engine(migrated_sqlite):
+    now = datetime.utcnow()
+    await seed(
+        migrated_sqlite,
+        {
+            Client: [{"id": 7, "name": "c"}],
+            # Остатки: 1 — 10, 2 — 1, 3 — 5; товара 4 больше нет
+            Nomenclature: [
+                {"id": i, "name": f"n{i}", "price": 1, "quantity": q}
+                for i, q in [(1, 10), (2, 1), (3, 5)]
+            ],
+            Order: [{"id": 1, "client_id": 7, "checked_out_at": now}],
+            OrderItem: [
+                {"order_id": 1, "nomenclature_id": 1, "quantity": Decimal("2.5")},
+                {"order_id": 1, "nomenclature_id": 2, "quantity": Decimal("3")},
+                {"order_id": 1, "nomenclature_id": 3, "quantity": Decimal("5")},
+            ],
+            ArchivedOrder: [
+                {"id": 2, "client_id": 7, "created_at": now, "checked_out_at": now, "archived_at": now}
+            ],
+            ArchivedOrderItem: [
+                {"id": 10, "order_id": 2, "nomenclature_id": 3, "quantity": Decimal("1")},
+                {"id": 11, "order_id": 2, "nomenclature_id": 4, "quantity": Decimal("1")},
+            ],
+        },
+    )
+    return migrated_sqlite
+
+
+@pytest.mark.asyncio
+async def test_clone_copies_covered_lines_and_reports_short_ones(engine) -> None:
+    statements: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    async with async_sessionmaker(engine, expire_on_commit=False).begin() as session:
+        result = await clone_order(session, 1)
+
+    assert len(statements) == 6
+    assert result.order.id != 1 and result.order.client_id == 7
+    assert result.order.checked_out_at is None
+    assert [(i.nomenclature_id, i.quantity) for i in result.order.items] == [
+        (1, Decimal("2.5")),
+        (3, Decimal("5")),
+    ]
+    assert [(s.nomenclature_id, s.requested, s.available) for s in result.short_lines] == [
+        (2, Decimal("3"), Decimal("1")),
+    ]
+    async with AsyncSession(engine) as session:
+        stored = (
+            await session.execute(
+                select(OrderItem.nomenclature_id, OrderItem.quantity)
+                .where(OrderItem.order_id == result.order.id)
+                .order_by(OrderItem.nomenclature_id)
+            )
+        ).all()
+    assert stored == [(1, Decimal("2.5")), (3, Decimal("5"))]
+
+
+@pytest.mark.asyncio
+async def test_clone_reads_archived_source(engine) -> None:
+    async with async_sessionmaker(engine, expire_on_commit=False).begin() as session:
+        result = await clone_order(session, 2)
+        with pytest.raises(OrderNotFoundError):
+            await clone_order(session, 99)
+
+    assert [(i.nomenclature_id, i.quantity) for i in result.order.items] == [(3, Decimal("1"))]
+    assert [(s.nomenclature_id, s.available) for s in result.short_lines] == [(4, Decimal("0"))]
+
+
+@pytest.mark.asyncio
+async def test_create_order_inserts_all_lines_in_one_statement(engine) -> None:
+    statements: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    async with async_sessionmaker(engine, expire_on_commit=False).begin() as session:
+        order = await create_order(
+            session, 7, [(1, Decimal("2")), (3, Decimal("5")), (1, Decimal("0.5"))]
+        )
+        empty = await create_order(session, None)
+
+    assert len(statements) == 5
+    assert order.client_id == 7 and order.checked_out_at is None
+    assert [(i.nomenclature_id, i.quantity) for i in order.items] == [
+        (1, Decimal("2.5")),
+        (3, Decimal("5")),
+    ]
+    assert empty.client_id is None and empty.items == []
+
+
+@pytest.mark.asyncio
+async def test_create_order_rejects_short_or_unknown_lines(engine) -> None:
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as session:
+        with pytest.raises(OrderLinesShortageError) as error:
+            await create_order(session, 7, [(1, Decimal("1")), (2, Decimal("2")), (3, Decimal("6"))])
+        await session.rollback()
+        with pytest.raises(NomenclatureNotFoundError):
+            await create_order(session, 7, [(1, Decimal("1")), (4, Decimal("1"))])
+        await session.rollback()
+        with pytest.raises(ClientNotFoundError):
+            await create_order(session, 8, [(1, Decimal("1"))])
+        await session.rollback()
+
+    assert error.value.short_lines == [(2, Decimal("2"), Decimal("1")), (3, Decimal("6"), Decimal("5"))]
+    async with AsyncSession(engine) as session:
+        assert (await session.scalars(select(Order.id))).all() == [1]
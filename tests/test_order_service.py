@@ -1,4 +1,4 @@
-"""Unit-тесты для сервиса добавления товара в заказ."""
+"""Unit-тесты для сервиса заказов: добавление товара и оформление."""
 
 from decimal import Decimal
 from typing import Any
@@ -7,8 +7,14 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from exceptions import InsufficientStockError, NomenclatureNotFoundError, OrderNotFoundError
-from services.order_service import add_product_to_order
+from exceptions import (
+    InsufficientStockError,
+    NomenclatureNotFoundError,
+    OrderAlreadyCheckedOutError,
+    OrderNotFoundError,
+    OrderStockShortageError,
+)
+from services.order_service import add_product_to_order, checkout_order
 
 
 @pytest.fixture()
@@ -17,6 +23,13 @@ def session() -> AsyncSession:
     return MagicMock(spec=AsyncSession)
 
 
+def open_order() -> MagicMock:
+    """Заглушка неоформленного заказа."""
+    order = MagicMock()
+    order.checked_out_at = None
+    return order
+
+
 @pytest.mark.asyncio
 async def test_add_product_to_order_order_not_found(session: AsyncSession) -> None:
     """Если заказа нет – выбрасывается OrderNotFoundError."""
@@ -24,7 +37,7 @@ async def test_add_product_to_order_order_not_found(session: AsyncSession) -> No
         "services.order_service.NomenclatureRepository"
     ), patch("services.order_service.OrderItemRepository"):
         order_repo = order_repo_cls.return_value
-        order_repo.get_by_id = AsyncMock(return_value=None)
+        order_repo.lock_for_update = AsyncMock(return_value=None)
 
         with pytest.raises(OrderNotFoundError):
             await add_product_to_order(
@@ -44,10 +57,11 @@ async def test_add_product_to_order_nomenclature_not_found(
         "services.order_service.NomenclatureRepository"
     ) as nom_repo_cls, patch("services.order_service.OrderItemRepository"):
         order_repo = order_repo_cls.return_value
-        order_repo.get_by_id = AsyncMock(return_value=object())
+        order_repo.lock_for_update = AsyncMock(return_value=open_order())
 
         nom_repo = nom_repo_cls.return_value
-        nom_repo.get_by_id = AsyncMock(return_value=None)
+        nom_repo.lock_for_hold = AsyncMock(return_value={10})
+        nom_repo.get_available = AsyncMock(return_value={})
 
         with pytest.raises(NomenclatureNotFoundError):
             await add_product_to_order(
@@ -61,8 +75,7 @@ async def test_add_product_to_order_nomenclature_not_found(
 @pytest.mark.asyncio
 async def test_add_product_to_order_insufficient_stock(session: AsyncSession) -> None:
     """Если товара не хватает – InsufficientStockError."""
-    nomenclature = MagicMock()
-    nomenclature.quantity = Decimal("3")
+    available = {10: Decimal("3")}
 
     existing_item = MagicMock()
     existing_item.quantity = Decimal("2")
@@ -73,10 +86,11 @@ async def test_add_product_to_order_insufficient_stock(session: AsyncSession) ->
         "services.order_service.OrderItemRepository"
     ) as item_repo_cls:
         order_repo = order_repo_cls.return_value
-        order_repo.get_by_id = AsyncMock(return_value=object())
+        order_repo.lock_for_update = AsyncMock(return_value=open_order())
 
         nom_repo = nom_repo_cls.return_value
-        nom_repo.get_by_id = AsyncMock(return_value=nomenclature)
+        nom_repo.lock_for_hold = AsyncMock(return_value={10})
+        nom_repo.get_available = AsyncMock(return_value=available)
 
         item_repo = item_repo_cls.return_value
         item_repo.get_by_order_and_nomenclature = AsyncMock(return_value=existing_item)
@@ -96,8 +110,7 @@ async def test_add_product_to_order_insufficient_stock(session: AsyncSession) ->
 @pytest.mark.asyncio
 async def test_add_product_to_order_update_existing_item(session: AsyncSession) -> None:
     """Если позиция уже есть – обновляется количество через update_quantity."""
-    nomenclature = MagicMock()
-    nomenclature.quantity = Decimal("10")
+    available = {10: Decimal("10")}
 
     existing_item = MagicMock()
     existing_item.quantity = Decimal("2")
@@ -108,12 +121,14 @@ async def test_add_product_to_order_update_existing_item(session: AsyncSession)
         "services.order_service.NomenclatureRepository"
     ) as nom_repo_cls, patch(
         "services.order_service.OrderItemRepository"
-    ) as item_repo_cls:
+    ) as item_repo_cls, patch("services.order_service.StockHoldRepository") as hold_repo_cls:
+        hold_repo_cls.return_value.set_hold = AsyncMock()
         order_repo = order_repo_cls.return_value
-        order_repo.get_by_id = AsyncMock(return_value=object())
+        order_repo.lock_for_update = AsyncMock(return_value=open_order())
 
         nom_repo = nom_repo_cls.return_value
-        nom_repo.get_by_id = AsyncMock(return_value=nomenclature)
+        nom_repo.lock_for_hold = AsyncMock(return_value={10})
+        nom_repo.get_available = AsyncMock(return_value=available)
 
         item_repo = item_repo_cls.return_value
         item_repo.get_by_order_and_nomenclature = AsyncMock(return_value=existing_item)
@@ -128,13 +143,15 @@ async def test_add_product_to_order_update_existing_item(session: AsyncSession)
 
         assert result is updated_item
         item_repo.update_quantity.assert_awaited_once()
+        # Количество позиции удерживается за заказом
+        hold_call = hold_repo_cls.return_value.set_hold.await_args
+        assert hold_call.args[:3] == (1, 10, Decimal("5"))
 
 
 @pytest.mark.asyncio
 async def test_add_product_to_order_create_new_item(session: AsyncSession) -> None:
     """Если позиции нет – создаётся новая через create."""
-    nomenclature = MagicMock()
-    nomenclature.quantity = Decimal("10")
+    available = {10: Decimal("10")}
 
     created_item: Any = MagicMock()
 
@@ -142,12 +159,14 @@ async def test_add_product_to_order_create_new_item(session: AsyncSession) -> No
         "services.order_service.NomenclatureRepository"
     ) as nom_repo_cls, patch(
         "services.order_service.OrderItemRepository"
-    ) as item_repo_cls:
+    ) as item_repo_cls, patch("services.order_service.StockHoldRepository") as hold_repo_cls:
+        hold_repo_cls.return_value.set_hold = AsyncMock()
         order_repo = order_repo_cls.return_value
-        order_repo.get_by_id = AsyncMock(return_value=object())
+        order_repo.lock_for_update = AsyncMock(return_value=open_order())
 
         nom_repo = nom_repo_cls.return_value
-        nom_repo.get_by_id = AsyncMock(return_value=nomenclature)
+        nom_repo.lock_for_hold = AsyncMock(return_value={10})
+        nom_repo.get_available = AsyncMock(return_value=available)
 
         item_repo = item_repo_cls.return_value
         item_repo.get_by_order_and_nomenclature = AsyncMock(return_value=None)
@@ -162,4 +181,110 @@ async def test_add_product_to_order_create_new_item(session: AsyncSession) -> No
 
         assert result is created_item
         item_repo.create.assert_awaited_once_with(1, 10, Decimal("3"))
+        hold_call = hold_repo_cls.return_value.set_hold.await_args
+        assert hold_call.args[:3] == (1, 10, Decimal("3"))
+
+
+@pytest.mark.asyncio
+async def test_add_product_to_checked_out_order_is_rejected(session: AsyncSession) -> None:
+    """В оформленный заказ добавлять товар нельзя – OrderAlreadyCheckedOutError."""
+    order = MagicMock()
+    order.checked_out_at = object()
+
+    with patch("services.order_service.OrderRepository") as order_repo_cls, patch(
+        "services.order_service.NomenclatureRepository"
+    ) as nom_repo_cls, patch("services.order_service.OrderItemRepository"):
+        order_repo_cls.return_value.lock_for_update = AsyncMock(return_value=order)
+        nom_repo = nom_repo_cls.return_value
+        nom_repo.get_available = AsyncMock()
+
+        with pytest.raises(OrderAlreadyCheckedOutError):
+            await add_product_to_order(
+                session=session,
+                order_id=1,
+                nomenclature_id=10,
+                quantity=Decimal("1"),
+            )
+        nom_repo.get_available.assert_not_awaited()
+
+
+def make_line(id: int, nomenclature_id: int, quantity: str, available: str) -> MagicMock:
+    line = MagicMock()
+    line.id = id
+    line.nomenclature_id = nomenclature_id
+    line.quantity = Decimal(quantity)
+    line.available = Decimal(available)
+    line.stock_shards = 0
+    return line
+
+
+@pytest.mark.asyncio
+async def test_checkout_order_reserves_all_lines(session: AsyncSession) -> None:
+    """Оформление: один set-based UPDATE по номенклатуре, все позиции в ответе."""
+    lines = [make_line(1, 10, "2", "3"), make_line(2, 11, "1", "0")]
+
+    with patch("services.order_service.OrderRepository") as order_repo_cls, patch(
+        "services.order_service.NomenclatureRepository"
+    ) as nom_repo_cls, patch(
+        "services.order_service.OrderItemRepository"
+    ) as item_repo_cls, patch("services.order_service.CatalogRepository") as catalog_repo_cls:
+        catalog_repo_cls.return_value.next_version = AsyncMock(return_value=3)
+        order_repo = order_repo_cls.return_value
+        order_repo.mark_checked_out = AsyncMock(return_value=True)
+        nom_repo = nom_repo_cls.return_value
+        nom_repo.reserve_for_order = AsyncMock(return_value={10, 11})
+        item_repo = item_repo_cls.return_value
+        item_repo.get_lines_with_stock = AsyncMock(return_value=lines)
+
+        result = await checkout_order(session, 5)
+
+        nom_repo.reserve_for_order.assert_awaited_once_with(5, 3)
+        assert result.order_id == 5
+        assert [item.nomenclature_id for item in result.items] == [10, 11]
+
+
+@pytest.mark.asyncio
+async def test_checkout_order_reports_short_lines(session: AsyncSession) -> None:
+    """Позиции, по которым UPDATE не прошёл, возвращаются в OrderStockShortageError."""
+    lines = [make_line(1, 10, "2", "1"), make_line(2, 11, "5", "4")]
+
+    with patch("services.order_service.OrderRepository") as order_repo_cls, patch(
+        "services.order_service.NomenclatureRepository"
+    ) as nom_repo_cls, patch(
+        "services.order_service.OrderItemRepository"
+    ) as item_repo_cls, patch("services.order_service.CatalogRepository") as catalog_repo_cls:
+        catalog_repo_cls.return_value.next_version = AsyncMock(return_value=3)
+        order_repo_cls.return_value.mark_checked_out = AsyncMock(return_value=True)
+        nom_repo_cls.return_value.reserve_for_order = AsyncMock(return_value={10})
+        item_repo_cls.return_value.get_lines_with_stock = AsyncMock(return_value=lines)
+
+        with pytest.raises(OrderStockShortageError) as exc:
+            await checkout_order(session, 5)
+
+        assert exc.value.short_lines == [(11, Decimal("5"), Decimal("4"))]
+
+
+@pytest.mark.asyncio
+async def test_checkout_order_not_found_or_already_checked_out(
+    session: AsyncSession,
+) -> None:
+    """Если UPDATE заказа не прошёл – различаем отсутствие заказа и повторное оформление."""
+    with patch("services.order_service.OrderRepository") as order_repo_cls, patch(
+        "services.order_service.NomenclatureRepository"
+    ) as nom_repo_cls, patch("services.order_service.OrderItemRepository"), patch(
+        "services.order_service.CatalogRepository"
+    ):
+        order_repo = order_repo_cls.return_value
+        order_repo.mark_checked_out = AsyncMock(return_value=False)
+        nom_repo = nom_repo_cls.return_value
+        nom_repo.reserve_for_order = AsyncMock()
+
+        order_repo.get_by_id = AsyncMock(return_value=None)
+        with pytest.raises(OrderNotFoundError):
+            await checkout_order(session, 5)
+
+        order_repo.get_by_id = AsyncMock(return_value=object())
+        with pytest.raises(OrderAlreadyCheckedOutError):
+            await checkout_order(session, 5)
 
+        nom_repo.reserve_for_order.assert_not_awaited()
@@ -0,0 +1,78 @@
+"""Конкурентные изменения заказов на настоящем SQLite: блокировка заказа и стресс-тест."""
+
+import json
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from database.migrations import migrate
+from database.models import Order
+from repositories import OrderRepository
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.asyncio
+async def test_lock_for_update_blocks_checkout_from_other_connection(tmp_path: Path) -> None:
+    url = f"sqlite:///{tmp_path}/orders.db"
+    migrate(url)
+    first = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/orders.db")
+    # Второй «процесс» не ждёт блокировку (timeout=0), а сразу получает ошибку
+    second = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/orders.db", connect_args={"timeout": 0}
+    )
+    async with first.begin() as conn:
+        await conn.execute(insert(Order), [{"id": 1, "client_id": None}])
+
+    async with AsyncSession(first) as holder, AsyncSession(second) as other:
+        order = await OrderRepository(holder).lock_for_update(1)
+        assert order is not None and order.checked_out_at is None
+        with pytest.raises(OperationalError, match="locked"):
+            await OrderRepository(other).mark_checked_out(1, datetime.utcnow())
+        await other.rollback()
+
+        await holder.commit()
+        assert await OrderRepository(other).mark_checked_out(1, datetime.utcnow())
+        await other.commit()
+    await first.dispose()
+    await second.dispose()
+
+
+@pytest.mark.parametrize("shards", [0, 4])
+def test_stress_harness_finds_no_oversell_or_lost_updates(shards: int) -> None:
+    # С шардами удержания и списания горячих товаров идут через блокировку шарда
+    result = subprocess.run(
+        [
+            sys.executable,
+            "benchmarks/order_stress.py",
+            "--tasks",
+            "40",
+            "--workers",
+            "2",
+            "--skus",
+            "10",
+            "--stock",
+            "5",
+            "--shards",
+            str(shards),
+            "--json",
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    reports = json.loads(result.stdout)
+    assert [report["distribution"] for report in reports] == ["uniform", "hot"]
+    for report in reports:
+        assert report["committed"] > 0
+        assert report["gave_up"] == 0
+        assert not any(report["violations"].values()), report["violations"]
+    assert result.returncode == 0
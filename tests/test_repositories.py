@@ -1,11 +1,19 @@
 """Быстрые unit-тесты для репозиториев, проверяющие их основные методы."""
 
-from unittest.mock import MagicMock
+import asyncio
+from collections.abc import AsyncGenerator
+from unittest.mock import AsyncMock, MagicMock
 
-from sqlalchemy.ext.asyncio import AsyncSession
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from database.base import Base
+from database.models import Nomenclature
 from repositories.base import BaseRepository
 from repositories.category_repository import CategoryRepository
+from repositories.loader import BatchLoader
 from repositories.nomenclature_repository import NomenclatureRepository
 from repositories.order_item_repository import OrderItemRepository
 from repositories.order_repository import OrderRepository
@@ -38,3 +46,103 @@ def test_category_repository_inherits_base_repository() -> None:
     repo = CategoryRepository(session)
     assert isinstance(repo, BaseRepository)
 
+
+
+@pytest_asyncio.fixture()
+async def sqlite_session() -> AsyncGenerator[tuple[AsyncSession, list[str]], None]:
+    """Сессия на in-memory SQLite и список выполненных SELECT-запросов."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Nomenclature),
+            [{"id": i, "name": f"Товар {i}", "quantity": 1, "price": 10} for i in range(1, 6)],
+        )
+    statements: list[str] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany) -> None:
+        if statement.startswith("SELECT"):
+            statements.append(statement)
+
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session, statements
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_many_uses_identity_map_and_one_in_query(sqlite_session) -> None:
+    """get_many не запрашивает загруженные сущности, остальные — одним IN."""
+    session, statements = sqlite_session
+    repo = NomenclatureRepository(session)
+    await repo.get_many([1])
+    statements.clear()
+
+    found = await repo.get_many([1, 2, 3, 99, 2])
+    assert sorted(found) == [1, 2, 3]
+    assert len(statements) == 1
+
+    statements.clear()
+    assert (await repo.get_by_id(3)).id == 3
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_calls_in_one_tick_are_coalesced(sqlite_session) -> None:
+    """Параллельные get_by_id разных репозиториев одной сессии — один запрос."""
+    session, statements = sqlite_session
+
+    results = await asyncio.gather(
+        NomenclatureRepository(session).get_by_id(4),
+        NomenclatureRepository(session).get_by_id(5),
+        NomenclatureRepository(session).get_by_id(404),
+    )
+    assert [obj.id if obj else None for obj in results] == [4, 5, None]
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_loader_propagates_fetch_errors() -> None:
+    """Ошибка запроса пачки получают все ожидающие load()."""
+    fetch = AsyncMock(side_effect=RuntimeError("db down"))
+    loader = BatchLoader(fetch)
+
+    results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    fetch.assert_awaited_once_with([1, 2])
+
+
+@pytest.mark.asyncio
+async def test_batch_loader_close_cancels_running_batch() -> None:
+    """close() (закрытие сессии) отменяет задачу пачки, ожидающие load() не висят."""
+    started = asyncio.Event()
+
+    async def fetch(ids: list[int]) -> dict:
+        started.set()
+        await asyncio.Event().wait()
+        return {}
+
+    loader = BatchLoader(fetch)
+    loads = asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+    await started.wait()
+    assert len(loader._tasks) == 1
+
+    loader.close()
+    results = await asyncio.wait_for(loads, 1)
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    await asyncio.sleep(0)
+    assert not loader._tasks
+
+
+@pytest.mark.asyncio
+async def test_batch_loader_close_cancels_scheduled_batch() -> None:
+    """Пачка, ещё не отправленная в БД, при close() не отправляется."""
+    fetch = AsyncMock(return_value={})
+    loader = BatchLoader(fetch)
+    load = asyncio.ensure_future(loader.load(1))
+    await asyncio.sleep(0)
+
+    loader.close()
+    with pytest.raises(asyncio.CancelledError):
+        await load
+    fetch.assert_not_awaited()
@@ -0,0 +1,91 @@
+"""Хранение цен и количеств целыми: тип ScaledNumeric и пересчёт при миграции."""
+
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, func, insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database.migrations import SchemaVersionError, check_schema_version, migrate
+from database.types import ScaledNumeric
+
+
+@pytest.fixture()
+def stock():
+    metadata = MetaData()
+    table = Table(
+        "stock",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("quantity", ScaledNumeric(18, 4, scaled=True), nullable=False),
+        Column("price", ScaledNumeric(18, 2, scaled=True), nullable=False),
+    )
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    yield engine, table
+    engine.dispose()
+
+
+def test_scaled_values_are_integers_in_db_and_decimal_in_python(stock) -> None:
+    engine, table = stock
+    with engine.begin() as conn:
+        conn.execute(
+            insert(table),
+            [
+                {"id": 1, "quantity": Decimal("2.5"), "price": Decimal("10.99")},
+                {"id": 2, "quantity": 3, "price": 0.1},
+            ],
+        )
+        raw = conn.execute(text("SELECT quantity, price, typeof(quantity) FROM stock ORDER BY id")).all()
+        rows = conn.execute(select(table.c.quantity, table.c.price).order_by(table.c.id)).all()
+        total = conn.execute(select(func.sum(table.c.quantity))).scalar()
+        enough = conn.execute(select(table.c.id).where(table.c.quantity >= Decimal("2.6"))).scalars().all()
+
+    assert raw == [(25000, 1099, "integer"), (30000, 10, "integer")]
+    assert rows == [(Decimal("2.5"), Decimal("10.99")), (Decimal("3"), Decimal("0.1"))]
+    assert str(rows[0].quantity) == "2.5000"
+    assert total == Decimal("5.5")
+    assert enough == [2]
+
+
+def test_unscaled_type_is_plain_numeric(stock) -> None:
+    engine, _ = stock
+    metadata = MetaData()
+    table = Table("plain", metadata, Column("quantity", ScaledNumeric(18, 4, scaled=False)))
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(table), [{"quantity": Decimal("2.5")}])
+        assert conn.execute(text("SELECT typeof(quantity) FROM plain")).scalar() == "real"
+        assert conn.execute(select(table.c.quantity)).scalar() == Decimal("2.5")
+
+
+@pytest.mark.asyncio
+async def test_migrate_converts_stored_numbers_both_ways(tmp_path: Path) -> None:
+    url = f"sqlite:///{tmp_path}/test.db"
+    migrate(url, scaled_numbers=False)
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO nomenclature (id, name, quantity, price) VALUES (1, 'n', 2.5, 10.99)")
+        )
+        conn.execute(text("INSERT INTO orders (id, created_at) VALUES (1, CURRENT_TIMESTAMP)"))
+        conn.execute(
+            text("INSERT INTO order_items (order_id, nomenclature_id, quantity) VALUES (1, 1, 0.0001)")
+        )
+
+    migrate(url, scaled_numbers=True)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT quantity, price FROM nomenclature")).one() == (25000, 1099)
+        assert conn.execute(text("SELECT quantity FROM order_items")).scalar() == 1
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+    with pytest.raises(SchemaVersionError):
+        await check_schema_version(async_engine, scaled_numbers=False)
+    await check_schema_version(async_engine, scaled_numbers=True)
+    await async_engine.dispose()
+
+    migrate(url, scaled_numbers=False)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT quantity, price FROM nomenclature")).one() == (2.5, 10.99)
+        assert conn.execute(text("SELECT quantity FROM order_items")).scalar() == 0.0001
+    engine.dispose()
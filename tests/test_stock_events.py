@@ -0,0 +1,82 @@
+"""Unit-тесты брокера событий изменений остатков."""
+
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from api.nomenclature import stock_stream_endpoint
+from services.stock_events import StockEventBroker, stock_broker
+
+
+def row(id: int, quantity: str = "1") -> tuple[int, Decimal, Decimal]:
+    return (id, Decimal(quantity), Decimal("10"))
+
+
+@pytest.mark.asyncio
+async def test_publish_fans_out_to_all_subscribers() -> None:
+    """Одна публикация доходит до каждого подписчика."""
+    broker = StockEventBroker(queue_size=10, history_size=10)
+    first, second = broker.subscribe(), broker.subscribe()
+
+    broker.publish([row(1), row(2)])
+
+    for subscription in (first, second):
+        assert await subscription.wait(0)
+        assert [subscription.queue.get_nowait().nomenclature_id for _ in range(2)] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_overflow_drops_queue_and_requests_resync() -> None:
+    """Переполненная очередь сбрасывается, подписчик получает resync."""
+    broker = StockEventBroker(queue_size=2, history_size=10)
+    subscription = broker.subscribe()
+
+    broker.publish([row(1), row(2), row(3)])
+
+    assert subscription.needs_resync
+    assert subscription.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_resume_token_replays_missed_events() -> None:
+    """По токену возобновления пропущенные события отдаются из буфера."""
+    broker = StockEventBroker(queue_size=10, history_size=10)
+    broker.publish([row(1), row(2), row(3)])
+
+    subscription = broker.subscribe(broker.token(1))
+
+    assert not subscription.needs_resync
+    assert [subscription.queue.get_nowait().seq for _ in range(2)] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_stale_or_foreign_token_requires_resync() -> None:
+    """Вытесненный из буфера токен, токен другой эпохи и разрыв без подписчиков ведут к resync."""
+    broker = StockEventBroker(queue_size=10, history_size=2)
+    broker.publish([row(1), row(2), row(3)])
+
+    assert broker.subscribe(broker.token(0)).needs_resync
+    assert broker.subscribe("0-3").needs_resync
+
+    token = broker.token(broker.last_seq)
+    broker.skip()
+    assert broker.subscribe(token).needs_resync
+
+
+@pytest.mark.asyncio
+async def test_stream_endpoint_subscribes_only_while_streaming() -> None:
+    """Ответ, который так и не начали передавать, не оставляет подписку у брокера."""
+    before = stock_broker.subscriber_count
+    response = await stock_stream_endpoint(last_event_id=None, last_event_id_header=None)
+    assert stock_broker.subscriber_count == before
+
+    body = response.body_iterator
+    chunk = asyncio.ensure_future(anext(body))
+    await asyncio.sleep(0)
+    assert stock_broker.subscriber_count == before + 1
+    stock_broker.publish([row(1)])
+    assert "event: stock" in await asyncio.wait_for(chunk, 1)
+
+    await body.aclose()
+    assert stock_broker.subscriber_count == before
@@ -0,0 +1,100 @@
+"""Удержания остатка открытыми заказами: доступность, оформление, очистка (на временном SQLite-файле)."""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.models import Nomenclature, Order, StockHold
+from exceptions import InsufficientStockError, OrderLinesShortageError, OrderStockShortageError
+from services.order_service import add_product_to_order, checkout_order, create_order
+from services.stock_holds import release_expired_holds
+from tests.conftest import seed
+
+
+@pytest_asyncio.fixture
+async def factory(migrated_sqlite):
+    await seed(
+        migrated_sqlite,
+        {
+            Nomenclature: [{"id": 1, "name": "n1", "price": 1, "quantity": 10}],
+            Order: [{"id": i, "client_id": None} for i in (1, 2)],
+        },
+    )
+    return async_sessionmaker(migrated_sqlite, expire_on_commit=False)
+
+
+async def _holds(factory) -> list[tuple[int, Decimal]]:
+    async with factory() as session:
+        result = await session.execute(
+            select(StockHold.order_id, StockHold.quantity).order_by(StockHold.order_id)
+        )
+        return [tuple(row) for row in result.all()]
+
+
+async def _expire(factory, order_id: int) -> None:
+    async with factory.begin() as session:
+        await session.execute(
+            update(StockHold)
+            .where(StockHold.order_id == order_id)
+            .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+
+
+@pytest.mark.asyncio
+async def test_holds_of_other_orders_reduce_availability_until_expiry(factory) -> None:
+    async with factory.begin() as session:
+        await add_product_to_order(session, 1, 1, Decimal("5"))
+        await add_product_to_order(session, 1, 1, Decimal("3"))
+    assert await _holds(factory) == [(1, Decimal("8"))]
+
+    async with factory() as session:
+        with pytest.raises(InsufficientStockError) as error:
+            await add_product_to_order(session, 2, 1, Decimal("3"))
+        with pytest.raises(OrderLinesShortageError):
+            await create_order(session, None, [(1, Decimal("3"))])
+        await session.rollback()
+    assert error.value.available == Decimal("2")
+
+    # Удержание истекло — остаток снова доступен другим заказам
+    await _expire(factory, 1)
+    async with factory.begin() as session:
+        await add_product_to_order(session, 2, 1, Decimal("3"))
+
+    # Первому заказу теперь мешает активное удержание второго
+    async with factory() as session:
+        with pytest.raises(OrderStockShortageError) as shortage:
+            await checkout_order(session, 1)
+        await session.rollback()
+    assert shortage.value.short_lines == [(1, Decimal("8"), Decimal("7"))]
+
+
+@pytest.mark.asyncio
+async def test_checkout_converts_holds_into_stock_decrement(factory) -> None:
+    async with factory.begin() as session:
+        await add_product_to_order(session, 1, 1, Decimal("4"))
+        order = await create_order(session, None, [(1, Decimal("6"))])
+    assert await _holds(factory) == [(1, Decimal("4")), (order.id, Decimal("6"))]
+
+    async with factory.begin() as session:
+        await checkout_order(session, order.id)
+    async with factory() as session:
+        assert await session.scalar(select(Nomenclature.quantity)) == Decimal("4")
+    assert await _holds(factory) == [(1, Decimal("4"))]
+
+
+@pytest.mark.asyncio
+async def test_sweeper_deletes_expired_holds_in_batches(factory) -> None:
+    async with factory.begin() as session:
+        await add_product_to_order(session, 1, 1, Decimal("1"))
+        await add_product_to_order(session, 2, 1, Decimal("1"))
+        await create_order(session, None, [(1, Decimal("1"))])
+    await _expire(factory, 1)
+    await _expire(factory, 2)
+
+    assert await release_expired_holds(factory, batch_size=1, max_batches=1) == 1
+    assert await release_expired_holds(factory, batch_size=1) == 1
+    assert [order_id for order_id, _ in await _holds(factory)] == [3]
@@ -0,0 +1,223 @@
+"""Шардированные счётчики остатка: списание, выравнивание, массовое обновление (на временном SQLite-файле)."""
+
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.commit_hooks import register_commit_hook, run_commit_hooks, unregister_commit_hook
+from database.models import (
+    CatalogState,
+    Nomenclature,
+    NomenclatureStockShard,
+    Order,
+    OrderItem,
+    StockHold,
+)
+from exceptions import InsufficientStockError, OrderLinesShortageError, OrderStockShortageError
+from repositories import NomenclatureRepository
+from repositories.nomenclature_repository import split_evenly
+from schemas.nomenclature import NomenclatureStockUpdate
+from services.nomenclature_service import bulk_update_nomenclature
+from services.order_service import add_product_to_order, checkout_order, create_order
+from services.stock_shards import StockShardRebalancer, rebalance_stock_shards, set_stock_shards
+from tests.conftest import seed
+
+
+@pytest_asyncio.fixture
+async def factory(migrated_sqlite):
+    await seed(
+        migrated_sqlite,
+        {
+            Nomenclature: [
+                {"id": i, "name": f"n{i}", "price": 1, "quantity": q} for i, q in [(1, 10), (2, 5)]
+            ],
+            Order: [{"id": i, "client_id": None} for i in (1, 2, 3)],
+        },
+    )
+    factory = async_sessionmaker(migrated_sqlite, expire_on_commit=False)
+    async with factory.begin() as session:
+        await set_stock_shards(session, 1, 4)
+    return factory
+
+
+async def _shards(factory, nomenclature_id: int = 1) -> list[Decimal]:
+    async with factory() as session:
+        result = await session.scalars(
+            select(NomenclatureStockShard.quantity)
+            .where(NomenclatureStockShard.nomenclature_id == nomenclature_id)
+            .order_by(NomenclatureStockShard.shard)
+        )
+        return list(result.all())
+
+
+async def _displayed(factory, nomenclature_id: int = 1) -> Decimal:
+    async with factory() as session:
+        return await session.scalar(
+            select(Nomenclature.quantity).where(Nomenclature.id == nomenclature_id)
+        )
+
+
+def test_split_evenly_keeps_total_in_whole_units() -> None:
+    assert split_evenly(Decimal("10"), 4) == [3, 3, 2, 2]
+    assert split_evenly(Decimal("3"), 5) == [1, 1, 1, 0, 0]
+    assert split_evenly(Decimal("2.5"), 2) == [Decimal("1.5"), 1]
+
+
+@pytest.mark.asyncio
+async def test_checkout_takes_from_shards_without_catalog_version(factory) -> None:
+    assert await _shards(factory) == [3, 3, 2, 2]
+    async with factory.begin() as session:
+        # Доступный остаток — сумма шардов
+        await add_product_to_order(session, 1, 1, Decimal("2"))
+        with pytest.raises(InsufficientStockError):
+            await add_product_to_order(session, 2, 1, Decimal("11"))
+        await add_product_to_order(session, 2, 1, Decimal("5"))
+        version = await session.scalar(select(CatalogState.version))
+
+    hook = AsyncMock()
+    register_commit_hook(hook)
+    try:
+        async with factory.begin() as session:
+            await checkout_order(session, 1)
+            assert await session.scalar(select(CatalogState.version)) == version
+        await run_commit_hooks(session)
+    finally:
+        unregister_commit_hook(hook)
+    # Версия не растёт, но кэш и поток остатков узнают о списании
+    hook.assert_awaited_once_with({"nomenclature": {1}})
+    assert sum(await _shards(factory)) == 8
+
+    # Ни на одном шарде нет 5: списание раскладывается по нескольким шардам
+    async with factory.begin() as session:
+        await checkout_order(session, 2)
+    assert sum(await _shards(factory)) == 3
+    # Витринный остаток — до выравнивания
+    assert await _displayed(factory) == 10
+
+
+@pytest.mark.asyncio
+async def test_shortage_reports_sum_of_shards(factory) -> None:
+    async with factory.begin() as session:
+        await session.execute(
+            insert(OrderItem),
+            [
+                {"order_id": 3, "nomenclature_id": 1, "quantity": Decimal("4")},
+                {"order_id": 3, "nomenclature_id": 2, "quantity": Decimal("4")},
+            ],
+        )
+    async with factory() as session:
+        await session.execute(
+            NomenclatureStockShard.__table__.update().values(quantity=Decimal("0.5"))
+        )
+        with pytest.raises(OrderStockShortageError) as error:
+            await checkout_order(session, 3)
+        await session.rollback()
+
+    assert error.value.short_lines == [(1, Decimal("4"), Decimal("2"))]
+    async with factory() as session:
+        with pytest.raises(OrderLinesShortageError) as shortage:
+            await create_order(session, None, [(1, Decimal("11"))])
+    assert shortage.value.short_lines == [(1, Decimal("11"), Decimal("10"))]
+
+
+@pytest.mark.asyncio
+async def test_rebalance_spreads_drained_shards_and_syncs_displayed_quantity(factory) -> None:
+    async with factory.begin() as session:
+        await session.execute(
+            NomenclatureStockShard.__table__.update()
+            .where(NomenclatureStockShard.shard > 0)
+            .values(quantity=0)
+        )
+
+    assert await rebalance_stock_shards(factory) == (1, 1)
+    assert await _shards(factory) == [1, 1, 1, 0]
+    assert await _displayed(factory) == 3
+    assert await rebalance_stock_shards(factory) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_only_lock_owner_rebalances(tmp_path: Path) -> None:
+    lock_path = str(tmp_path / "stock_shards.lock")
+    first = StockShardRebalancer(interval_seconds=60, lock_path=lock_path)
+    second = StockShardRebalancer(interval_seconds=60, lock_path=lock_path)
+    assert first._try_become_leader() and not second._try_become_leader()
+    assert first.stats()["leader"] == 1 and second.stats()["leader"] == 0
+
+    # Владелец остановился — блокировку забирает другой воркер
+    await first.stop()
+    assert second._try_become_leader()
+    await second.stop()
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_and_disable_go_through_shards(factory) -> None:
+    async with factory.begin() as session:
+        result = await bulk_update_nomenclature(
+            session, [NomenclatureStockUpdate(id=1, quantity_delta=Decimal("-2"))]
+        )
+    assert result.updated == 1
+    assert await _shards(factory) == [2, 2, 2, 2]
+    assert await _displayed(factory) == 8
+
+    async with factory.begin() as session:
+        await set_stock_shards(session, 1, 0)
+        assert await NomenclatureRepository(session).get_available([1]) == {1: Decimal("8")}
+    assert await _shards(factory) == []
+
+
+async def _shard_holds(factory, nomenclature_id: int = 1) -> dict[int, Decimal]:
+    async with factory() as session:
+        result = await session.execute(
+            select(StockHold.shard, func.sum(StockHold.quantity))
+            .where(StockHold.nomenclature_id == nomenclature_id)
+            .group_by(StockHold.shard)
+        )
+        return {shard: Decimal(quantity) for shard, quantity in result.all()}
+
+
+async def _assert_shards_cover_holds(factory) -> None:
+    shards = await _shards(factory)
+    for shard, held in (await _shard_holds(factory)).items():
+        assert shards[shard] >= held, (shard, shards, held)
+
+
+@pytest.mark.asyncio
+async def test_holds_and_takes_share_the_shard_guard(factory) -> None:
+    # Удержание 8 из [3, 3, 2, 2]: свободный остаток собирается на один шард
+    async with factory.begin() as session:
+        await add_product_to_order(session, 1, 1, Decimal("8"))
+    assert sum(await _shards(factory)) == 10
+    assert sorted((await _shard_holds(factory)).values()) == [Decimal("8")]
+    await _assert_shards_cover_holds(factory)
+
+    # Строка без удержания (например, истёкшего) не списывает удержанный остаток
+    async with factory.begin() as session:
+        await session.execute(
+            insert(OrderItem), [{"order_id": 3, "nomenclature_id": 1, "quantity": Decimal("3")}]
+        )
+    async with factory() as session:
+        with pytest.raises(OrderStockShortageError) as error:
+            await checkout_order(session, 3)
+        await session.rollback()
+    assert error.value.short_lines == [(1, Decimal("3"), Decimal("2"))]
+
+    # Выравнивание раскладывает только свободный остаток
+    await rebalance_stock_shards(factory)
+    await _assert_shards_cover_holds(factory)
+
+    async with factory.begin() as session:
+        await session.execute(update(OrderItem).where(OrderItem.order_id == 3).values(quantity=2))
+    async with factory.begin() as session:
+        await checkout_order(session, 3)
+    await _assert_shards_cover_holds(factory)
+    assert sum(await _shards(factory)) == 8
+
+    async with factory.begin() as session:
+        await checkout_order(session, 1)
+    assert await _shards(factory) == [0, 0, 0, 0]
+    assert await _shard_holds(factory) == {}
@@ -0,0 +1,92 @@
+"""Тесты трассировки: вложенность интервалов, выборка, слои и SQL-интервалы."""
+
+from pathlib import Path
+
+import pytest
+from database.db_helper import DatabaseHelper
+from database.models import Base
+from monitoring.tracing import Span, parse_traceparent, traced, tracer
+from repositories import OrderRepository
+
+
+class _CollectingExporter:
+    def __init__(self) -> None:
+        self.traces: list[list[Span]] = []
+
+    def export(self, spans: list[Span]) -> None:
+        self.traces.append(spans)
+
+
+@pytest.fixture()
+def exporter(monkeypatch: pytest.MonkeyPatch) -> _CollectingExporter:
+    exporter = _CollectingExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+    return exporter
+
+
+@traced("service")
+async def _service() -> int:
+    with tracer.span("inner", "repository"):
+        return 1
+
+
+@pytest.mark.asyncio
+async def test_spans_nested_by_layer(exporter: _CollectingExporter) -> None:
+    with tracer.trace("GET /x") as root:
+        assert await _service() == 1
+
+    [spans] = exporter.traces
+    by_name = {span.name: span for span in spans}
+    service = by_name["test_tracing._service"]
+    assert service.layer == "service"
+    assert service.parent_id == root.span_id
+    assert by_name["inner"].parent_id == service.span_id
+    assert all(span.end_ns >= span.start_ns for span in spans)
+    assert {span.trace.trace_id for span in spans} == {root.trace.trace_id}
+
+
+@pytest.mark.asyncio
+async def test_unsampled_and_untraced_calls_record_nothing(monkeypatch: pytest.MonkeyPatch) -> None:
+    exporter = _CollectingExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+    with tracer.trace("GET /x") as root:
+        assert root is None
+        assert await _service() == 1
+    # Вне трассы декоратор просто вызывает функцию
+    assert await _service() == 1
+    assert exporter.traces == []
+
+
+@pytest.mark.asyncio
+async def test_repository_and_sql_spans(exporter: _CollectingExporter, tmp_path: Path) -> None:
+    helper = DatabaseHelper(f"sqlite:///{tmp_path / 'test.db'}")
+    async with helper.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    with tracer.trace("POST /x"):
+        async with helper.session_factory() as session:
+            assert await OrderRepository(session).get_many([1, 2]) == {}
+    await helper.dispose()
+
+    [spans] = exporter.traces
+    by_name = {span.name: span for span in spans}
+    repo = by_name["OrderRepository.get_many"]
+    assert repo.layer == "repository"
+    sql = by_name["SQL SELECT"]
+    assert sql.parent_id == repo.span_id
+    assert "FROM orders" in sql.attributes["db.statement"]
+    assert by_name["pool.checkout"].parent_id == repo.span_id
+
+
+def test_parse_traceparent() -> None:
+    trace_id = "0af7651916cd43dd8448eb211c80319c"
+    assert parse_traceparent(f"00-{trace_id}-b7ad6b7169203331-01") == (
+        trace_id,
+        "b7ad6b7169203331",
+        True,
+    )
+    assert parse_traceparent(f"00-{trace_id}-b7ad6b7169203331-00")[2] is False
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(f"00-{'0' * 32}-b7ad6b7169203331-01") is None